@@ -0,0 +1 @@
+""" Benchmarks of the mower parsers, simulations and printers, run with python -m benchmarks """
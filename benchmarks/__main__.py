@@ -0,0 +1,48 @@
+import argparse
+import json
+import sys
+from typing import List, Optional
+
+from benchmarks.generator import INSTRUCTION_MIXES, WorkloadModel
+from benchmarks.suite import ENGINES, PHASES, compare, run_suite
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run the benchmark suite, or compare two reports, and write JSON to stdout or a file."""
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description='Mower benchmark suite.')
+    parser.add_argument('--width', type=int, default=100, help='Lawn width.')
+    parser.add_argument('--height', type=int, default=100, help='Lawn height.')
+    parser.add_argument('--density', type=float, default=0.1, help='Share of the lawn cells holding a mower.')
+    parser.add_argument('--program-length', type=int, default=100, help='Number of instructions of each mower.')
+    parser.add_argument('--mix', choices=sorted(INSTRUCTION_MIXES), default='uniform', help='Instruction mix.')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the fleet generator.')
+    parser.add_argument('--engines', default=None, help=f'Comma separated engines, among {", ".join(ENGINES)}.')
+    parser.add_argument('--phases', default=','.join(PHASES), help='Comma separated phases to benchmark.')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs of each benchmark, the best one is reported.')
+    parser.add_argument('--output', default=None, help='Report filename, stdout by default.')
+    parser.add_argument('--compare', nargs=2, metavar=('BASELINE', 'CURRENT'), help='Compare two reports instead.')
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        with open(args.compare[0]) as baseline_file, open(args.compare[1]) as current_file:
+            report = compare(json.load(baseline_file), json.load(current_file))
+    else:
+        workload = WorkloadModel(width=args.width, height=args.height, density=args.density, program_length=args.program_length,
+                                 mix=args.mix, seed=args.seed)
+        engines = args.engines.split(',') if args.engines else None
+        unknown = set(engines or ()) - set(ENGINES)
+        if unknown:
+            parser.error(f'unknown engines: {", ".join(sorted(unknown))}')
+        report = run_suite(workload, engines, args.phases.split(','), args.repeat)
+
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            json.dump(report, output_file, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,90 @@
+from __future__ import annotations
+import random
+from typing import Dict, Tuple
+
+from pydantic import BaseModel, validator
+
+from mower.resources.models.fleet_model import Fleet
+from mower.resources.models.instruction_tape import InstructionTape
+from mower.resources.models.lawn_model import LawnModel
+from mower.resources.services.mower_printers_service import TextFleetPrinterService, BinaryMowerPrinterService
+
+
+# Weights of the F, B, L and R instructions in the programs of each instruction mix
+INSTRUCTION_MIXES: Dict[str, Tuple[float, float, float, float]] = {
+    'uniform': (1, 1, 1, 1),
+    'turn-heavy': (1, 0.5, 4, 4),
+    'straight-heavy': (30, 2, 1, 1),
+    # Mowers start facing the lawn center and mostly go forward, so that they keep running into each other
+    'collision-heavy': (12, 1, 1, 1),
+}
+
+
+class WorkloadModel(BaseModel):
+    """Synthetic workload, generated fleets only depend on these parameters."""
+
+    width: int = 100
+    height: int = 100
+    # Share of the lawn cells holding a mower
+    density: float = 0.1
+    program_length: int = 100
+    mix: str = 'uniform'
+    seed: int = 0
+
+    @validator('mix')
+    def known_mix(cls, mix: str) -> str:
+        if mix not in INSTRUCTION_MIXES:
+            raise ValueError(f'unknown instruction mix, expected one of {", ".join(INSTRUCTION_MIXES)}')
+        return mix
+
+    @validator('density')
+    def density_range(cls, density: float) -> float:
+        if not 0 <= density <= 1:
+            raise ValueError('density must be between 0 and 1')
+        return density
+
+
+class FleetGenerator:
+    """Deterministic generator of fleets for a workload."""
+
+    def __init__(self, workload: WorkloadModel) -> None:
+        self.workload: WorkloadModel = workload
+
+    def lawn(self) -> LawnModel:
+        """Lawn of the workload."""
+        return LawnModel(height=self.workload.height, width=self.workload.width)
+
+    def fleet(self, shared: bool = False) -> Fleet:
+        """Generate the fleet of the workload, the same one for the same workload.
+
+        Shared, every mower runs the program of the first one, as mowers of a file with the same directions do.
+        """
+        workload = self.workload
+        rand = random.Random(workload.seed)
+        cells = workload.width * workload.height
+        weights = INSTRUCTION_MIXES[workload.mix]
+        fleet = Fleet()
+        for cell in rand.sample(range(cells), int(cells * workload.density)):
+            x, y = cell % workload.width, cell // workload.width
+            if workload.mix == 'collision-heavy':
+                orientation = self.facing_center(x, y)
+            else:
+                orientation = rand.randrange(4)
+            codes = bytes(rand.choices(range(4), weights, k=workload.program_length))
+            fleet.add(x, y, orientation, fleet.programs[0] if shared and fleet.programs else InstructionTape(codes))
+        return fleet
+
+    def facing_center(self, x: int, y: int) -> int:
+        """Orientation code of a mower facing the lawn center, along its longest axis to it."""
+        dx, dy = (self.workload.width - 1) / 2 - x, (self.workload.height - 1) / 2 - y
+        if abs(dx) > abs(dy):
+            return 1 if dx > 0 else 3
+        return 0 if dy >= 0 else 2
+
+    def write_text(self, filename: str) -> None:
+        """Write the fleet of the workload in the text input format."""
+        TextFleetPrinterService(filename).print(self.fleet(), self.lawn())
+
+    def write_binary(self, filename: str) -> None:
+        """Write the fleet of the workload in binary format."""
+        BinaryMowerPrinterService(filename).print(self.fleet(), self.lawn())
@@ -0,0 +1,171 @@
+import os
+import platform
+import tempfile
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import mower
+from benchmarks.generator import FleetGenerator, WorkloadModel
+from mower.resources.models.movement_table import step, step_arrays
+from mower.resources.services import mower_simulations_service
+from mower.resources.services.mower_parsers_service import FileMowerParserService, ParallelFileMowerParserService, BinaryMowerParserService
+from mower.resources.services.mower_printers_service import FileMowerPrinterService
+from mower.resources.services.mower_simulations_service import MowerSimulationService, SyncMowerSimulationService, \
+    MacroStepMowerSimulationService, VectorizedMowerSimulationService, AsyncMowerSimulationService, ParallelMowerSimulationService, \
+    TiledMowerSimulationService
+
+
+# Simulation engines, by name, built for each run
+ENGINES: Dict[str, Callable[[], MowerSimulationService]] = {
+    'sync': SyncMowerSimulationService,
+    'macro': MacroStepMowerSimulationService,
+    'vectorized': VectorizedMowerSimulationService,
+    'async': AsyncMowerSimulationService,
+    'parallel': lambda: ParallelMowerSimulationService(min_instructions=0),
+    'tiled': lambda: TiledMowerSimulationService(min_instructions=0),
+}
+PHASES = ('parse', 'kernel', 'simulate', 'simulate-shared', 'print')
+MEGABYTE = 1 << 20
+
+Result = Dict[str, Any]
+
+
+def best_time(run: Callable[[Any], Any], setup: Callable[[], Any], repeat: int) -> float:
+    """Best wall time of run over repeat runs, each one on a fresh value from setup (not timed)."""
+    best = float('inf')
+    for _ in range(repeat):
+        value = setup()
+        start = time.perf_counter()
+        run(value)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def available_engines() -> List[str]:
+    """Names of the engines that can run here."""
+    return [name for name in ENGINES if name != 'vectorized' or mower_simulations_service.import_numpy()]
+
+
+def benchmark_parse(generator: FleetGenerator, directory: str, repeat: int) -> List[Result]:
+    """Parse the workload fleet from text and binary files, in MB/s and mowers/s."""
+    text_filename, binary_filename = os.path.join(directory, 'fleet.txt'), os.path.join(directory, 'fleet.bin')
+    generator.write_text(text_filename)
+    generator.write_binary(binary_filename)
+    mowers = len(generator.fleet())
+    parsers = (('text', text_filename, FileMowerParserService), ('parallel-text', text_filename, ParallelFileMowerParserService),
+               ('binary', binary_filename, BinaryMowerParserService))
+    results = []
+    for name, filename, parser in parsers:
+        seconds = best_time(lambda service: service.parse(), lambda: parser(filename), repeat)
+        size = os.path.getsize(filename)
+        results.append({'phase': 'parse', 'name': name, 'seconds': seconds, 'bytes': size,
+                        'megabytes_per_second': size / MEGABYTE / seconds, 'mowers_per_second': mowers / seconds})
+    return results
+
+
+def benchmark_kernel(generator: FleetGenerator, repeat: int) -> List[Result]:
+    """Run the translate/rotate kernels (see movement_table) over the workload programs, in mower-steps/s.
+
+    Mowers run alone on the lawn, without occupancy: step one instruction at a time, step_arrays one round
+    of the whole fleet at a time when numpy is installed.
+    """
+    lawn = generator.lawn()
+    fleet = generator.fleet()
+    width, height = lawn.width, lawn.height
+    steps = sum(fleet.pending(index) for index in range(len(fleet)))
+
+    def run_step(mowers: List[Any]) -> None:
+        for x, y, orientation, codes in mowers:
+            for code in codes:
+                x, y, orientation = step(x, y, orientation, code, width, height)
+
+    def run_step_arrays(arrays: Any) -> None:
+        xs, ys, orientations, codes = arrays
+        for round_codes in codes:
+            xs, ys, orientations = step_arrays(xs, ys, orientations, round_codes, width, height)
+
+    def step_arrays_setup() -> Any:
+        np = mower_simulations_service.np
+        codes = np.frombuffer(b''.join(program.codes(0) for program in fleet.programs), dtype=np.uint8)
+        return (np.frombuffer(fleet.xs, dtype=np.int32).astype(np.int64), np.frombuffer(fleet.ys, dtype=np.int32).astype(np.int64),
+                np.frombuffer(fleet.orientations, dtype=np.uint8).copy(), codes.reshape(len(fleet), -1).T.copy())
+
+    kernels = [('step', run_step, lambda: [(x, y, orientation, program.codes(0))
+                                           for x, y, orientation, program in zip(fleet.xs, fleet.ys, fleet.orientations, fleet.programs)])]
+    if len(fleet) and mower_simulations_service.import_numpy():
+        # Workload programs all have the same length, codes are read as a rounds x mowers matrix
+        kernels.append(('step-arrays', run_step_arrays, step_arrays_setup))
+    results = []
+    for name, run, setup in kernels:
+        seconds = best_time(run, setup, repeat) if steps else 0.0
+        results.append({'phase': 'kernel', 'name': name, 'seconds': seconds, 'mower_steps': steps,
+                        'mower_steps_per_second': steps / seconds if seconds else 0.0})
+    return results
+
+
+def benchmark_simulate(generator: FleetGenerator, engines: Iterable[str], repeat: int, shared: bool = False) -> List[Result]:
+    """Simulate the workload fleet with each engine, in mower-steps/s.
+
+    Shared, every mower runs the same program, the dense fleet of a file repeating one directions line
+    (simulate-shared phase).
+    """
+    lawn = generator.lawn()
+    fleet = generator.fleet(shared)
+    steps = sum(fleet.pending(index) for index in range(len(fleet)))
+    results = []
+    for name in engines:
+        # Each run gets a fresh fleet, built with the engine outside the timed run
+        seconds = best_time(lambda engine_fleet: engine_fleet[0].run(engine_fleet[1], lawn),
+                            lambda: (ENGINES[name](), generator.fleet(shared)), repeat) if steps else 0.0
+        results.append({'phase': 'simulate-shared' if shared else 'simulate', 'name': name, 'seconds': seconds, 'mower_steps': steps,
+                        'mower_steps_per_second': steps / seconds if seconds else 0.0})
+    return results
+
+
+def benchmark_print(generator: FleetGenerator, directory: str, repeat: int) -> List[Result]:
+    """Print the final positions of the workload fleet, in MB/s and mowers/s."""
+    filename = os.path.join(directory, 'output.txt')
+    fleet = generator.fleet()
+    seconds = best_time(lambda printer: printer.print(fleet), lambda: FileMowerPrinterService(filename), repeat)
+    size = os.path.getsize(filename)
+    return [{'phase': 'print', 'name': 'file', 'seconds': seconds, 'bytes': size,
+             'megabytes_per_second': size / MEGABYTE / seconds, 'mowers_per_second': len(fleet) / seconds}]
+
+
+def run_suite(workload: WorkloadModel, engines: Optional[Iterable[str]] = None, phases: Iterable[str] = PHASES,
+              repeat: int = 3) -> Dict[str, Any]:
+    """Run the benchmarks of some phases on a workload, returns a JSON serializable report."""
+    generator = FleetGenerator(workload)
+    results: List[Result] = []
+    with tempfile.TemporaryDirectory() as directory:
+        if 'parse' in phases:
+            results += benchmark_parse(generator, directory, repeat)
+        if 'kernel' in phases:
+            results += benchmark_kernel(generator, repeat)
+        if 'simulate' in phases:
+            results += benchmark_simulate(generator, available_engines() if engines is None else engines, repeat)
+        if 'simulate-shared' in phases:
+            results += benchmark_simulate(generator, available_engines() if engines is None else engines, repeat, shared=True)
+        if 'print' in phases:
+            results += benchmark_print(generator, directory, repeat)
+    return {
+        'version': mower.__version__,
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+        'workload': workload.dict(),
+        'repeat': repeat,
+        'results': results,
+    }
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any]) -> List[Result]:
+    """Compare the results of two reports, speedup > 1 when current is faster."""
+    baseline_seconds = {(result['phase'], result['name']): result['seconds'] for result in baseline['results']}
+    comparison = []
+    for result in current['results']:
+        key = (result['phase'], result['name'])
+        if key in baseline_seconds and result['seconds']:
+            comparison.append({'phase': key[0], 'name': key[1], 'baseline_seconds': baseline_seconds[key],
+                               'seconds': result['seconds'], 'speedup': baseline_seconds[key] / result['seconds']})
+    return comparison
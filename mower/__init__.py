@@ -6,6 +6,12 @@ __version__ = '0.1.0'
 __author__ = """ Patricio Tula """
 __version__ = '0.1.0'
 
-from mower.mower import Mower
-
 __all__ = ['Mower']
+
+
+def __getattr__(name):
+    """Import Mower on first use: it pulls in every service, while the CLI and the utils only need a few modules."""
+    if name == 'Mower':
+        from mower.mower import Mower
+        return Mower
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
@@ -1,32 +1,300 @@
-from typing import Optional, Dict, Tuple
+import asyncio
+import os
+import threading
+from typing import Any, AsyncIterator, BinaryIO, Callable, Dict, Iterator, List, Optional
 
-from mower.resources.services.mower_parsers_service import FileMowerParserService
-from mower.resources.services.mower_simulations_service import MowerSimulationService
-from mower.resources.services.mower_printers_service import MowerPrinterService
+from mower import __version__
+from mower.resources.models.binary_fleet_model import BinaryFleetFile
+from mower.resources.models.fleet_model import Fleet
+from mower.resources.models.fleet_snapshot_model import FleetSnapshot, FleetCheckpoints, DEFAULT_CHECKPOINT_SECONDS
+from mower.resources.models.lawn_model import LawnModel
+from mower.resources.models.mower_model import MowerModel, MowerPosition
+from mower.resources.services.mower_parsers_service import MowerParserService, FileMowerParserService, StdinMowerParserService, \
+    BinaryMowerParserService
+from mower.resources.services.mower_simulations_service import MowerSimulationService, SyncMowerSimulationService, AsyncMowerSimulationService, \
+    MacroStepMowerSimulationService, VectorizedMowerSimulationService, ParallelMowerSimulationService, TiledMowerSimulationService
+from mower.resources.services.mower_printers_service import MowerPrinterService, FileMowerPrinterService, StdoutMowerPrinterService, \
+    DEFAULT_BUFFER_SIZE, ORIENTATION_LETTERS, RESULT_LINE_FORMAT
+from mower.utils.contention_stats import ContentionStats
+from mower.utils.exceptions import MowerSimulationError
+from mower.utils.mower_stats import MowerStats
+from mower.utils.result_cache import ResultCache, DEFAULT_CACHE_MAX_BYTES
+
+
+# Number of mowers, and of results, held between two pipeline stages
+DEFAULT_QUEUE_SIZE = 1024
+# Simulation engines, by name
+SIMULATION_ENGINES: Dict[str, Callable[[], MowerSimulationService]] = {
+    'sync': SyncMowerSimulationService,
+    'async': AsyncMowerSimulationService,
+    'macro': MacroStepMowerSimulationService,
+    'vectorized': VectorizedMowerSimulationService,
+    'parallel': ParallelMowerSimulationService,
+    'tiled': TiledMowerSimulationService,
+}
 
 
 class Mower:
     """Mower class"""
 
-    def __init__(self, input_filename: Optional[str] = None, async_sim: Optional[bool] = False, output_filename: Optional[str] = None):
-        """Inializer."""
-        if input_filename:
-            self.mower_parser: MowerParserService = FileMowerParserService(input_filename=input_filename)
+    def __init__(self, input_filename: Optional[str] = None, async_sim: Optional[bool] = False, output_filename: Optional[str] = None,
+                 buffer_size: int = DEFAULT_BUFFER_SIZE, stats: bool = False, trace_memory: bool = False, contention: bool = False,
+                 cache_dir: Optional[str] = None, cache_max_bytes: int = DEFAULT_CACHE_MAX_BYTES, snapshot_filename: Optional[str] = None,
+                 checkpoint_filename: Optional[str] = None, checkpoint_steps: Optional[int] = None,
+                 checkpoint_seconds: Optional[float] = None, resume: bool = False, pipelined: bool = False, arrival_order: bool = False,
+                 queue_size: int = DEFAULT_QUEUE_SIZE, compressed: bool = False, engine: Optional[str] = None):
+        """Inializer.
+
+        With stats, runs record their phases timings and counters in self.stats (see MowerStats), with
+        trace_memory their peak memory too, with contention their blocked moves per mower and per cell.
+        With cache_dir, results of input files are stored there (see ResultCache) and runs of an input already
+        run with the same simulation only copy the stored results.
+        With snapshot_filename, the fleet state is saved there at the end of runs, and runs of an input grown
+        since by appended directions go on from it (see FleetSnapshot).
+        With checkpoint_filename, the fleet state is saved there along the simulation, every checkpoint_steps
+        instructions run or checkpoint_seconds (every minute by default), and with resume the run goes on from
+        it. Checkpoints are written by the simulations running all mowers round by round (sync, vectorized).
+        Pipelined, the input is parsed, simulated and printed by stages connected by queues of queue_size
+        mowers, with the async simulation: results are printed in input order as soon as they are known. With
+        arrival_order, mowers start as soon as they are read instead of once the whole fleet is, final positions
+        then depend on the order mowers join the lawn (see AsyncMowerSimulationService). Only then is memory
+        bounded by queue_size: in input order, rounds need every mower, so the whole fleet is held until it is
+        read. Pipelined runs do not use the cache, snapshots, checkpoints or contention.
+        Compressed, directions lines may repeat letters and groups, F100 or (LFRF)*500 (see ProgramTree).
+        engine names the simulation among SIMULATION_ENGINES, sync by default and async with async_sim.
+        Pipelined runs use the async one.
+        """
+        if input_filename and BinaryFleetFile.is_binary(input_filename):
+            self.mower_parser: MowerParserService = BinaryMowerParserService(filename=input_filename)
+        elif input_filename:
+            self.mower_parser: MowerParserService = FileMowerParserService(filename=input_filename, compressed=compressed)
         else:
-            self.mower_parser: MowerParserService = StdinMowerParserService()
+            self.mower_parser: MowerParserService = StdinMowerParserService(compressed=compressed)
 
-        if async_sim:
-            self.mower_simulation: MowerSimulationService = AsyncMowerSimulationService()
+        self.pipelined: bool = pipelined or arrival_order
+        self.queue_size: int = queue_size
+        engine = engine or ('async' if async_sim or self.pipelined else 'sync')
+        if engine not in SIMULATION_ENGINES:
+            raise MowerSimulationError(value=engine, message=f'Unknown simulation engine, one of {", ".join(SIMULATION_ENGINES)}.')
+        if self.pipelined and engine != 'async':
+            raise MowerSimulationError(value=engine, message='Pipelined runs use the async simulation engine.')
+        if self.pipelined:
+            self.mower_simulation: MowerSimulationService = AsyncMowerSimulationService(deterministic=not arrival_order)
         else:
-            self.mower_simulation: MowerSimulationService = SyncMowerSimulationService()
+            self.mower_simulation: MowerSimulationService = SIMULATION_ENGINES[engine]()
 
-        if output_stream:
-            self.mower_printer: MowerPrinterService = FileMowerPrinterService(output_filename=output_filename)
+        if output_filename:
+            self.mower_printer: MowerPrinterService = FileMowerPrinterService(output_filename=output_filename, buffer_size=buffer_size)
         else:
-            self.mower_printer: MowerPrinterService = StdoutMowerPrinterService()
+            self.mower_printer: MowerPrinterService = StdoutMowerPrinterService(buffer_size=buffer_size)
+
+        self.stats: Optional[MowerStats] = MowerStats(trace_memory=trace_memory) if stats or contention else None
+        self.contention: bool = contention and not self.pipelined
+        self.mower_simulation.stats = self.stats
+
+        self.input_filename: Optional[str] = input_filename
+        self.compressed: bool = compressed
+        # Stdin can only be read once, its results are not cached. Contention is only known by running the simulation.
+        use_cache = cache_dir and input_filename and not contention and not self.pipelined
+        self.result_cache: Optional[ResultCache] = ResultCache(cache_dir, cache_max_bytes) if use_cache else None
+        self.snapshot_filename: Optional[str] = snapshot_filename
+        self.checkpoint_filename: Optional[str] = checkpoint_filename
+        self.checkpoint_steps: Optional[int] = checkpoint_steps
+        no_interval = checkpoint_steps is None and checkpoint_seconds is None
+        self.checkpoint_seconds: Optional[float] = DEFAULT_CHECKPOINT_SECONDS if no_interval else checkpoint_seconds
+        self.resume_checkpoint: bool = resume
+
+    def run(self) -> Optional[Fleet]:
+        """Run method, returns the final fleet, None when results come from the cache or a pipelined run."""
+        if self.pipelined:
+            return self.run_pipelined()
+        key = self.cache_key()
+        if key is not None:
+            stored = self.result_cache.open(key)
+            if stored is not None:
+                self.print_stored(stored)
+                return None
+            if self.stats is not None:
+                self.stats.count('cache_misses')
+        if self.stats is not None:
+            return self.run_with_stats(self.stats, key)
+        fleet, lawn = self.mower_parser.parse()
+        start_digest = self.resume(fleet, lawn)
+        fleet = self.mower_simulation.run(fleet, lawn)
+        self.save_snapshot(fleet, lawn, start_digest)
+        self.print_results(fleet, lawn, key)
+        return fleet
+
+    def resume(self, fleet: Fleet, lawn: LawnModel) -> Optional[Any]:
+        """Move a fleet to the most advanced saved state matching it and set up checkpoints.
+
+        Returns the hash of the fleet start for the snapshots to come, None when they are off.
+        """
+        if self.snapshot_filename is None and self.checkpoint_filename is None:
+            return None
+        start_digest = FleetSnapshot.start_digest(fleet, lawn)
+        filenames = [self.snapshot_filename, self.checkpoint_filename if self.resume_checkpoint else None]
+        snapshots = [FleetSnapshot.read(filename) for filename in filenames if filename and os.path.exists(filename)]
+        snapshots = [snapshot for snapshot in snapshots if snapshot.matches(fleet, lawn, start_digest)]
+        if snapshots:
+            snapshot = max(snapshots, key=lambda snapshot: snapshot.round)
+            snapshot.restore(fleet)
+            if self.stats is not None:
+                self.stats.count('resumed_rounds', snapshot.round)
+        if self.checkpoint_filename is not None:
+            self.mower_simulation.checkpoints = FleetCheckpoints(self.checkpoint_filename, lawn, start_digest, self.checkpoint_steps,
+                                                                 self.checkpoint_seconds)
+        return start_digest
+
+    def save_snapshot(self, fleet: Fleet, lawn: LawnModel, start_digest: Optional[Any]) -> None:
+        """Save the state of a simulated fleet, if snapshots are on."""
+        if self.snapshot_filename is not None:
+            FleetSnapshot.capture(fleet, lawn, max(fleet.cursors, default=0), start_digest).write(self.snapshot_filename)
+
+    def cache_key(self) -> Optional[str]:
+        """Key of the results of the run in the cache, None without cache."""
+        if self.result_cache is None:
+            return None
+        engine = type(self.mower_simulation).__name__
+        # The same input may be wrong as plain directions and right compressed
+        return ResultCache.key(self.input_filename, __version__, engine, 'compressed' if self.compressed else 'plain')
+
+    def print_stored(self, stored: BinaryIO) -> None:
+        """Print results stored in the cache."""
+        with stored:
+            if self.stats is None:
+                self.mower_printer.print_stored(stored)
+                return
+            self.stats.count('cache_hits')
+            with self.stats.phase('print'):
+                self.mower_printer.print_stored(stored)
+
+    def print_results(self, fleet: Fleet, lawn: LawnModel, key: Optional[str] = None) -> None:
+        """Print final positions, storing them in the cache first when a key is given."""
+        if key is not None:
+            with self.result_cache.store(key) as stored_file:
+                self.mower_printer.write(stored_file, fleet)
+            stored = self.result_cache.open(key)
+            if stored is not None:
+                with stored:
+                    self.mower_printer.print_stored(stored)
+                return
+        self.mower_printer.print(fleet, lawn)
+
+    def run_with_stats(self, stats: MowerStats, key: Optional[str] = None) -> Fleet:
+        """Run method, recording phases and counters."""
+        with stats.phase('parse'):
+            fleet, lawn = self.mower_parser.parse()
+        if self.mower_parser.lines_parsed is not None:
+            stats.count('lines_parsed', self.mower_parser.lines_parsed)
+        stats.count('mowers', len(fleet))
+        start_digest = self.resume(fleet, lawn)
+        if self.contention:
+            stats.contention = ContentionStats.for_fleet(fleet, lawn)
+        pending = sum(fleet.pending(index) for index in range(len(fleet)))
+        with stats.phase('simulate'):
+            fleet = self.mower_simulation.run(fleet, lawn)
+        stats.count('instructions_executed', pending - sum(fleet.pending(index) for index in range(len(fleet))))
+        stats.count('blocked_moves', 0)
+        if self.mower_simulation.checkpoints is not None:
+            stats.count('checkpoints', self.mower_simulation.checkpoints.written)
+        self.save_snapshot(fleet, lawn, start_digest)
+        with stats.phase('print'):
+            self.print_results(fleet, lawn, key)
+        return fleet
+
+    def run_pipelined(self) -> None:
+        """Run method, parsing, simulating and printing at once, the final fleet is not kept."""
+        if self.stats is None:
+            asyncio.run(self.run_stages())
+            return None
+        with self.stats.phase('pipeline'):
+            mowers = asyncio.run(self.run_stages())
+        self.stats.count('mowers', mowers)
+        self.stats.count('blocked_moves', 0)
+        return None
+
+    async def run_stages(self) -> int:
+        """Run the pipeline stages: a thread reading mowers, the simulation, and the printing of the results.
+
+        The reading thread waits while the mowers queue is full and the simulation while the results one is,
+        so that no stage gets more than queue_size mowers ahead of the next one. In arrival order, mowers start
+        at most queue_size mowers after the first one not finished yet, so that the results waiting to be
+        printed in input order are bounded too. Returns the number of mowers.
+        """
+        loop = asyncio.get_running_loop()
+        lawn, records = await loop.run_in_executor(None, self.mower_parser.stream)
+        mowers: asyncio.Queue = asyncio.Queue(self.queue_size)
+        results: asyncio.Queue = asyncio.Queue(self.queue_size)
+        stop = threading.Event()
+        reader = loop.run_in_executor(None, Mower.read_stage, records, mowers, loop, stop)
+        with self.mower_printer.open() as stream:
+            simulation = asyncio.ensure_future(self.mower_simulation.run_stream(Mower.queued(mowers), lawn, results, self.queue_size))
+            printer = asyncio.ensure_future(Mower.print_stage(results, stream))
+            try:
+                # The printer only ends before the simulation on an error
+                done, _ = await asyncio.wait((simulation, printer), return_when=asyncio.FIRST_COMPLETED)
+                for stage in done:
+                    stage.result()
+                count = simulation.result()
+                await results.put(None)
+                await printer
+            finally:
+                simulation.cancel()
+                printer.cancel()
+                stop.set()
+                # Unblock the reading thread if it is waiting for room in the queue
+                while not mowers.empty():
+                    mowers.get_nowait()
+                await reader
+        return count
+
+    @staticmethod
+    def read_stage(records: Iterator[MowerModel], mowers: asyncio.Queue, loop: asyncio.AbstractEventLoop, stop: threading.Event) -> None:
+        """Put mowers read in a thread into a queue of the event loop, then None, or the parsing error."""
+        end: Any = None
+        try:
+            for mower in records:
+                if stop.is_set():
+                    return
+                asyncio.run_coroutine_threadsafe(mowers.put(mower), loop).result()
+        except Exception as error:
+            end = error
+        if not stop.is_set():
+            asyncio.run_coroutine_threadsafe(mowers.put(end), loop).result()
+
+    @staticmethod
+    async def queued(mowers: asyncio.Queue) -> AsyncIterator[MowerModel]:
+        """Mowers of a queue filled by read_stage, until None, raising the parsing error if any."""
+        while True:
+            mower = await mowers.get()
+            if isinstance(mower, Exception):
+                raise mower
+            if mower is None:
+                return
+            yield mower
+
+    @staticmethod
+    async def print_stage(results: asyncio.Queue, stream: BinaryIO) -> None:
+        """Write results, (index, position) until None, in input order as soon as all mowers before are written.
 
-    def run(self) -> None:
-        """Run method."""
-        mowers, lawn = self.mower_parser.parse()
-        mower = self.mower_simulation.run(mowers, lawn)
-        mower = self.mower_printer.print(mowers)
+        Lines are written when no more results are waiting, so that they come out early but in few writes.
+        """
+        ahead: Dict[int, MowerPosition] = {}
+        lines: List[bytes] = []
+        next_index = 0
+        while True:
+            result = await results.get()
+            if result is None:
+                break
+            index, position = result
+            ahead[index] = position
+            while next_index in ahead:
+                x, y, o = ahead.pop(next_index)
+                lines.append(RESULT_LINE_FORMAT % (x, y, ORIENTATION_LETTERS[o.code]))
+                next_index += 1
+            if lines and results.empty():
+                stream.write(b''.join(lines))
+                stream.flush()
+                lines.clear()
+        stream.write(b''.join(lines))
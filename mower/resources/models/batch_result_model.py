@@ -0,0 +1,21 @@
+from pydantic import BaseModel
+from typing import Optional
+
+
+class BatchResultModel(BaseModel):
+    """Outcome of the run of one file of a batch."""
+
+    input_filename: str
+    output_filename: str
+    # Error type and message when the run failed
+    error: Optional[str] = None
+    # Whether results were copied from the results cache, mowers and instructions are unknown then
+    cached: bool = False
+    input_bytes: int = 0
+    mowers: int = 0
+    instructions: int = 0
+    seconds: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
@@ -0,0 +1,165 @@
+from __future__ import annotations
+import mmap
+import struct
+from array import array
+from typing import Any, BinaryIO, List, Optional
+
+from mower.resources.models.fleet_model import Fleet
+from mower.resources.models.instruction_tape import InstructionTape
+from mower.resources.models.lawn_model import LawnModel
+from mower.resources.models.position_model import Position
+from mower.resources.models.program_tree_model import ProgramTree
+from mower.utils.exceptions import LoadFileParserError, MowerPrinterError
+
+
+BINARY_MAGIC = b'MOWB'
+BINARY_VERSION = 1
+# Header: magic, version, flags (unused), lawn height, lawn width, number of mowers, size of the program data
+BINARY_HEADER = struct.Struct('<4sHHQQQQ')
+# Arrays following the header, in order, each one 8 bytes aligned: name, typecode, one item per mower or a byte per
+# program data byte
+BINARY_ARRAYS = (('xs', 'i'), ('ys', 'i'), ('orientations', 'B'), ('sizes', 'q'), ('offsets', 'q'), ('data', 'B'))
+
+
+def aligned(size: int) -> int:
+    """Size rounded up to a multiple of 8 bytes."""
+    return (size + 7) & ~7
+
+
+class BinaryFleetFile:
+    """Fleet file in binary format, mapped in memory.
+
+    After the header come the start positions and orientations, then the size and the offset in the program
+    data of each program, then the programs packed four instructions per byte (see InstructionTape.packed).
+    Arrays are memoryviews over the mapping, nothing is copied until a fleet is built. Arrays are stored in
+    the byte order of the host, little endian on all the platforms we run on.
+    """
+
+    __slots__ = ('mapping', 'views', 'version', 'height', 'width', 'count') + tuple(name for name, _ in BINARY_ARRAYS)
+
+    def __init__(self, mapping: Any) -> None:
+        self.mapping: Any = mapping
+        self.views: List[memoryview] = []
+        if len(mapping) < BINARY_HEADER.size:
+            raise LoadFileParserError(value=None, message='Error while parsing binary Mower file. Truncated header.')
+        magic, self.version, _, self.height, self.width, self.count, data_size = BINARY_HEADER.unpack_from(mapping)
+        if magic != BINARY_MAGIC:
+            raise LoadFileParserError(value=magic, message='Error while parsing binary Mower file. Not a binary Mower file.')
+        if self.version != BINARY_VERSION:
+            raise LoadFileParserError(value=self.version, message='Error while parsing binary Mower file. Unsupported version.')
+        buffer = memoryview(mapping)
+        self.views.append(buffer)
+        offset = BINARY_HEADER.size
+        for name, typecode in BINARY_ARRAYS:
+            size = data_size if name == 'data' else self.count * array(typecode).itemsize
+            if offset + size > len(mapping):
+                self.close()
+                raise LoadFileParserError(value=name, message='Error while parsing binary Mower file. Truncated file.')
+            view = buffer[offset:offset + size].cast(typecode)
+            self.views.append(view)
+            setattr(self, name, view)
+            offset += aligned(size)
+        try:
+            self.check()
+        except LoadFileParserError:
+            self.close()
+            raise
+
+    def check(self) -> None:
+        """Check mowers are on the lawn, one per cell, with known orientations and programs within the program data.
+
+        The text parser checks the same (see FileMowerParserService), a file may have been changed since it was written.
+        """
+        if self.count and (min(self.xs) < 0 or max(self.xs) >= self.width or min(self.ys) < 0 or max(self.ys) >= self.height):
+            index = next(index for index in range(self.count) if not (0 <= self.xs[index] < self.width and 0 <= self.ys[index] < self.height))
+            raise LoadFileParserError(value=index, message='Error while parsing binary Mower file. Mower is outside the Lawn.')
+        if self.count and max(self.orientations) >= 4:
+            index = next(index for index in range(self.count) if self.orientations[index] >= 4)
+            raise LoadFileParserError(value=index, message='Error while parsing binary Mower file. Wrong Mower orientation.')
+        data_size = len(self.data)
+        for index, (offset, size) in enumerate(zip(self.offsets, self.sizes)):
+            if size < 0 or offset < 0 or offset + ((size + 3) >> 2) > data_size:
+                raise LoadFileParserError(value=index, message='Error while parsing binary Mower file. Program outside the program data.')
+        cells = set(zip(self.xs, self.ys))
+        if len(cells) < self.count:
+            cells.clear()
+            for index, cell in enumerate(zip(self.xs, self.ys)):
+                if cell in cells:
+                    raise LoadFileParserError(value=index,
+                                              message=f'Error while parsing binary Mower file. Two mowers with the same position: {Position(*cell)}.')
+                cells.add(cell)
+
+    @classmethod
+    def open(cls: BinaryFleetFile, filename: str) -> BinaryFleetFile:
+        """Map a binary fleet file."""
+        with open(filename, 'rb') as fleet_file:
+            try:
+                mapping = mmap.mmap(fleet_file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # Empty files can not be mapped
+                mapping = b''
+        return cls(mapping)
+
+    @staticmethod
+    def is_binary(filename: str) -> bool:
+        """Check whether a file starts as a binary fleet file."""
+        with open(filename, 'rb') as fleet_file:
+            return fleet_file.read(len(BINARY_MAGIC)) == BINARY_MAGIC
+
+    def lawn(self) -> LawnModel:
+        """Lawn of the fleet."""
+        return LawnModel(height=self.height, width=self.width)
+
+    def program(self, index: int) -> InstructionTape:
+        """Program of a mower."""
+        offset, size = self.offsets[index], self.sizes[index]
+        return InstructionTape.from_packed(self.data[offset:offset + ((size + 3) >> 2)], size)
+
+    def to_fleet(self) -> Fleet:
+        """Build the fleet of the file."""
+        fleet = Fleet()
+        fleet.xs.frombytes(self.xs.cast('B'))
+        fleet.ys.frombytes(self.ys.cast('B'))
+        fleet.orientations[:] = self.orientations
+        fleet.programs = [self.program(index) for index in range(self.count)]
+        fleet.cursors = array('q', bytes(8 * self.count))
+        return fleet
+
+    @staticmethod
+    def write(stream: BinaryIO, fleet: Fleet, lawn: LawnModel) -> int:
+        """Write the pending programs of a fleet in binary format, returns the number of bytes written.
+
+        Programs are written expanded, program trees are refused.
+        """
+        tree = next((program for program in fleet.programs if isinstance(program, ProgramTree)), None)
+        if tree is not None:
+            raise MowerPrinterError(value=str(tree),
+                                    message='Mowers with directions with counts or groups can not be written in binary format.')
+        programs = [program if not cursor else InstructionTape(program.codes(cursor))
+                    for program, cursor in zip(fleet.programs, fleet.cursors)]
+        sizes = array('q', (program.size for program in programs))
+        offsets = array('q', bytes(8 * len(programs)))
+        for index in range(1, len(programs)):
+            offsets[index] = offsets[index - 1] + ((sizes[index - 1] + 3) >> 2)
+        data = b''.join(program.packed() for program in programs)
+        written = stream.write(BINARY_HEADER.pack(BINARY_MAGIC, BINARY_VERSION, 0, lawn.height, lawn.width, len(fleet), len(data)))
+        for values in (fleet.xs, fleet.ys, fleet.orientations, sizes, offsets, data):
+            raw = memoryview(values).cast('B')
+            written += stream.write(raw)
+            written += stream.write(bytes(aligned(len(raw)) - len(raw)))
+        return written
+
+    def close(self) -> None:
+        """Unmap the file, arrays must not be used anymore."""
+        for view in reversed(self.views):
+            view.release()
+        self.views.clear()
+        if isinstance(self.mapping, mmap.mmap):
+            self.mapping.close()
+
+    def __enter__(self) -> BinaryFleetFile:
+        return self
+
+    def __exit__(self, *exc_info: Any) -> Optional[bool]:
+        self.close()
+        return None
@@ -37,6 +37,16 @@ class OrdinalDirection(Direction):
         else:
             raise OrdinalDirectionError(value=d, message='Wrong cardinal direction.')
 
+    @property
+    def code(self) -> int:
+        """Orientation code, clockwise from north (N=0, E=1, S=2, W=3)."""
+        return ORDINAL_DIRECTIONS.index(self)
+
+    @classmethod
+    def from_code(cls: OrdinalDirection, code: int) -> OrdinalDirection:
+        """Builds ordinal direction from orientation code."""
+        return ORDINAL_DIRECTIONS[code]
+
 
 class RelativeDirection(Direction):
     """Relative direction model to describe relative directions."""
@@ -58,3 +68,17 @@ class RelativeDirection(Direction):
             return cls.RIGHT
         else:
             raise RelativeDirectionError(value=d, message='Wrong cardinal direction.')
+
+    @property
+    def code(self) -> int:
+        """Instruction code (F=0, B=1, L=2, R=3)."""
+        return RELATIVE_DIRECTIONS.index(self)
+
+    @classmethod
+    def from_code(cls: RelativeDirection, code: int) -> RelativeDirection:
+        """Builds relative direction from instruction code."""
+        return RELATIVE_DIRECTIONS[code]
+
+
+ORDINAL_DIRECTIONS = (OrdinalDirection.NORTH, OrdinalDirection.EAST, OrdinalDirection.SOUTH, OrdinalDirection.WEST)
+RELATIVE_DIRECTIONS = (RelativeDirection.FRONT, RelativeDirection.BACK, RelativeDirection.LEFT, RelativeDirection.RIGHT)
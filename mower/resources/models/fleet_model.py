@@ -0,0 +1,107 @@
+from __future__ import annotations
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+from mower.resources.models.directions import OrdinalDirection
+from mower.resources.models.instruction_tape import InstructionTape
+from mower.resources.models.mower_model import MowerModel, MowerPosition
+from mower.resources.models.program_tree_model import ProgramTree
+
+
+class Fleet:
+    """Fleet of mowers stored as parallel arrays, in input order.
+
+    Programs are never consumed, the read position of each mower is kept in cursors.
+    """
+
+    __slots__ = ('xs', 'ys', 'orientations', 'programs', 'cursors')
+
+    def __init__(self) -> None:
+        self.xs: array = array('i')
+        self.ys: array = array('i')
+        self.orientations: bytearray = bytearray()
+        self.programs: List[InstructionTape] = []
+        self.cursors: array = array('q')
+
+    def __len__(self) -> int:
+        return len(self.xs)
+
+    def add(self, x: int, y: int, orientation: int, program: Optional[InstructionTape] = None) -> int:
+        """Add a mower from its position and orientation code, returns its index."""
+        self.xs.append(x)
+        self.ys.append(y)
+        self.orientations.append(orientation)
+        self.programs.append(program if program is not None else InstructionTape())
+        self.cursors.append(0)
+        return len(self.xs) - 1
+
+    def extend(self, other: Fleet) -> None:
+        """Append the mowers of another fleet, programs are shared."""
+        self.xs.extend(other.xs)
+        self.ys.extend(other.ys)
+        self.orientations.extend(other.orientations)
+        self.programs.extend(other.programs)
+        self.cursors.extend(other.cursors)
+
+    def position(self, index: int) -> MowerPosition:
+        """Position of a mower."""
+        return MowerPosition(self.xs[index], self.ys[index], OrdinalDirection.from_code(self.orientations[index]))
+
+    def set_position(self, index: int, position: MowerPosition) -> None:
+        """Move a mower."""
+        x, y, o = position
+        self.xs[index], self.ys[index], self.orientations[index] = x, y, o.code
+
+    def pending(self, index: int) -> int:
+        """Number of instructions the mower has still to execute."""
+        return self.programs[index].size - self.cursors[index]
+
+    def to_models(self) -> List[MowerModel]:
+        """Build the mower models of the fleet, program trees not started are kept as they are."""
+        return [MowerModel(position=self.position(index), directions=program if isinstance(program, ProgramTree) and not cursor
+                           else InstructionTape(program.codes(cursor)))
+                for index, (program, cursor) in enumerate(zip(self.programs, self.cursors))]
+
+    @classmethod
+    def from_models(cls: Fleet, mowers: Iterable[MowerModel]) -> Fleet:
+        """Build a fleet from mower models."""
+        fleet = cls()
+        for mower in mowers:
+            x, y, o = mower.position
+            index = fleet.add(x, y, o.code, mower.directions)
+            fleet.cursors[index] = mower.directions.cursor
+        return fleet
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        # Pickle distinct programs once, as a single packed buffer, pickling thousands of tapes one by one is slow and large.
+        # Program trees are pickled as they are, their expanded codes may not fit in memory
+        distinct: Dict[int, int] = {}
+        indexes = array('q', (distinct.setdefault(id(program), len(distinct)) for program in self.programs))
+        programs = list({id(program): program for program in self.programs}.values())
+        trees = {position: program for position, program in enumerate(programs) if isinstance(program, ProgramTree)}
+        sizes = array('q', (0 if position in trees else program.size for position, program in enumerate(programs)))
+        data = b''.join(program.packed() for position, program in enumerate(programs) if position not in trees)
+        return Fleet._from_buffers, (self.xs.tobytes(), self.ys.tobytes(), bytes(self.orientations),
+                                     sizes.tobytes(), data, self.cursors.tobytes(), indexes.tobytes(), trees)
+
+    @classmethod
+    def _from_buffers(cls: Fleet, xs: bytes, ys: bytes, orientations: bytes, sizes: bytes, data: bytes, cursors: bytes,
+                      indexes: bytes, trees: Optional[Dict[int, ProgramTree]] = None) -> Fleet:
+        fleet = cls()
+        fleet.xs.frombytes(xs)
+        fleet.ys.frombytes(ys)
+        fleet.orientations[:] = orientations
+        fleet.cursors.frombytes(cursors)
+        program_sizes, program_indexes = array('q'), array('q')
+        program_sizes.frombytes(sizes)
+        program_indexes.frombytes(indexes)
+        programs: List[Union[InstructionTape, ProgramTree]] = []
+        offset = 0
+        for size in program_sizes:
+            length = (size + 3) >> 2
+            programs.append(InstructionTape.from_packed(data[offset:offset + length], size))
+            offset += length
+        for position, tree in (trees or {}).items():
+            programs[position] = tree
+        fleet.programs = [programs[index] for index in program_indexes]
+        return fleet
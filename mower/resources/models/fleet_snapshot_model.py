@@ -0,0 +1,162 @@
+from __future__ import annotations
+import hashlib
+import os
+import struct
+import tempfile
+import time
+from array import array
+from typing import Any, Optional
+
+from mower.resources.models.binary_fleet_model import aligned
+from mower.resources.models.fleet_model import Fleet
+from mower.resources.models.lawn_model import LawnModel
+from mower.resources.models.program_tree_model import ProgramTree
+from mower.utils.exceptions import LoadFileParserError
+
+
+SNAPSHOT_MAGIC = b'MOWS'
+SNAPSHOT_VERSION = 1
+# Header: magic, version, flags (unused), lawn height, lawn width, number of mowers, round, digest of the fleet prefix
+SNAPSHOT_HEADER = struct.Struct('<4sHHQQQQ32s')
+# Arrays following the header, in order, each one 8 bytes aligned
+SNAPSHOT_ARRAYS = (('xs', 'i'), ('ys', 'i'), ('orientations', 'B'), ('cursors', 'q'))
+# Interval between checkpoints when none is given, in seconds
+DEFAULT_CHECKPOINT_SECONDS = 60.0
+
+
+class FleetSnapshot:
+    """State of a fleet after some rounds of a simulation: positions, orientations and cursors.
+
+    A snapshot taken at a round can be restored over a fleet whose start positions and programs, up to the
+    snapshot cursors, are the ones it was taken from: the digest covers the lawn, the start positions and
+    the programs up to the cursors. Programs may have grown since, as long as every mower with instructions
+    left ran at every round up to the snapshot (cursor equal to the round): the simulation from the snapshot
+    is then the one from the start positions. Program trees are hashed whole, without being expanded: a tree
+    grown since does not match. The occupancy grid is not stored, simulations build it from the positions.
+    """
+
+    __slots__ = ('height', 'width', 'round', 'digest') + tuple(name for name, _ in SNAPSHOT_ARRAYS)
+
+    def __init__(self, height: int, width: int, round_: int, digest: bytes) -> None:
+        self.height: int = height
+        self.width: int = width
+        self.round: int = round_
+        self.digest: bytes = digest
+        self.xs: array = array('i')
+        self.ys: array = array('i')
+        self.orientations: array = array('B')
+        self.cursors: array = array('q')
+
+    @staticmethod
+    def start_digest(fleet: Fleet, lawn: LawnModel) -> Any:
+        """Hash of the lawn and of the start positions of a fleet, to be taken before the simulation moves it."""
+        digest = hashlib.sha256(b'%d %d %d\n' % (lawn.height, lawn.width, len(fleet)))
+        for values in (fleet.xs, fleet.ys, fleet.orientations):
+            digest.update(memoryview(values).cast('B'))
+        return digest
+
+    @staticmethod
+    def prefix_digest(start_digest: Any, fleet: Fleet, cursors: array) -> bytes:
+        """Digest of a fleet, from the hash of its start, with its programs up to some cursors."""
+        digest = start_digest.copy()
+        digest.update(memoryview(cursors).cast('B'))
+        for program, cursor in zip(fleet.programs, cursors):
+            digest.update(program.digest() if isinstance(program, ProgramTree) else program.packed_prefix(cursor))
+        return digest.digest()
+
+    @classmethod
+    def capture(cls: FleetSnapshot, fleet: Fleet, lawn: LawnModel, round_: int, start_digest: Any) -> FleetSnapshot:
+        """Snapshot of a fleet after round_ rounds of simulation."""
+        snapshot = cls(lawn.height, lawn.width, round_, cls.prefix_digest(start_digest, fleet, fleet.cursors))
+        snapshot.xs = array('i', fleet.xs)
+        snapshot.ys = array('i', fleet.ys)
+        snapshot.orientations = array('B', fleet.orientations)
+        snapshot.cursors = array('q', fleet.cursors)
+        return snapshot
+
+    def matches(self, fleet: Fleet, lawn: LawnModel, start_digest: Any) -> bool:
+        """Check whether the simulation of a fleet, still at its start, can go on from the snapshot."""
+        if (self.height, self.width, len(self.cursors)) != (lawn.height, lawn.width, len(fleet)):
+            return False
+        for program, cursor in zip(fleet.programs, self.cursors):
+            if cursor > program.size or (cursor < program.size and cursor != self.round):
+                return False
+        return self.prefix_digest(start_digest, fleet, self.cursors) == self.digest
+
+    def restore(self, fleet: Fleet) -> None:
+        """Move a fleet to the snapshot state."""
+        fleet.xs[:] = self.xs
+        fleet.ys[:] = self.ys
+        fleet.orientations[:] = self.orientations.tobytes()
+        fleet.cursors[:] = self.cursors
+
+    def write(self, filename: str) -> None:
+        """Write the snapshot to a file, replacing it at once so that a snapshot file is always whole."""
+        descriptor, temporary_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(filename)), prefix='.', suffix='.tmp')
+        try:
+            with os.fdopen(descriptor, 'wb') as snapshot_file:
+                snapshot_file.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, 0, self.height, self.width, len(self.cursors),
+                                                         self.round, self.digest))
+                for name, _ in SNAPSHOT_ARRAYS:
+                    raw = memoryview(getattr(self, name)).cast('B')
+                    snapshot_file.write(raw)
+                    snapshot_file.write(bytes(aligned(len(raw)) - len(raw)))
+                snapshot_file.flush()
+                os.fsync(snapshot_file.fileno())
+            os.replace(temporary_path, filename)
+        finally:
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+
+    @classmethod
+    def read(cls: FleetSnapshot, filename: str) -> FleetSnapshot:
+        """Read a snapshot file."""
+        with open(filename, 'rb') as snapshot_file:
+            data = snapshot_file.read()
+        if len(data) < SNAPSHOT_HEADER.size:
+            raise LoadFileParserError(value=filename, message='Error while reading Mower snapshot. Truncated header.')
+        magic, version, _, height, width, count, round_, digest = SNAPSHOT_HEADER.unpack_from(data)
+        if magic != SNAPSHOT_MAGIC:
+            raise LoadFileParserError(value=magic, message='Error while reading Mower snapshot. Not a Mower snapshot.')
+        if version != SNAPSHOT_VERSION:
+            raise LoadFileParserError(value=version, message='Error while reading Mower snapshot. Unsupported version.')
+        snapshot = cls(height, width, round_, digest)
+        offset = SNAPSHOT_HEADER.size
+        for name, typecode in SNAPSHOT_ARRAYS:
+            values = array(typecode)
+            size = count * values.itemsize
+            if offset + size > len(data):
+                raise LoadFileParserError(value=name, message='Error while reading Mower snapshot. Truncated file.')
+            values.frombytes(data[offset:offset + size])
+            setattr(snapshot, name, values)
+            offset += aligned(size)
+        return snapshot
+
+
+class FleetCheckpoints:
+    """Writes snapshots of a fleet along its simulation, every some steps (instructions run) or seconds.
+
+    Simulations call round_done at the end of each round, a snapshot is written when either interval is
+    over. Each snapshot replaces the previous one, see FleetSnapshot.write.
+    """
+
+    def __init__(self, filename: str, lawn: LawnModel, start_digest: Any, every_steps: Optional[int] = None,
+                 every_seconds: Optional[float] = None) -> None:
+        self.filename: str = filename
+        self.lawn: LawnModel = lawn
+        self.start_digest: Any = start_digest
+        self.every_steps: Optional[int] = every_steps
+        self.every_seconds: Optional[float] = every_seconds
+        self.steps: int = 0
+        self.time: float = time.monotonic()
+        self.written: int = 0
+
+    def round_done(self, fleet: Fleet, round_: int, steps: int) -> None:
+        """Count the steps of a round, writes a snapshot of the fleet if an interval is over."""
+        self.steps += steps
+        if (self.every_steps is not None and self.steps >= self.every_steps) \
+                or (self.every_seconds is not None and time.monotonic() - self.time >= self.every_seconds):
+            FleetSnapshot.capture(fleet, self.lawn, round_, self.start_digest).write(self.filename)
+            self.steps = 0
+            self.time = time.monotonic()
+            self.written += 1
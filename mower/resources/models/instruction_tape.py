@@ -0,0 +1,157 @@
+from __future__ import annotations
+import hashlib
+from typing import Iterator, Any, Callable, Optional, Tuple
+
+from mower.resources.models.directions import RelativeDirection
+from mower.utils.exceptions import RelativeDirectionError
+
+
+# Translation table to instruction codes (see RelativeDirection.code), other bytes are mapped to INVALID_CODE
+INVALID_CODE = 0xff
+INSTRUCTION_CODES = bytes(b'FBLR'.find(byte) & INVALID_CODE for byte in range(256))
+WHITESPACES = b' \t\n\r\x0b\x0c'
+
+
+class InstructionTape:
+    """Mower program stored as 2-bit instruction codes, four per byte, with a read cursor."""
+
+    __slots__ = ('_data', 'size', 'cursor')
+
+    def __init__(self, codes: bytes = b'') -> None:
+        self._data: bytearray = bytearray()
+        self.size: int = 0
+        self.cursor: int = 0
+        if codes:
+            self.extend_codes(codes)
+
+    @classmethod
+    def from_str(cls: InstructionTape, relative_directions: str) -> InstructionTape:
+        """Build an instruction tape from a directions string, whitespaces are skipped."""
+        tape = cls()
+        tape.extend_from_str(relative_directions)
+        return tape
+
+    @classmethod
+    def from_packed(cls: InstructionTape, data: bytes, size: int) -> InstructionTape:
+        """Build an instruction tape from codes already packed four per byte (see packed)."""
+        tape = cls()
+        tape._data[:] = data
+        tape.size = size
+        return tape
+
+    def packed(self) -> bytes:
+        """Instruction codes packed four per byte, low bits first."""
+        return bytes(self._data)
+
+    def digest(self) -> bytes:
+        """Digest of the instruction codes, tapes of the same codes have the same one."""
+        digest = hashlib.sha256(b'%d\n' % self.size)
+        digest.update(self._data)
+        return digest.digest()
+
+    def key(self) -> Tuple[int, bytes]:
+        """Key of the instruction codes, tapes of the same codes have the same one, cheaper than digest."""
+        return self.size, bytes(self._data)
+
+    def packed_prefix(self, size: int) -> bytes:
+        """First size instruction codes packed four per byte, the bits past them cleared."""
+        prefix = bytearray(self._data[:(size + 3) >> 2])
+        if size & 3:
+            prefix[-1] &= (1 << ((size & 3) << 1)) - 1
+        return bytes(prefix)
+
+    @staticmethod
+    def codes_from_str(relative_directions: str) -> bytes:
+        """Translate a directions string into instruction codes, whitespaces are skipped."""
+        raw = relative_directions.encode('ascii', 'replace') if isinstance(relative_directions, str) else relative_directions
+        codes = raw.translate(INSTRUCTION_CODES, WHITESPACES)
+        if INVALID_CODE in codes:
+            raise RelativeDirectionError(value=relative_directions, message='Wrong relative direction.')
+        return codes
+
+    def extend_from_str(self, relative_directions: str) -> None:
+        """Append the directions of a string to the tape."""
+        self.extend_codes(InstructionTape.codes_from_str(relative_directions))
+
+    def append(self, code: int) -> None:
+        """Append an instruction code to the tape."""
+        shift = (self.size & 3) << 1
+        if not shift:
+            self._data.append(code)
+        else:
+            self._data[-1] |= code << shift
+        self.size += 1
+
+    def extend_codes(self, codes: bytes) -> None:
+        """Append instruction codes to the tape."""
+        codes = bytes(codes)
+        if self.size & 3:
+            head = min(-self.size & 3, len(codes))
+            for code in codes[:head]:
+                self.append(code)
+            codes = codes[head:]
+        if codes:
+            # Pack four codes per byte with big integer shifts, codes are lower than 4 so bytes never overflow
+            self.size += len(codes)
+            codes += bytes(-len(codes) & 3)
+            packed = 0
+            for shift in range(4):
+                packed |= int.from_bytes(codes[shift::4], 'little') << (2 * shift)
+            self._data += packed.to_bytes(len(codes) >> 2, 'little')
+
+    def code_at(self, index: int) -> int:
+        """Instruction code at an absolute index of the tape."""
+        return (self._data[index >> 2] >> ((index & 3) << 1)) & 3
+
+    def read(self) -> int:
+        """Read the instruction code under the cursor and move the cursor forward."""
+        index = self.cursor
+        if index >= self.size:
+            raise IndexError('read from an exhausted instruction tape')
+        self.cursor = index + 1
+        return (self._data[index >> 2] >> ((index & 3) << 1)) & 3
+
+    def codes(self, index: Optional[int] = None) -> bytes:
+        """Instruction codes, one per byte, from an absolute index or by default from the cursor."""
+        index = self.cursor if index is None else index
+        start = index & ~3
+        data = self._data[start >> 2:]
+        packed, mask = int.from_bytes(data, 'little'), int.from_bytes(b'\x03' * len(data), 'little')
+        unpacked = bytearray(len(data) << 2)
+        for shift in range(4):
+            unpacked[shift::4] = ((packed >> (2 * shift)) & mask).to_bytes(len(data), 'little')
+        return bytes(unpacked[index - start:self.size - start])
+
+    def __len__(self) -> int:
+        return self.size - self.cursor
+
+    def __iter__(self) -> Iterator[RelativeDirection]:
+        return (RelativeDirection.from_code(code) for code in self.codes())
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, InstructionTape):
+            return self.codes() == other.codes()
+        if isinstance(other, (list, tuple)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __str__(self) -> str:
+        return ''.join(str(direction) for direction in self)
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}({str(self)!r})'
+
+    @classmethod
+    def __get_validators__(cls) -> Iterator[Callable[..., InstructionTape]]:
+        yield cls.validate
+
+    @classmethod
+    def validate(cls: InstructionTape, value: Any) -> InstructionTape:
+        """Pydantic validator, builds a tape from a tape, a directions string or a list of directions."""
+        if isinstance(value, InstructionTape):
+            return value
+        if isinstance(value, str):
+            return cls.from_str(value)
+        if isinstance(value, (list, tuple)):
+            return cls(bytes(RelativeDirection(direction).code for direction in value))
+        raise TypeError(f'{type(value).__name__} cannot be converted to an instruction tape')
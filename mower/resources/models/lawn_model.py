@@ -5,7 +5,7 @@ from collections import namedtuple
 from mower.utils.exceptions import LawnModelLoadError
 
 
-LawnDimensions = namedtuple('LawnDims', ['w', 'h'])
+LawnDimensions = namedtuple('LawnDimensions', ['w', 'h'])
 
 
 class LawnModel(BaseModel):
@@ -25,4 +25,4 @@ class LawnModel(BaseModel):
 
     def as_tuple(self) -> LawnDimensions:
         """Get Lawn dimensions as a tuple."""
-        return LawnDimensions(lawn.height, lawn.width)
+        return LawnDimensions(w=self.width, h=self.height)
@@ -0,0 +1,54 @@
+from __future__ import annotations
+import re
+from array import array
+from typing import Optional, Tuple
+
+from mower.resources.models.instruction_tape import InstructionTape
+
+
+# Macro-op kinds
+MACRO_TURN = 0
+MACRO_RUN = 1
+
+# Runs of a same translation code (F or B) and runs of rotation codes (L and R)
+MACRO_OP_PATTERN = re.compile(rb'\x00+|\x01+|[\x02\x03]+')
+
+
+class MacroProgram:
+    """Mower program compiled into macro-ops, each one replacing instructions executed in a row.
+
+    A TURN replaces consecutive rotations, its argument is the net number of clockwise quarter turns.
+    A RUN replaces consecutive F (or B), its argument is the instruction code of the translation.
+    The count of a macro-op is the number of instructions, hence of rounds, it replaces.
+    """
+
+    __slots__ = ('kinds', 'arguments', 'counts')
+
+    def __init__(self) -> None:
+        self.kinds: bytearray = bytearray()
+        self.arguments: bytearray = bytearray()
+        self.counts: array = array('q')
+
+    @classmethod
+    def compile(cls: MacroProgram, tape: InstructionTape, index: Optional[int] = None) -> MacroProgram:
+        """Compile the instructions of a tape, from an absolute index or by default from its cursor."""
+        program = cls()
+        for match in MACRO_OP_PATTERN.finditer(tape.codes(index)):
+            codes = match.group()
+            if codes[0] < 2:
+                program.append(MACRO_RUN, codes[0], len(codes))
+            else:
+                program.append(MACRO_TURN, (codes.count(3) - codes.count(2)) & 3, len(codes))
+        return program
+
+    def append(self, kind: int, argument: int, count: int) -> None:
+        """Append a macro-op to the program."""
+        self.kinds.append(kind)
+        self.arguments.append(argument)
+        self.counts.append(count)
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    def __getitem__(self, index: int) -> Tuple[int, int, int]:
+        return self.kinds[index], self.arguments[index], self.counts[index]
@@ -0,0 +1,42 @@
+from functools import lru_cache
+from typing import Any, Tuple
+
+
+# Unit moves indexed by orientation code (N, E, S, W)
+ORIENTATION_DX = (0, 1, 0, -1)
+ORIENTATION_DY = (1, 0, -1, 0)
+# Indexed by instruction code (F, B, L, R): sign of the translation, clockwise quarter turns
+INSTRUCTION_STEP = (1, -1, 0, 0)
+INSTRUCTION_TURN = (0, 0, 3, 1)
+
+# Transition tables, indexed by orientation code << 2 | instruction code: move along x, move along y, new orientation code
+MOVE_DX = tuple(ORIENTATION_DX[transition >> 2] * INSTRUCTION_STEP[transition & 3] for transition in range(16))
+MOVE_DY = tuple(ORIENTATION_DY[transition >> 2] * INSTRUCTION_STEP[transition & 3] for transition in range(16))
+MOVE_ORIENTATION = bytes((transition >> 2) + INSTRUCTION_TURN[transition & 3] & 3 for transition in range(16))
+
+
+def step(x: int, y: int, orientation: int, instruction: int, width: int, height: int) -> Tuple[int, int, int]:
+    """Position (x, y, orientation code) of a mower after an instruction, kept on the lawn.
+
+    Moves are of one cell at most, so a move is kept on the lawn by dropping it when its target is out of
+    bounds, one comparison per axis.
+    """
+    transition = orientation << 2 | instruction
+    to_x, to_y = x + MOVE_DX[transition], y + MOVE_DY[transition]
+    return (to_x if 0 <= to_x < width else x), (to_y if 0 <= to_y < height else y), MOVE_ORIENTATION[transition]
+
+
+@lru_cache(maxsize=None)
+def array_tables() -> Tuple[Any, Any, Any]:
+    """Transition tables as numpy arrays, numpy must be installed."""
+    import numpy as np
+    return np.array(MOVE_DX, dtype=np.int64), np.array(MOVE_DY, dtype=np.int64), np.frombuffer(MOVE_ORIENTATION, dtype=np.uint8)
+
+
+def step_arrays(xs: Any, ys: Any, orientations: Any, instructions: Any, width: int, height: int) -> Tuple[Any, Any, Any]:
+    """Positions of mowers after an instruction each, as step does, over numpy arrays of a whole fleet."""
+    import numpy as np
+    move_dx, move_dy, move_orientation = array_tables()
+    transitions = orientations.astype(np.intp) << 2 | instructions
+    return (np.clip(xs + move_dx[transitions], 0, width - 1), np.clip(ys + move_dy[transitions], 0, height - 1),
+            move_orientation[transitions])
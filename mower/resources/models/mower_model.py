@@ -1,12 +1,14 @@
 from __future__ import annotations
-from pydantic import BaseModel
-from typing import Tuple, List, Optional
-from itertools import cycle
+from pydantic import BaseModel, Field
+from typing import Tuple, List, Optional, Union
 from collections import namedtuple
 
 from mower.resources.models.directions import OrdinalDirection, RelativeDirection
+from mower.resources.models.instruction_tape import InstructionTape
 from mower.resources.models.lawn_model import LawnDimensions
+from mower.resources.models.movement_table import MOVE_DX, MOVE_DY, MOVE_ORIENTATION
 from mower.resources.models.position_model import Position
+from mower.resources.models.program_tree_model import ProgramTree
 from mower.utils.exceptions import MowerModelLoadError, OrdinalDirectionError, MowerModelError
 
 
@@ -17,7 +19,7 @@ class MowerModel(BaseModel):
     """Mower model."""
 
     position: MowerPosition
-    directions: Optional[List[RelativeDirection]] = []
+    directions: Union[InstructionTape, ProgramTree] = Field(default_factory=InstructionTape)
 
     @staticmethod
     def position_from_str(mower_pos_input: str) -> MowerPosition:
@@ -34,12 +36,10 @@ class MowerModel(BaseModel):
         return MowerModel(position=MowerModel.position_from_str(mower_init_pos_input))
 
     @classmethod
-    def extend_directions_from_str(cls: MowerModel, base_model: MowerModel, relative_directions: str) -> List[RelativeDirection]:
-        """Builds mower realative directions list from string."""
-        base_directions = base_model.directions
-        new_directions = [RelativeDirection.from_str(direction) for direction in relative_directions if direction != ' ']
-        new_directions.extend(base_directions)
-        return MowerModel(position=base_model.position, directions=new_directions)
+    def extend_directions_from_str(cls: MowerModel, base_model: MowerModel, relative_directions: str) -> MowerModel:
+        """Appends mower relative directions from string."""
+        base_model.directions.extend_from_str(relative_directions)
+        return base_model
 
     @staticmethod
     def translate_mower_position(mower_position: MowerPosition, distance: int, direction: RelativeDirection, limit: LawnDimensions) -> MowerPosition:
@@ -47,23 +47,10 @@ class MowerModel(BaseModel):
         if direction not in (RelativeDirection.FRONT, RelativeDirection.BACK):
             raise MowerModelError(value=direction, message=f'Mower cannot be translate with a {direction} direction.')
         x, y, o = mower_position
-        distance = abs(distance) * (1 if direction == RelativeDirection.FRONT else -1)
-        if o == OrdinalDirection.NORTH or o == OrdinalDirection.SOUTH:
-            distance *= (1 if o == OrdinalDirection.NORTH else -1)
-            if 0 <= y + distance < limit.h:
-                return MowerPosition(x, y + distance, o)
-            elif y + distance <= 0:
-                return x, 0, o
-            elif y + distance > limit.h:
-                return MowerPosition(x, limit.h - 1, o)
-        if o == OrdinalDirection.EAST or o == OrdinalDirection.WEST:
-            distance *= (1 if o == OrdinalDirection.EAST else -1)
-            if 0 <= y + distance < limit.w:
-                return MowerPosition(x + distance, y, o)
-            elif y + distance <= 0:
-                return 0, y, o
-            elif y + distance > limit.w:
-                return MowerPosition(limit.w - 1, y, o)
+        transition = o.code << 2 | direction.code
+        distance = abs(distance)
+        return MowerPosition(min(max(x + MOVE_DX[transition] * distance, 0), limit.w - 1),
+                             min(max(y + MOVE_DY[transition] * distance, 0), limit.h - 1), o)
 
     @staticmethod
     def rotate_mower_position(mower_position: MowerPosition, direction: RelativeDirection) -> MowerPosition:
@@ -71,11 +58,4 @@ class MowerModel(BaseModel):
         if direction not in (RelativeDirection.LEFT, RelativeDirection.RIGHT):
             raise MowerModelError(value=direction, message=f'Mower cannot be rotate with a {direction} direction.')
         x, y, o = mower_position
-        orientations = [OrdinalDirection.NORTH, OrdinalDirection.EAST, OrdinalDirection.SOUTH, OrdinalDirection.WEST]
-        if direction == RelativeDirection.LEFT:
-            orientations = cycle(reversed(orientations))
-        elif direction == RelativeDirection.RIGHT:
-            orientations = cycle(orientations)
-        for actual_orientation in orientations:
-            if o == actual_orientation:
-                return x, y, next(orientations)
+        return MowerPosition(x, y, OrdinalDirection.from_code(MOVE_ORIENTATION[o.code << 2 | direction.code]))
@@ -0,0 +1,242 @@
+from __future__ import annotations
+import asyncio
+from abc import ABC, abstractmethod
+from bisect import bisect_left, bisect_right, insort
+from typing import Dict, Iterator, List, Optional, Set
+
+from mower.utils.exceptions import MowerSimulationError
+
+
+class OccupancyGrid(ABC):
+    """Cells of a lawn held by a mower, cells are packed as y * width + x."""
+
+    __slots__ = ('width', 'height')
+
+    # Largest lawn, in cells, for which a bitmap is used
+    BITMAP_MAX_CELLS = 1 << 30
+    # Lawns up to this number of cells always use a bitmap (128 KB)
+    BITMAP_MIN_CELLS = 1 << 20
+    # Largest lawn, in cells, for which a bitmap is used when the fleet size is unknown (16 MB)
+    BITMAP_UNKNOWN_FLEET_MAX_CELLS = 1 << 27
+    # Approximative memory taken by a cell in a SparseOccupancyGrid
+    SPARSE_CELL_BYTES = 64
+
+    def __init__(self, width: int, height: int) -> None:
+        self.width: int = width
+        self.height: int = height
+
+    @staticmethod
+    def for_lawn(width: int, height: int, mowers: Optional[int] = None) -> OccupancyGrid:
+        """Build the grid that fits best a lawn, a bitmap unless the lawn is huge and sparse."""
+        cells = width * height
+        if cells <= OccupancyGrid.BITMAP_MIN_CELLS:
+            return BitmapOccupancyGrid(width, height)
+        if mowers is None:
+            if cells <= OccupancyGrid.BITMAP_UNKNOWN_FLEET_MAX_CELLS:
+                return BitmapOccupancyGrid(width, height)
+        elif cells <= OccupancyGrid.BITMAP_MAX_CELLS and cells >> 3 <= mowers * OccupancyGrid.SPARSE_CELL_BYTES:
+            return BitmapOccupancyGrid(width, height)
+        return SparseOccupancyGrid(width, height)
+
+    @abstractmethod
+    def occupied(self, x: int, y: int) -> bool:
+        """Check whether a cell is held by a mower."""
+        pass
+
+    @abstractmethod
+    def occupy(self, x: int, y: int) -> None:
+        """Mark a cell as held by a mower."""
+        pass
+
+    @abstractmethod
+    def release(self, x: int, y: int) -> None:
+        """Mark a cell as free."""
+        pass
+
+    def move(self, from_x: int, from_y: int, to_x: int, to_y: int) -> None:
+        """Move a mower from a cell to another."""
+        self.release(from_x, from_y)
+        self.occupy(to_x, to_y)
+
+
+class BitmapOccupancyGrid(OccupancyGrid):
+    """Occupancy grid stored as one bit per cell."""
+
+    __slots__ = ('bits',)
+
+    def __init__(self, width: int, height: int) -> None:
+        super().__init__(width, height)
+        self.bits: bytearray = bytearray((width * height + 7) >> 3)
+
+    def occupied(self, x: int, y: int) -> bool:
+        cell = y * self.width + x
+        return bool(self.bits[cell >> 3] & (1 << (cell & 7)))
+
+    def occupy(self, x: int, y: int) -> None:
+        cell = y * self.width + x
+        self.bits[cell >> 3] |= 1 << (cell & 7)
+
+    def release(self, x: int, y: int) -> None:
+        cell = y * self.width + x
+        self.bits[cell >> 3] &= ~(1 << (cell & 7))
+
+
+class SparseOccupancyGrid(OccupancyGrid):
+    """Occupancy grid stored as a set of packed cells, for huge lawns with few mowers."""
+
+    __slots__ = ('cells',)
+
+    def __init__(self, width: int, height: int) -> None:
+        super().__init__(width, height)
+        self.cells: Set[int] = set()
+
+    def occupied(self, x: int, y: int) -> bool:
+        return y * self.width + x in self.cells
+
+    def occupy(self, x: int, y: int) -> None:
+        self.cells.add(y * self.width + x)
+
+    def release(self, x: int, y: int) -> None:
+        self.cells.discard(y * self.width + x)
+
+
+class SortedOccupancyIndex(OccupancyGrid):
+    """Occupancy grid stored as the sorted x of the cells held in each row and the sorted y of each column.
+
+    Updates and lookups cost O(log n) (plus a memory move of the row and the column), and cells held along
+    a row or a column can be searched from a cell: see first_on_ray, nearest_lines and line_range.
+    """
+
+    __slots__ = ('rows', 'columns', 'row_keys', 'column_keys')
+
+    def __init__(self, width: int, height: int) -> None:
+        super().__init__(width, height)
+        self.rows: Dict[int, List[int]] = {}
+        self.columns: Dict[int, List[int]] = {}
+        # Sorted y of the rows and x of the columns holding a cell
+        self.row_keys: List[int] = []
+        self.column_keys: List[int] = []
+
+    @staticmethod
+    def _insert(lines: Dict[int, List[int]], keys: List[int], key: int, value: int) -> None:
+        line = lines.get(key)
+        if line is None:
+            lines[key] = [value]
+            insort(keys, key)
+        else:
+            insort(line, value)
+
+    @staticmethod
+    def _remove(lines: Dict[int, List[int]], keys: List[int], key: int, value: int) -> None:
+        line = lines[key]
+        del line[bisect_left(line, value)]
+        if not line:
+            del lines[key]
+            del keys[bisect_left(keys, key)]
+
+    def occupied(self, x: int, y: int) -> bool:
+        row = self.rows.get(y)
+        if not row:
+            return False
+        position = bisect_left(row, x)
+        return position < len(row) and row[position] == x
+
+    def occupy(self, x: int, y: int) -> None:
+        if not self.occupied(x, y):
+            self._insert(self.rows, self.row_keys, y, x)
+            self._insert(self.columns, self.column_keys, x, y)
+
+    def release(self, x: int, y: int) -> None:
+        if self.occupied(x, y):
+            self._remove(self.rows, self.row_keys, y, x)
+            self._remove(self.columns, self.column_keys, x, y)
+
+    def first_on_ray(self, x: int, y: int, dx: int, dy: int, cells: int) -> int:
+        """Distance to the first cell held along a ray from (x, y) excluded, in the direction (dx, dy), 0 if none in cells."""
+        line, position = (self.rows.get(y), x) if dx else (self.columns.get(x), y)
+        if line:
+            if dx + dy > 0:
+                index = bisect_right(line, position)
+                if index < len(line) and line[index] - position <= cells:
+                    return line[index] - position
+            else:
+                index = bisect_left(line, position) - 1
+                if index >= 0 and position - line[index] <= cells:
+                    return position - line[index]
+        return 0
+
+    def nearest_lines(self, horizontal: bool, key: int) -> Iterator[int]:
+        """Rows (or columns) holding a cell, by increasing distance to the row y (or the column x) key."""
+        keys = self.row_keys if horizontal else self.column_keys
+        above = bisect_left(keys, key)
+        below = above - 1
+        while below >= 0 or above < len(keys):
+            if above < len(keys) and (below < 0 or keys[above] - key <= key - keys[below]):
+                yield keys[above]
+                above += 1
+            else:
+                yield keys[below]
+                below -= 1
+
+    def line_range(self, horizontal: bool, key: int, low: int, high: int) -> List[int]:
+        """Sorted x of the cells held in the row y key (or y in the column x key) from low to high included."""
+        line = (self.rows if horizontal else self.columns).get(key)
+        if not line:
+            return []
+        return line[bisect_left(line, low):bisect_right(line, high)]
+
+
+class AsyncOccupancyGrid(OccupancyGrid):
+    """Occupancy grid shared by mower coroutines, wrapping another grid.
+
+    Cells are checked and updated without awaiting, so a check and the move it allows can never interleave with
+    another mower. Mowers joining the lawn on a held cell wait for it to be released, they fail once no mower
+    on the lawn can move anymore since the cell is then held for good.
+    """
+
+    __slots__ = ('grid', 'waiters', 'moving')
+
+    def __init__(self, grid: OccupancyGrid, moving: int = 0) -> None:
+        super().__init__(grid.width, grid.height)
+        self.grid: OccupancyGrid = grid
+        self.waiters: Dict[int, List[asyncio.Future]] = {}
+        # Number of mowers on the lawn with instructions left
+        self.moving: int = moving
+
+    def occupied(self, x: int, y: int) -> bool:
+        return self.grid.occupied(x, y)
+
+    def occupy(self, x: int, y: int) -> None:
+        self.grid.occupy(x, y)
+
+    def release(self, x: int, y: int) -> None:
+        self.grid.release(x, y)
+        waiters = self.waiters.pop(y * self.width + x, None)
+        for waiter in waiters or ():
+            if not waiter.done():
+                waiter.set_result(None)
+
+    async def place(self, x: int, y: int, moving: bool = True) -> None:
+        """Put a mower on a cell, waiting for the cell to be released if it is held."""
+        while self.grid.occupied(x, y):
+            if not self.moving:
+                raise AsyncOccupancyGrid.held_error(x, y)
+            waiter = asyncio.get_running_loop().create_future()
+            self.waiters.setdefault(y * self.width + x, []).append(waiter)
+            await waiter
+        self.grid.occupy(x, y)
+        self.moving += moving
+
+    def leave(self) -> None:
+        """Record a mower has run all its instructions, it stays on its cell."""
+        self.moving -= 1
+        if not self.moving:
+            for cell, waiters in self.waiters.items():
+                for waiter in waiters:
+                    if not waiter.done():
+                        waiter.set_exception(AsyncOccupancyGrid.held_error(cell % self.width, cell // self.width))
+            self.waiters.clear()
+
+    @staticmethod
+    def held_error(x: int, y: int) -> MowerSimulationError:
+        return MowerSimulationError(value=(x, y), message='Mower position held by a mower that does not move anymore.')
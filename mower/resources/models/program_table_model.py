@@ -0,0 +1,33 @@
+from typing import Dict, Hashable, Union
+
+from mower.resources.models.fleet_model import Fleet
+from mower.resources.models.instruction_tape import InstructionTape
+from mower.resources.models.program_tree_model import ProgramTree
+
+
+Program = Union[InstructionTape, ProgramTree]
+
+
+class ProgramTable:
+    """Distinct programs of the mowers parsed so far, mowers with the same directions share one program.
+
+    Programs are keyed by their key (tapes by their packed codes, trees by their compressed form), the first
+    program of a key is kept and given to every other mower with this key, so a fleet holds one copy of each distinct program. Programs are not changed once their
+    mower is parsed and cursors are kept by the fleet, so shared programs are run as the others are.
+    """
+
+    def __init__(self) -> None:
+        self.programs: Dict[Hashable, Program] = {}
+
+    def __len__(self) -> int:
+        return len(self.programs)
+
+    def intern(self, program: Program) -> Program:
+        """Shared program with the directions of a program, the program itself when its directions are new."""
+        return self.programs.setdefault(program.key(), program)
+
+    def intern_fleet(self, fleet: Fleet, start: int = 0) -> Fleet:
+        """Share the programs of the mowers of a fleet from an index."""
+        for index in range(start, len(fleet)):
+            fleet.programs[index] = self.intern(fleet.programs[index])
+        return fleet
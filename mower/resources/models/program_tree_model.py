@@ -0,0 +1,295 @@
+from __future__ import annotations
+import hashlib
+import re
+from bisect import bisect_right
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from mower.resources.models.instruction_tape import InstructionTape, INSTRUCTION_CODES
+from mower.resources.models.macro_program_model import MACRO_OP_PATTERN
+from mower.resources.models.movement_table import ORIENTATION_DX, ORIENTATION_DY
+from mower.utils.exceptions import RelativeDirectionError
+
+
+# Tokens of the compressed directions syntax: directions letters, group start, group end, count of the last letter or group
+PROGRAM_TOKEN = re.compile(rb'[ \t\n\r\x0b\x0c]*(?:([FBLR]+)|(\()|(\))|\*?[ \t\n\r\x0b\x0c]*([0-9]+))')
+# Passes of at most this number of codes are kept expanded, to read codes from them at once
+PASS_CODES_LIMIT = 1 << 12
+# Bytes of directions lines written without counts nor groups
+PLAIN_DIRECTIONS = b'FBLR \t\n\r\x0b\x0c'
+
+# Move along an axis, kept on the lawn: x -> min(max(x + shift, low), high). Moves of one cell off the lawn are
+# dropped, so each one is such a clamped shift, and clamped shifts run in a row are one too.
+AxisMove = Tuple[int, int, int]
+# Move of a program run from a start orientation on a lawn: x move, y move, end orientation code and number of
+# translations heading each way, indexed by orientation code
+ProgramMove = Tuple[AxisMove, AxisMove, int, Tuple[int, int, int, int]]
+
+
+def chain_axis_moves(first: AxisMove, second: AxisMove) -> AxisMove:
+    """Axis move of a clamped shift run after another one."""
+    shift, low, high = first
+    second_shift, second_low, second_high = second
+    return (shift + second_shift, min(max(low + second_shift, second_low), second_high),
+            min(max(high + second_shift, second_low), second_high))
+
+
+def chain_moves(first: ProgramMove, second: ProgramMove) -> ProgramMove:
+    """Move of a program run after another one, second starting from the end orientation of first."""
+    x_move, y_move, _, headings = first
+    second_x_move, second_y_move, orientation, second_headings = second
+    return (chain_axis_moves(x_move, second_x_move), chain_axis_moves(y_move, second_y_move), orientation,
+            tuple(count + second_count for count, second_count in zip(headings, second_headings)))
+
+
+def repeat_move(move: ProgramMove, count: int, width: int, height: int) -> ProgramMove:
+    """Move of a program run count times in a row, its end orientation being its start one, by repeated squaring."""
+    repeated = ((0, 0, width - 1), (0, 0, height - 1), move[2], (0, 0, 0, 0))
+    while count:
+        if count & 1:
+            repeated = chain_moves(repeated, move)
+        count >>= 1
+        if count:
+            move = chain_moves(move, move)
+    return repeated
+
+
+def codes_move(codes: bytes, orientation: int, width: int, height: int) -> ProgramMove:
+    """Move of instruction codes run from a start orientation on a lawn.
+
+    Codes are read by macro-ops (see MacroProgram): a run of translations heading one way is one clamped shift.
+    """
+    x_move, y_move = (0, 0, width - 1), (0, 0, height - 1)
+    headings = [0, 0, 0, 0]
+    for match in MACRO_OP_PATTERN.finditer(codes):
+        run = match.group()
+        if run[0] < 2:
+            heading = orientation if run[0] == 0 else orientation ^ 2
+            headings[heading] += len(run)
+            if ORIENTATION_DX[heading]:
+                x_move = chain_axis_moves(x_move, (ORIENTATION_DX[heading] * len(run), 0, width - 1))
+            else:
+                y_move = chain_axis_moves(y_move, (ORIENTATION_DY[heading] * len(run), 0, height - 1))
+        else:
+            orientation = orientation + run.count(3) - run.count(2) & 3
+    return x_move, y_move, orientation, tuple(headings)
+
+
+def apply_move(move: ProgramMove, x: int, y: int) -> Tuple[int, int, int]:
+    """Position (x, y, orientation code) a move leads to from a start cell."""
+    (x_shift, x_low, x_high), (y_shift, y_low, y_high), orientation, _ = move
+    return min(max(x + x_shift, x_low), x_high), min(max(y + y_shift, y_low), y_high), orientation
+
+
+def program_move(program: Union[InstructionTape, ProgramTree], orientation: int, width: int, height: int) -> ProgramMove:
+    """Move of a whole program, a tape from its start or a tree, from a start orientation on a lawn."""
+    if isinstance(program, ProgramTree):
+        return program.move(orientation, width, height)
+    return codes_move(program.codes(0), orientation, width, height)
+
+
+class ProgramTree:
+    """Mower program with repetitions, parsed from the compressed directions syntax.
+
+    A count after a direction letter or a group repeats it, with an optional star: F100, (LFRF)*500,
+    ((FL)3R)2. A tree runs its items, runs of instruction codes and nested trees, count times. It is read as
+    an InstructionTape by the simulations (size, code_at, codes), codes being expanded when asked for.
+
+    The move of a tree from each start orientation on a lawn, borders included, is built from the moves of
+    its items without expanding it, repeats being chained by squaring (see ProgramMove): a mower no other
+    mower can get in the way of is run by run_alone in time proportional to its tree, whatever its count.
+    """
+
+    __slots__ = ('items', 'count', 'pass_size', 'size', 'offsets', 'pass_codes', '_last_item', '_moves')
+    # Trees are read from their start, the cursors of the mowers running them are kept by their fleet
+    cursor = 0
+
+    def __init__(self, items: Iterable[Union[bytes, ProgramTree]], count: int = 1) -> None:
+        self.items: List[Union[bytes, ProgramTree]] = []
+        for item in items:
+            if isinstance(item, ProgramTree) and item.count == 1:
+                self.extend(item.items)
+            else:
+                self.extend((item,))
+        self.count: int = count
+        # Start index of each item in a pass over the items
+        self.offsets: List[int] = []
+        self.pass_size: int = 0
+        for item in self.items:
+            self.offsets.append(self.pass_size)
+            self.pass_size += len(item) if isinstance(item, bytes) else item.size
+        self.size: int = self.pass_size * count
+        # Codes of a pass over the items, when short enough
+        self.pass_codes: Optional[bytes] = None
+        if self.pass_size <= PASS_CODES_LIMIT:
+            self.pass_codes = b''.join(item if isinstance(item, bytes) else item.pass_codes * item.count for item in self.items)
+        # Bounds in a pass of the item read last by code_at, and the item
+        self._last_item: Tuple[int, int, Union[bytes, ProgramTree, None]] = (0, 0, None)
+        # Moves of a pass over the items and of the whole tree, by start orientation and lawn size
+        self._moves: Dict[Tuple[int, int, int, bool], ProgramMove] = {}
+
+    def extend(self, items: Iterable[Union[bytes, ProgramTree]]) -> None:
+        """Append items, merging runs of codes, while building the tree."""
+        for item in items:
+            if isinstance(item, bytes) and self.items and isinstance(self.items[-1], bytes):
+                self.items[-1] += item
+            elif len(item) if isinstance(item, bytes) else item.size:
+                self.items.append(item)
+
+    def append(self, program: ProgramTree) -> None:
+        """Append a program to a tree run once, in place, as the directions lines of a mower are read.
+
+        Items already there keep their offsets, so appending takes time proportional to the program appended.
+        """
+        for item in program.items if program.count == 1 else (program,):
+            size = len(item) if isinstance(item, bytes) else item.size
+            if not size:
+                continue
+            self.items.append(item)
+            self.offsets.append(self.pass_size)
+            self.pass_size += size
+            if self.pass_size > PASS_CODES_LIMIT:
+                self.pass_codes = None
+            elif self.pass_codes is not None:
+                self.pass_codes += item if isinstance(item, bytes) else item.pass_codes * item.count
+        self.size = self.pass_size
+        self._moves.clear()
+
+    @classmethod
+    def parse(cls: ProgramTree, directions: bytes) -> ProgramTree:
+        """Parse directions in the compressed syntax."""
+        # Items of the groups being parsed, outermost first
+        groups: List[List[Union[bytes, ProgramTree]]] = [[]]
+        position, end, counted = 0, len(directions.rstrip()), False
+        while position < end:
+            match = PROGRAM_TOKEN.match(directions, position)
+            if match is None:
+                raise RelativeDirectionError(value=directions, message='Wrong relative direction.')
+            position = match.end()
+            letters, group_start, group_end, count = match.groups()
+            if letters:
+                groups[-1].append(letters.translate(INSTRUCTION_CODES))
+            elif group_start:
+                groups.append([])
+            elif group_end and len(groups) > 1:
+                items = groups.pop()
+                groups[-1].append(cls(items, 1) if items else b'')
+            elif count and groups[-1] and not counted:
+                items = groups[-1]
+                if isinstance(items[-1], bytes):
+                    # Only the last letter is repeated
+                    codes = items.pop()
+                    items.extend((codes[:-1], cls([codes[-1:]], int(count))))
+                else:
+                    items[-1] = cls([items[-1]], int(count))
+            else:
+                raise RelativeDirectionError(value=directions, message='Wrong relative direction.')
+            counted = count is not None
+        if len(groups) > 1:
+            raise RelativeDirectionError(value=directions, message='Wrong relative direction. Group not closed.')
+        program = cls(groups[0], 1)
+        # A single repeated group is the program itself
+        return program.items[0] if len(program.items) == 1 and isinstance(program.items[0], ProgramTree) else program
+
+    @staticmethod
+    def is_plain(directions: bytes) -> bool:
+        """Whether directions are only letters, without counts nor groups."""
+        return not directions.translate(None, PLAIN_DIRECTIONS)
+
+    @classmethod
+    def join(cls: ProgramTree, *programs: Union[InstructionTape, ProgramTree]) -> ProgramTree:
+        """Tree running programs one after the other, tapes from their start."""
+        return cls(program if isinstance(program, ProgramTree) else program.codes(0) for program in programs)
+
+    def pass_move(self, orientation: int, width: int, height: int) -> ProgramMove:
+        """Move of a single pass over the items from a start orientation on a lawn."""
+        key = (orientation, width, height, False)
+        move = self._moves.get(key)
+        if move is None:
+            move = ((0, 0, width - 1), (0, 0, height - 1), orientation, (0, 0, 0, 0))
+            for item in self.items:
+                if isinstance(item, bytes):
+                    move = chain_moves(move, codes_move(item, move[2], width, height))
+                else:
+                    move = chain_moves(move, item.move(move[2], width, height))
+            self._moves[key] = move
+        return move
+
+    def move(self, orientation: int, width: int, height: int) -> ProgramMove:
+        """Move of the whole tree from a start orientation on a lawn.
+
+        Rotations do not depend on positions, so passes from an orientation come back to it after 1, 2 or 4
+        passes: the count is run as repeats of these passes, then the passes left.
+        """
+        key = (orientation, width, height, True)
+        move = self._moves.get(key)
+        if move is None:
+            cycle, passes = self.pass_move(orientation, width, height), 1
+            while cycle[2] != orientation:
+                cycle, passes = chain_moves(cycle, self.pass_move(cycle[2], width, height)), passes + 1
+            move = repeat_move(cycle, self.count // passes, width, height)
+            for _ in range(self.count % passes):
+                move = chain_moves(move, self.pass_move(move[2], width, height))
+            self._moves[key] = move
+        return move
+
+    def run_alone(self, x: int, y: int, orientation: int, width: int, height: int) -> Tuple[int, int, int]:
+        """Final position (x, y, orientation code) of a mower running the tree alone on a lawn."""
+        return apply_move(self.move(orientation, width, height), x, y)
+
+    def code_at(self, index: int) -> int:
+        """Instruction code at an absolute index of the expanded program.
+
+        Simulations read codes in order, the item read last is looked up first.
+        """
+        if self.pass_codes is not None:
+            return self.pass_codes[index % self.pass_size]
+        index %= self.pass_size
+        start, end, item = self._last_item
+        if not start <= index < end:
+            item_index = bisect_right(self.offsets, index) - 1
+            item, start = self.items[item_index], self.offsets[item_index]
+            end = start + (len(item) if isinstance(item, bytes) else item.size)
+            self._last_item = (start, end, item)
+        return item[index - start] if isinstance(item, bytes) else item.code_at(index - start)
+
+    def codes(self, index: Optional[int] = None) -> bytes:
+        """Instruction codes of the expanded program, one per byte, from an absolute index (0 by default)."""
+        if index is not None and index >= self.size:
+            return b''
+        codes = b''.join(item if isinstance(item, bytes) else item.codes() for item in self.items) * self.count
+        return codes[index:] if index else codes
+
+    def digest(self) -> bytes:
+        """Digest of the compressed program, trees written the same have the same one."""
+        return hashlib.sha256(b'tree\n' + str(self).encode('ascii')).digest()
+
+    def key(self) -> str:
+        """Key of the compressed program, trees written the same have the same one, cheaper than digest."""
+        return str(self)
+
+    def packed(self) -> bytes:
+        """Instruction codes of the expanded program packed four per byte (see InstructionTape.packed)."""
+        return InstructionTape(self.codes()).packed()
+
+    def __len__(self) -> int:
+        return self.size
+
+    @classmethod
+    def __get_validators__(cls) -> Iterator[Callable[..., ProgramTree]]:
+        yield cls.validate
+
+    @classmethod
+    def validate(cls: ProgramTree, value: Any) -> ProgramTree:
+        """Pydantic validator, trees are kept as they are."""
+        if isinstance(value, ProgramTree):
+            return value
+        raise TypeError(f'{type(value).__name__} is not a program tree')
+
+    def __str__(self) -> str:
+        text = ''.join(item.translate(b'FBLR' * 64).decode('ascii') if isinstance(item, bytes) else str(item) for item in self.items)
+        if self.count == 1:
+            return text
+        return f'{text}{self.count}' if len(text) == 1 else f'({text})*{self.count}'
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}({str(self)!r})'
@@ -0,0 +1,102 @@
+from __future__ import annotations
+from array import array
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, List, Tuple
+
+from mower.resources.models.fleet_model import Fleet
+from mower.resources.models.lawn_model import LawnModel
+
+
+# Shared arrays: name, typecode and whether there is one item per mower (else see SharedFleet.create)
+SHARED_FLEET_ARRAYS = (
+    ('xs', 'i', True),
+    ('ys', 'i', True),
+    ('orientations', 'B', True),
+    ('cursors', 'q', True),
+    ('starts', 'q', True),
+    ('sizes', 'q', True),
+    ('targets', 'q', True),
+    ('holders', 'q', True),
+    ('outcomes', 'b', True),
+    ('moved', 'b', True),
+    ('cells', 'i', False),
+    ('codes', 'B', False),
+    ('actives', 'q', False),
+)
+
+# Layout of a shared fleet block: offset and number of items of each array, by name
+SharedFleetLayout = Dict[str, Tuple[str, int, int]]
+
+
+class SharedFleet:
+    """Fleet state stored as arrays in one shared memory block, for simulations run by several processes.
+
+    Besides the fleet arrays and the instruction codes (one byte per instruction, each mower program from
+    starts), the block holds the mower on each lawn cell (-1 if free), one active mowers counter per worker
+    and per mower arrays of the round being run.
+    """
+
+    __slots__ = ('memory', 'layout', 'views') + tuple(name for name, _, _ in SHARED_FLEET_ARRAYS)
+
+    def __init__(self, memory: SharedMemory, layout: SharedFleetLayout) -> None:
+        self.memory: SharedMemory = memory
+        self.layout: SharedFleetLayout = layout
+        self.views: List[memoryview] = []
+        for name, (typecode, offset, length) in layout.items():
+            view = memory.buf[offset:offset + length * array(typecode).itemsize].cast(typecode)
+            self.views.append(view)
+            setattr(self, name, view)
+
+    @classmethod
+    def create(cls: SharedFleet, fleet: Fleet, lawn: LawnModel, workers: int) -> SharedFleet:
+        """Copy a fleet to a new shared memory block."""
+        sizes = array('q', (program.size for program in fleet.programs))
+        lengths = {'cells': lawn.width * lawn.height, 'codes': sum(sizes), 'actives': workers}
+        layout: SharedFleetLayout = {}
+        offset = 0
+        for name, typecode, per_mower in SHARED_FLEET_ARRAYS:
+            length = len(fleet) if per_mower else lengths[name]
+            layout[name] = (typecode, offset, length)
+            # Keep every array 8 bytes aligned
+            offset += (length * array(typecode).itemsize + 7) & ~7
+        shared = cls(SharedMemory(create=True, size=max(offset, 1)), layout)
+
+        shared.xs[:] = fleet.xs
+        shared.ys[:] = fleet.ys
+        shared.orientations[:] = fleet.orientations
+        shared.cursors[:] = fleet.cursors
+        shared.sizes[:] = sizes
+        start = 0
+        for index, program in enumerate(fleet.programs):
+            shared.starts[index] = start
+            shared.codes[start:start + program.size] = program.codes(0)
+            start += program.size
+        shared.cells[:] = array('i', [-1]) * lengths['cells']
+        shared.targets[:] = array('q', [-1]) * len(fleet)
+        for index, (x, y) in enumerate(zip(fleet.xs, fleet.ys)):
+            shared.cells[y * lawn.width + x] = index
+        return shared
+
+    @classmethod
+    def attach(cls: SharedFleet, name: str, layout: SharedFleetLayout) -> SharedFleet:
+        """Open a shared fleet created by another process."""
+        return cls(SharedMemory(name=name), layout)
+
+    def pending(self, index: int) -> int:
+        """Number of instructions the mower has still to execute."""
+        return self.sizes[index] - self.cursors[index]
+
+    def write_back(self, fleet: Fleet) -> Fleet:
+        """Copy positions and cursors back to the fleet the shared fleet was created from."""
+        fleet.xs[:] = array('i', self.xs)
+        fleet.ys[:] = array('i', self.ys)
+        fleet.orientations[:] = self.orientations
+        fleet.cursors[:] = array('q', self.cursors)
+        return fleet
+
+    def close(self) -> None:
+        """Close the shared memory block, views of the arrays must not be used anymore."""
+        for view in self.views:
+            view.release()
+        self.views.clear()
+        self.memory.close()
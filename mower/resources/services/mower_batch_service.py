@@ -0,0 +1,128 @@
+import glob
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from mower.mower import Mower
+from mower.resources.models.batch_result_model import BatchResultModel
+
+
+# Files given to a worker at once, so that small files do not cost a round trip to the pool each
+DEFAULT_BATCH_CHUNK_SIZE = 16
+DEFAULT_OUTPUT_SUFFIX = '.out'
+MEGABYTE = 1 << 20
+
+BatchJob = Tuple[str, str]
+
+
+def run_batch_file(job: BatchJob, options: Dict[str, Any]) -> BatchResultModel:
+    """Run the Mower pipeline over one input file, errors are reported in the result instead of raised."""
+    input_filename, output_filename = job
+    result = BatchResultModel(input_filename=input_filename, output_filename=output_filename)
+    start = time.perf_counter()
+    try:
+        result.input_bytes = os.path.getsize(input_filename)
+        mower = Mower(input_filename=input_filename, output_filename=output_filename, stats=True, **options)
+        result.cached = mower.run() is None
+        result.mowers = mower.stats.counters.get('mowers', 0)
+        result.instructions = mower.stats.counters.get('instructions_executed', 0)
+    except Exception as error:
+        # One bad file must not abort the batch
+        result.error = f'{type(error).__name__}: {error}'
+    result.seconds = time.perf_counter() - start
+    return result
+
+
+class MowerBatchService:
+    """Runs the Mower pipeline over many input files in a pool of worker processes.
+
+    Workers are started once per batch and each runs files a chunk at a time, so that imports and process
+    start up are paid once per worker instead of once per file. Failed files are reported with their error,
+    the other files of the batch still run.
+    """
+
+    def __init__(self, workers: Optional[int] = None, chunk_size: int = DEFAULT_BATCH_CHUNK_SIZE, **options: Any) -> None:
+        """Inializer, options are given to each Mower."""
+        self.workers: int = workers or os.cpu_count() or 1
+        self.chunk_size: int = chunk_size
+        self.options: Dict[str, Any] = options
+
+    @staticmethod
+    def expand_inputs(sources: Iterable[str], suffix: str = DEFAULT_OUTPUT_SUFFIX) -> List[str]:
+        """Input files of sources: the files of a directory, the files matching a glob pattern, or a file.
+
+        Files of directories and patterns ending with the output suffix are outputs of a previous batch, they are skipped.
+        """
+        def is_output(filename: str) -> bool:
+            return bool(suffix) and filename.endswith(suffix)
+
+        inputs = []
+        for source in sources:
+            if os.path.isdir(source):
+                inputs.extend(sorted(entry.path for entry in os.scandir(source)
+                                     if entry.is_file() and not entry.name.startswith('.') and not is_output(entry.name)))
+            elif any(character in source for character in '*?['):
+                inputs.extend(sorted(filename for filename in glob.glob(source, recursive=True)
+                                     if os.path.isfile(filename) and not is_output(filename)))
+            else:
+                inputs.append(source)
+        return inputs
+
+    @staticmethod
+    def read_list(lines: Iterable[str]) -> List[str]:
+        """Input files of a list file, one per line, blank lines and # comments skipped."""
+        return [line.strip() for line in lines if line.strip() and not line.lstrip().startswith('#')]
+
+    @staticmethod
+    def jobs(inputs: Iterable[str], output_dir: Optional[str] = None, suffix: str = DEFAULT_OUTPUT_SUFFIX) -> List[BatchJob]:
+        """Input and output filenames, outputs are written next to their input or in output_dir."""
+        return [(input_filename, os.path.join(output_dir or os.path.dirname(input_filename), os.path.basename(input_filename) + suffix))
+                for input_filename in inputs]
+
+    def run(self, jobs: List[BatchJob]) -> List[BatchResultModel]:
+        """Run the jobs of a batch, returns their results in order."""
+        results: List[Optional[BatchResultModel]] = [None] * len(jobs)
+        runnable = []
+        outputs = set()
+        for index, (input_filename, output_filename) in enumerate(jobs):
+            output = os.path.abspath(output_filename)
+            if output in outputs:
+                results[index] = BatchResultModel(input_filename=input_filename, output_filename=output_filename,
+                                                  error='Output file already written by another input of the batch.')
+            else:
+                outputs.add(output)
+                runnable.append(index)
+
+        runnable_jobs = [jobs[index] for index in runnable]
+        if self.workers == 1 or len(runnable_jobs) <= 1:
+            batch_results = map(run_batch_file, runnable_jobs, repeat(self.options))
+            for index, result in zip(runnable, batch_results):
+                results[index] = result
+        else:
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(runnable_jobs))) as executor:
+                batch_results = executor.map(run_batch_file, runnable_jobs, repeat(self.options), chunksize=self.chunk_size)
+                for index, result in zip(runnable, batch_results):
+                    results[index] = result
+        return results
+
+    @staticmethod
+    def summary(results: List[BatchResultModel], seconds: float) -> Dict[str, Any]:
+        """Aggregate counts and throughputs of a batch run in seconds, JSON serializable."""
+        input_bytes = sum(result.input_bytes for result in results if result.ok)
+        mowers = sum(result.mowers for result in results)
+        return {
+            'files': len(results),
+            'succeeded': sum(1 for result in results if result.ok),
+            'failed': sum(1 for result in results if not result.ok),
+            'cached': sum(1 for result in results if result.cached),
+            'input_bytes': input_bytes,
+            'mowers': mowers,
+            'instructions': sum(result.instructions for result in results),
+            'seconds': seconds,
+            'worker_seconds': sum(result.seconds for result in results),
+            'files_per_second': len(results) / seconds if seconds else 0.0,
+            'mowers_per_second': mowers / seconds if seconds else 0.0,
+            'megabytes_per_second': input_bytes / MEGABYTE / seconds if seconds else 0.0,
+        }
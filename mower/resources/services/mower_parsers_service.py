@@ -1,90 +1,355 @@
+import mmap
+import os
 import re
-
+import sys
 from abc import ABC, abstractmethod
-from typing import Tuple, Dict
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from typing import BinaryIO, Iterable, Iterator, List, Optional, Tuple, Union
 
+from mower.resources.models.binary_fleet_model import BinaryFleetFile
+from mower.resources.models.fleet_model import Fleet
+from mower.resources.models.instruction_tape import InstructionTape
 from mower.resources.models.lawn_model import LawnModel
-from mower.resources.models.mower_model import MowerModel, MowerPosition
-from mower.resources.models.directions import OrdinalDirection
+from mower.resources.models.mower_model import MowerModel
+from mower.resources.models.occupancy_model import OccupancyGrid, SparseOccupancyGrid
 from mower.resources.models.position_model import Position
-from mower.utils.exceptions import LoadFileParserError
+from mower.resources.models.program_table_model import ProgramTable
+from mower.resources.models.program_tree_model import ProgramTree
+from mower.utils.exceptions import LoadFileParserError, RelativeDirectionError
+
+
+# Target size of the chunks parsed by each worker of ParallelFileMowerParserService (32 MB)
+PARALLEL_CHUNK_SIZE = 1 << 25
+# Size of the blocks read when counting lines of a mapped file (16 MB)
+PARALLEL_BLOCK_SIZE = 1 << 24
 
 
 class MowerParserService(ABC):
     """Parser Base Class."""
+    # Number of lines read by the last parse, None when the input has no lines
+    lines_parsed: Optional[int] = None
+
     @abstractmethod
-    def parse(self) -> Tuple[Dict[Position, MowerModel], LawnModel]:
+    def parse(self) -> Tuple[Fleet, LawnModel]:
         pass
 
+    def stream(self) -> Tuple[LawnModel, Iterator[MowerModel]]:
+        """Lawn and mowers of the input, mowers being yielded as they are parsed. By default the whole input is parsed first."""
+        fleet, lawn = self.parse()
+        return lawn, iter(fleet.to_models())
+
 
 class FileMowerParserService(MowerParserService):
-    """Implementation of file MowerParserService."""
-    EMPTY_LINE_PATTERN = re.compile(r'^\s*$')
-    LAWN_LINE_PATTERN = re.compile(r'^([\s]*)([0-9]+?)([\s]+)([0-9]+?)([\s]*)$')
-    MOWER_INITIAL_POSITION_LINE_PATTERN = re.compile(r'^([\s]*)([0-9]+?)([\s]+)([0-9]+?)([\s]+)([NSWE])([\s]*)$')
-    MOWER_DIRECTIONS_LINE_PATTERN = re.compile(r'^([LFBR\s]*)$')
+    """Implementation of file MowerParserService.
 
-    def __init__(self, filename: str) -> None:
+    The file is read once, line by line, as bytes. Each line is dispatched on its first non blank byte:
+    digits start the lawn line and then mower position lines, anything else is a directions line.
+    Compressed, directions lines may repeat letters and groups (see ProgramTree). Mowers with the same
+    directions share one program (see ProgramTable).
+    """
+    # Orientation letters, indexed by orientation code
+    ORIENTATIONS = b'NESW'
+
+    def __init__(self, filename: str, compressed: bool = False) -> None:
         self.filename: str = filename
+        self.compressed: bool = compressed
 
     @staticmethod
-    def parse_lawn(line: str) -> LawnModel:
-        """Parse lawn string."""
-        return LawnModel.from_str(line)
+    def parse_lawn(line: bytes) -> LawnModel:
+        """Parse lawn line."""
+        tokens = line.split()
+        if len(tokens) != 2 or not tokens[0].isdigit() or not tokens[1].isdigit():
+            raise LoadFileParserError(value=line, message='Error while parsing input Mower file. Wrong Lawn params.')
+        return LawnModel(height=int(tokens[0]), width=int(tokens[1]))
 
     @staticmethod
-    def parse_mower_position(mowers: Dict[Position, MowerModel], lawn: LawnModel, line: str) -> Tuple[Position, Dict[Position, MowerModel]]:
-        """Parse mower position string."""
-        x, y, o = MowerModel.position_from_str(line)
-        if x > lawn.width or y > lawn.height or y <= 0 or x <= 0:
+    def parse_mower_position(fleet: Fleet, occupancy: OccupancyGrid, lawn: LawnModel, line: bytes) -> Fleet:
+        """Parse mower position line."""
+        tokens = line.split()
+        if len(tokens) != 3 or not tokens[0].isdigit() or not tokens[1].isdigit() or len(tokens[2]) != 1 \
+                or tokens[2] not in FileMowerParserService.ORIENTATIONS:
+            raise LoadFileParserError(value=line, message='Error while parsing input Mower file. Wrong Mower position params.')
+        x, y = int(tokens[0]), int(tokens[1])
+        if x >= lawn.width or y >= lawn.height:
             raise LoadFileParserError(value=line,
                                       message=f'Error while parsing input Mower file. Mower is outside the Lawn.')
-        if (pos_xy := Position(x, y)) not in mowers:
-            mowers[pos_xy] = MowerModel(position=(x, y, o))
-            return pos_xy, mowers
-        else:
+        if occupancy.occupied(x, y):
             raise LoadFileParserError(value=line,
-                                      message=f'Error while parsing input Mower file. Two mowers with the same position: {pos_xy}.')
+                                      message=f'Error while parsing input Mower file. Two mowers with the same position: {Position(x, y)}.')
+        occupancy.occupy(x, y)
+        fleet.add(x, y, FileMowerParserService.ORIENTATIONS.index(tokens[2]))
+        return fleet
 
     @staticmethod
-    def parse_mower_directions(mowers: Dict[Position, MowerModel], pos_xy: Position, line: str) -> Dict[Position, MowerModel]:
-        """Parse mower directions string."""
+    def parse_mower_directions(fleet: Fleet, line: bytes, compressed: bool = False) -> Fleet:
+        """Parse mower directions line, directions belong to the last declared mower.
+
+        Compressed directions lines with counts or groups turn the program of the mower into a ProgramTree,
+        the next lines are appended to it.
+        """
+        program = None
         try:
-            mowers[pos_xy] = MowerModel.extend_directions_from_str(mowers[pos_xy], line)
-            return mowers
-        except KeyError:
+            if compressed and (fleet.programs and isinstance(fleet.programs[-1], ProgramTree) or not ProgramTree.is_plain(line)):
+                program = ProgramTree.parse(line)
+            else:
+                codes = InstructionTape.codes_from_str(line)
+        except RelativeDirectionError:
+            raise LoadFileParserError(value=line, message='Error while parsing input Mower file. Wrong Mower directions.')
+        if not fleet.programs:
             raise LoadFileParserError(value=line,
                                       message='Error while parsing input Mower file. No mower initial position has been declared.')
+        if program is not None and isinstance(fleet.programs[-1], ProgramTree) and fleet.programs[-1].count == 1:
+            fleet.programs[-1].append(program)
+        elif program is not None:
+            fleet.programs[-1] = ProgramTree.join(fleet.programs[-1], program)
+        else:
+            fleet.programs[-1].extend_codes(codes)
+        return fleet
 
-    def parse(self) -> Tuple[Dict[Position, MowerModel], LawnModel]:
-        """Load mowers and lanw from file."""
-        mowers: Dict[Position, MowerModel] = dict()
-        lawn: LawnModel = None
-        lawn_params_is_set: bool = False
-        mower_position_xy: Position = None
-        with open(self.filename, 'rt') as mower_file:
-            for line in mower_file:
-                if self.EMPTY_LINE_PATTERN.match(line):
+    @staticmethod
+    def parse_lines(lines: Iterable[bytes], fleet: Fleet, occupancy: Optional[OccupancyGrid] = None,
+                    lawn: Optional[LawnModel] = None, compressed: bool = False,
+                    programs: Optional[ProgramTable] = None) -> Tuple[Fleet, OccupancyGrid, LawnModel, int]:
+        """Parse mower file lines, errors are raised with the number of the line in lines (from 1).
+
+        Returns the fleet, the occupancy grid, the lawn and the number of lines read. With programs, each mower
+        gets the shared program of its directions once they are all read.
+        """
+        line_number: int = 0
+        try:
+            for line_number, line in enumerate(lines, 1):
+                first = line.lstrip()[:1]
+                if not first:
                     # Skip empty line
                     continue
-                if self.LAWN_LINE_PATTERN.match(line) and not lawn_params_is_set:
+                if not first.isdigit():
+                    if lawn is None:
+                        raise LoadFileParserError(value=line, message='Error while parsing input Mower file. No Lawn params.')
+                    FileMowerParserService.parse_mower_directions(fleet, line, compressed)
+                elif lawn is not None:
+                    if programs is not None and len(fleet):
+                        fleet.programs[-1] = programs.intern(fleet.programs[-1])
+                    FileMowerParserService.parse_mower_position(fleet, occupancy, lawn, line)
+                else:
                     lawn = FileMowerParserService.parse_lawn(line)
-                    lawn_params_is_set = True
-                elif self.MOWER_INITIAL_POSITION_LINE_PATTERN.match(line) and lawn_params_is_set:
-                    mower_position_xy, mowers = FileMowerParserService.parse_mower_position(mowers, lawn, line)
-                elif self.MOWER_DIRECTIONS_LINE_PATTERN.match(line) and lawn_params_is_set:
-                    mowers = FileMowerParserService.parse_mower_directions(mowers, mower_position_xy, line)
+                    occupancy = OccupancyGrid.for_lawn(lawn.width, lawn.height)
+        except LoadFileParserError as error:
+            raise LoadFileParserError(value=error.value, message=error.message, line_number=line_number) from error
+        if programs is not None and len(fleet):
+            fleet.programs[-1] = programs.intern(fleet.programs[-1])
+        return fleet, occupancy, lawn, line_number
+
+    @staticmethod
+    def stream_lines(lines: Iterable[bytes], compressed: bool = False) -> Iterator[Union[LawnModel, MowerModel]]:
+        """Parse mower file lines lazily, yields the lawn then each mower once all its directions are read.
+
+        A mower is yielded when the next position line or the end of the lines is read: only the mower being
+        read and the occupancy grid of the start positions are kept.
+        """
+        lawn: LawnModel = None
+        occupancy: OccupancyGrid = None
+        fleet: Fleet = Fleet()
+        line_number: int = 0
+        try:
+            for line_number, line in enumerate(lines, 1):
+                first = line.lstrip()[:1]
+                if not first:
+                    # Skip empty line
+                    continue
+                if not first.isdigit():
+                    if lawn is None:
+                        raise LoadFileParserError(value=line, message='Error while parsing input Mower file. No Lawn params.')
+                    FileMowerParserService.parse_mower_directions(fleet, line, compressed)
+                elif lawn is not None:
+                    if len(fleet):
+                        yield fleet.to_models()[0]
+                        fleet = Fleet()
+                    FileMowerParserService.parse_mower_position(fleet, occupancy, lawn, line)
                 else:
-                    raise LoadFileParserError(value=line, message='Error while parsing input Mower file.')
+                    lawn = FileMowerParserService.parse_lawn(line)
+                    occupancy = OccupancyGrid.for_lawn(lawn.width, lawn.height)
+                    yield lawn
+        except LoadFileParserError as error:
+            raise LoadFileParserError(value=error.value, message=error.message, line_number=line_number) from error
         if lawn is None:
             raise LoadFileParserError(value=lawn, message='Error while parsing input Mower file. Empty input file.')
-        return mowers, lawn
+        if len(fleet):
+            yield fleet.to_models()[0]
+
+    @staticmethod
+    def split_stream(records: Iterator[Union[LawnModel, MowerModel]]) -> Tuple[LawnModel, Iterator[MowerModel]]:
+        """Split records of stream_lines into the lawn and the mowers."""
+        return next(records), records
+
+    def stream_file(self) -> Iterator[Union[LawnModel, MowerModel]]:
+        """Records of the file, see stream_lines, the file is closed once they are all read."""
+        with open(self.filename, 'rb') as mower_file:
+            yield from FileMowerParserService.stream_lines(mower_file, self.compressed)
+
+    def stream(self) -> Tuple[LawnModel, Iterator[MowerModel]]:
+        """Lawn and mowers of the file, mowers being parsed as they are iterated over."""
+        return FileMowerParserService.split_stream(self.stream_file())
+
+    def parse(self) -> Tuple[Fleet, LawnModel]:
+        """Load mowers and lanw from file."""
+        with open(self.filename, 'rb') as mower_file:
+            fleet, _, lawn, self.lines_parsed = FileMowerParserService.parse_lines(mower_file, Fleet(), compressed=self.compressed,
+                                                                                   programs=ProgramTable())
+        if lawn is None:
+            raise LoadFileParserError(value=lawn, message='Error while parsing input Mower file. Empty input file.')
+        return fleet, lawn
+
+
+def count_lines(buffer: mmap.mmap, end: int) -> int:
+    """Count the lines of a mapped file before an offset."""
+    lines, offset = 0, 0
+    while offset < end:
+        block = min(end - offset, PARALLEL_BLOCK_SIZE)
+        lines += buffer[offset:offset + block].count(b'\n')
+        offset += block
+    return lines
+
+
+def read_lines(buffer: mmap.mmap, start: int, end: int) -> Iterator[bytes]:
+    """Iterate over the lines of a mapped file between two offsets, end must be a line start."""
+    buffer.seek(start)
+    while buffer.tell() < end:
+        yield buffer.readline()
+
+
+def parse_file_chunk(filename: str, start: int, end: int, lawn: LawnModel) -> Tuple[Fleet, int, Optional[Tuple[bytes, str, int]]]:
+    """Parse the mowers of a file chunk, run in a worker process.
+
+    Returns the chunk fleet, up to the first error if any, its number of lines, and the value, message and
+    chunk line number of this error: exceptions are not sent back as is since MowerError cannot be unpickled.
+    """
+    fleet = Fleet()
+    # Only the mowers of the chunk are recorded, positions are checked against the other chunks when merging
+    occupancy = SparseOccupancyGrid(lawn.width, lawn.height)
+    with open(filename, 'rb') as mower_file, mmap.mmap(mower_file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+        try:
+            lines = FileMowerParserService.parse_lines(read_lines(buffer, start, end), fleet, occupancy, lawn, programs=ProgramTable())[3]
+        except LoadFileParserError as error:
+            return fleet, error.line_number, (error.value, error.__cause__.message, error.line_number)
+    return fleet, lines, None
+
+
+class ParallelFileMowerParserService(FileMowerParserService):
+    """Implementation of file MowerParserService for very large files.
+
+    The file is memory mapped and split into chunks at mower boundaries (a position line followed by its
+    directions lines). Chunks are parsed by worker processes and merged in order, checking start positions
+    across chunks. Small files are parsed sequentially.
+    """
+    # Position lines are the only lines, after the lawn one, starting with a digit
+    POSITION_LINE_START = re.compile(rb'\n[ \t\r\x0b\x0c]*[0-9]')
+    FIRST_NON_BLANK = re.compile(rb'[^ \t\n\r\x0b\x0c]')
+
+    def __init__(self, filename: str, workers: Optional[int] = None, chunk_size: int = PARALLEL_CHUNK_SIZE) -> None:
+        super().__init__(filename)
+        self.workers: int = workers or os.cpu_count() or 1
+        self.chunk_size: int = chunk_size
+
+    def split(self, buffer: mmap.mmap, start: int) -> List[Tuple[int, int]]:
+        """Split a mapped file from an offset into chunks starting on position lines."""
+        chunks: List[Tuple[int, int]] = []
+        end = len(buffer)
+        while start < end:
+            match = self.POSITION_LINE_START.search(buffer, max(start + self.chunk_size, 1) - 1)
+            chunk_end = match.start() + 1 if match else end
+            chunks.append((start, chunk_end))
+            start = chunk_end
+        return chunks
+
+    def locate_mower(self, buffer: mmap.mmap, start: int, end: int, index: int) -> int:
+        """Line number of the position line of the index-th mower of a chunk."""
+        lines = count_lines(buffer, start)
+        for line_number, line in enumerate(read_lines(buffer, start, end), lines + 1):
+            if line.lstrip()[:1].isdigit():
+                if not index:
+                    return line_number
+                index -= 1
+        return lines
+
+    def parse(self) -> Tuple[Fleet, LawnModel]:
+        """Load mowers and lanw from file, in parallel."""
+        if self.workers <= 1 or os.path.getsize(self.filename) <= self.chunk_size:
+            return super().parse()
+        with open(self.filename, 'rb') as mower_file, mmap.mmap(mower_file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            # Parse the head of the file, up to the lawn line, sequentially
+            first = self.FIRST_NON_BLANK.search(buffer)
+            head_end = len(buffer) if first is None else buffer.find(b'\n', first.start()) + 1 or len(buffer)
+            fleet, _, lawn, self.lines_parsed = FileMowerParserService.parse_lines(read_lines(buffer, 0, head_end), Fleet())
+            if lawn is None:
+                raise LoadFileParserError(value=lawn, message='Error while parsing input Mower file. Empty input file.')
+
+            chunks = self.split(buffer, head_end)
+            if not chunks:
+                # Lawn without mowers
+                return fleet, lawn
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(chunks))) as executor:
+                results = executor.map(parse_file_chunk, repeat(self.filename), *zip(*chunks), repeat(lawn))
+                occupancy: Optional[OccupancyGrid] = None
+                # Programs are shared in each chunk by its worker, and across chunks here
+                programs = ProgramTable()
+                for (start, end), (chunk_fleet, lines, error) in zip(chunks, results):
+                    if occupancy is None:
+                        occupancy = OccupancyGrid.for_lawn(lawn.width, lawn.height, len(chunk_fleet) * len(chunks))
+                    for index, (x, y) in enumerate(zip(chunk_fleet.xs, chunk_fleet.ys)):
+                        if occupancy.occupied(x, y):
+                            raise LoadFileParserError(
+                                value=f'{x} {y}',
+                                message=f'Error while parsing input Mower file. Two mowers with the same position: {Position(x, y)}.',
+                                line_number=self.locate_mower(buffer, start, end, index))
+                        occupancy.occupy(x, y)
+                    if error is not None:
+                        value, message, line_number = error
+                        raise LoadFileParserError(value=value, message=message, line_number=count_lines(buffer, start) + line_number)
+                    fleet.extend(programs.intern_fleet(chunk_fleet))
+                    self.lines_parsed += lines
+        return fleet, lawn
+
+
+class BinaryMowerParserService(MowerParserService):
+    """Implementation of binary file MowerParserService (see BinaryFleetFile).
+
+    Binary files are written from already validated fleets, they are checked again when opened, as a file
+    can be changed on disk since it was written.
+    """
+    def __init__(self, filename: str) -> None:
+        self.filename: str = filename
+
+    def parse(self) -> Tuple[Fleet, LawnModel]:
+        """Load mowers and lawn from binary file."""
+        with BinaryFleetFile.open(self.filename) as fleet_file:
+            return fleet_file.to_fleet(), fleet_file.lawn()
 
 
 class StdinMowerParserService(MowerParserService):
-    """Class Stdin Mower Parser Service."""
-    def parse(self) -> Tuple[Dict[Position, MowerModel], LawnModel]:
+    """Implementation of stdin MowerParserService.
+
+    Stdin is read line by line as bytes, as files are (see FileMowerParserService). Streamed, mowers are
+    yielded as soon as their directions are read, so that they can be simulated while the input is written.
+    """
+    def __init__(self, input_stream: Optional[BinaryIO] = None, compressed: bool = False) -> None:
+        self.input_stream: Optional[BinaryIO] = input_stream
+        self.compressed: bool = compressed
+
+    def lines(self) -> BinaryIO:
+        """Binary stream read, stdin by default."""
+        if self.input_stream is not None:
+            return self.input_stream
+        return getattr(sys.stdin, 'buffer', sys.stdin)
+
+    def parse(self) -> Tuple[Fleet, LawnModel]:
         """Load mowers and lanw from stdin."""
-        mowers: Dict[Position, MowerModel] = dict()
-        lawn: LawnModel = None
-        return mowers, lawn
+        fleet, _, lawn, self.lines_parsed = FileMowerParserService.parse_lines(self.lines(), Fleet(), compressed=self.compressed,
+                                                                               programs=ProgramTable())
+        if lawn is None:
+            raise LoadFileParserError(value=lawn, message='Error while parsing input Mower file. Empty input file.')
+        return fleet, lawn
+
+    def stream(self) -> Tuple[LawnModel, Iterator[MowerModel]]:
+        """Lawn and mowers of stdin, mowers being parsed as they are iterated over."""
+        return FileMowerParserService.split_stream(FileMowerParserService.stream_lines(self.lines(), self.compressed))
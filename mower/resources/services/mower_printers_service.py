@@ -1,13 +1,164 @@
+import io
+import shutil
+import sys
 from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import BinaryIO, Iterator, Optional
+
+from mower.resources.models.binary_fleet_model import BinaryFleetFile
+from mower.resources.models.fleet_model import Fleet
+from mower.resources.models.lawn_model import LawnModel
+from mower.utils.exceptions import MowerPrinterError
+
+
+# Size of the chunks of result lines written at once (1 MB)
+DEFAULT_BUFFER_SIZE = 1 << 20
+# Translation tables from orientation codes to orientation letters and from instruction codes to direction letters
+ORIENTATION_LETTERS = bytes(b'NESW'[code & 3] for code in range(256))
+DIRECTION_LETTERS = bytes(b'FBLR'[code & 3] for code in range(256))
+RESULT_LINE_FORMAT = b'%d %d %c\n'
+# Approximative size of a result line, used to size chunks
+RESULT_LINE_BYTES = 16
 
 
 class MowerPrinterService(ABC):
-    pass
+    """Printer Base Class.
+
+    Final positions are written as "x y O" lines, in input order. Lines are formatted a chunk of mowers at a
+    time and each chunk is written at once, so that a fleet is written in a few large writes.
+    """
+    def __init__(self, buffer_size: int = DEFAULT_BUFFER_SIZE) -> None:
+        self.buffer_size: int = buffer_size
+
+    @staticmethod
+    def format_lines(fleet: Fleet, start: int = 0, end: Optional[int] = None) -> bytes:
+        """Format the result lines of the mowers of a fleet between two indexes."""
+        end = len(fleet) if end is None else end
+        letters = fleet.orientations[start:end].translate(ORIENTATION_LETTERS)
+        return b''.join(map(RESULT_LINE_FORMAT.__mod__, zip(fleet.xs[start:end], fleet.ys[start:end], letters)))
+
+    def write(self, stream: BinaryIO, fleet: Fleet) -> int:
+        """Write the result lines of a fleet to a binary stream, returns the number of bytes written."""
+        chunk = max(self.buffer_size // RESULT_LINE_BYTES, 1)
+        written = 0
+        for start in range(0, len(fleet), chunk):
+            written += stream.write(MowerPrinterService.format_lines(fleet, start, start + chunk))
+        return written
+
+    @abstractmethod
+    def print(self, fleet: Fleet, lawn: Optional[LawnModel] = None) -> None:
+        pass
+
+    def print_stored(self, stored: BinaryIO) -> None:
+        """Write result lines already formatted, as stored by a ResultCache."""
+        raise MowerPrinterError(value=type(self).__name__, message='Stored results can not be written by this printer.')
+
+    @contextmanager
+    def open(self) -> Iterator[BinaryIO]:
+        """Binary stream to write result lines to as they come, flushed and closed once the context exits."""
+        raise MowerPrinterError(value=type(self).__name__, message='Results can not be streamed by this printer.')
+        yield
 
 
 class FileMowerPrinterService(MowerPrinterService):
-    pass
+    """Implementation of file MowerPrinterService."""
+    def __init__(self, output_filename: str, buffer_size: int = DEFAULT_BUFFER_SIZE) -> None:
+        super().__init__(buffer_size)
+        self.output_filename: str = output_filename
+
+    def print(self, fleet: Fleet, lawn: Optional[LawnModel] = None) -> None:
+        """Write mowers final positions to file."""
+        with open(self.output_filename, 'wb', buffering=self.buffer_size) as output_file:
+            self.write(output_file, fleet)
+
+    def print_stored(self, stored: BinaryIO) -> None:
+        """Copy stored result lines to file."""
+        with open(self.output_filename, 'wb') as output_file:
+            shutil.copyfileobj(stored, output_file, self.buffer_size)
+
+    @contextmanager
+    def open(self) -> Iterator[BinaryIO]:
+        """Output file, opened for result lines to be written as they come."""
+        with open(self.output_filename, 'wb', buffering=self.buffer_size) as output_file:
+            yield output_file
 
 
 class StdoutMowerPrinterService(MowerPrinterService):
-    pass
+    """Implementation of stdout MowerPrinterService."""
+    def print(self, fleet: Fleet, lawn: Optional[LawnModel] = None) -> None:
+        """Write mowers final positions to stdout."""
+        sys.stdout.flush()
+        stream = getattr(sys.stdout, 'buffer', None)
+        if stream is None:
+            # Text only stdout, as when replaced by a StringIO
+            sys.stdout.write(MowerPrinterService.format_lines(fleet).decode('ascii'))
+        else:
+            self.write(stream, fleet)
+            stream.flush()
+
+    def print_stored(self, stored: BinaryIO) -> None:
+        """Copy stored result lines to stdout."""
+        sys.stdout.flush()
+        stream = getattr(sys.stdout, 'buffer', None)
+        if stream is None:
+            for chunk in iter(lambda: stored.read(self.buffer_size), b''):
+                sys.stdout.write(chunk.decode('ascii'))
+        else:
+            shutil.copyfileobj(stored, stream, self.buffer_size)
+            stream.flush()
+
+    @contextmanager
+    def open(self) -> Iterator[BinaryIO]:
+        """Stdout, for result lines to be written as they come."""
+        sys.stdout.flush()
+        stream = getattr(sys.stdout, 'buffer', None)
+        if stream is None:
+            # Text only stdout, lines are written once all are there
+            lines = io.BytesIO()
+            yield lines
+            sys.stdout.write(lines.getvalue().decode('ascii'))
+        else:
+            yield stream
+            stream.flush()
+
+
+class TextFleetPrinterService(MowerPrinterService):
+    """Implementation of MowerPrinterService writing mowers back in the text input format.
+
+    Each mower is written with its pending directions, so that the file can be parsed again.
+    """
+    def __init__(self, output_filename: str, buffer_size: int = DEFAULT_BUFFER_SIZE) -> None:
+        super().__init__(buffer_size)
+        self.output_filename: str = output_filename
+
+    @staticmethod
+    def format_mowers(fleet: Fleet, start: int = 0, end: Optional[int] = None) -> bytes:
+        """Format the position and directions lines of the mowers of a fleet between two indexes."""
+        end = len(fleet) if end is None else end
+        letters = fleet.orientations[start:end].translate(ORIENTATION_LETTERS)
+        directions = (fleet.programs[index].codes(fleet.cursors[index]).translate(DIRECTION_LETTERS) for index in range(start, end))
+        return b''.join(map(b'%d %d %c\n%s\n'.__mod__, zip(fleet.xs[start:end], fleet.ys[start:end], letters, directions)))
+
+    def print(self, fleet: Fleet, lawn: Optional[LawnModel] = None) -> None:
+        """Write lawn and mowers to file."""
+        if lawn is None:
+            raise MowerPrinterError(value=self.output_filename, message='A lawn is needed to write mowers in the text input format.')
+        chunk = max(self.buffer_size // RESULT_LINE_BYTES, 1)
+        with open(self.output_filename, 'wb', buffering=self.buffer_size) as output_file:
+            output_file.write(b'%d %d\n' % (lawn.height, lawn.width))
+            for start in range(0, len(fleet), chunk):
+                output_file.write(TextFleetPrinterService.format_mowers(fleet, start, start + chunk))
+
+
+class BinaryMowerPrinterService(MowerPrinterService):
+    """Implementation of MowerPrinterService writing mowers in binary format (see BinaryFleetFile)."""
+    def __init__(self, output_filename: str, buffer_size: int = DEFAULT_BUFFER_SIZE) -> None:
+        super().__init__(buffer_size)
+        self.output_filename: str = output_filename
+
+    def print(self, fleet: Fleet, lawn: Optional[LawnModel] = None) -> None:
+        """Write lawn and mowers to binary file."""
+        if lawn is None:
+            raise MowerPrinterError(value=self.output_filename, message='A lawn is needed to write mowers in binary format.')
+        with open(self.output_filename, 'wb', buffering=self.buffer_size) as output_file:
+            BinaryFleetFile.write(output_file, fleet, lawn)
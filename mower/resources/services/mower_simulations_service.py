@@ -1,47 +1,936 @@
+import asyncio
+import heapq
+import multiprocessing
+import os
 from abc import ABC, abstractmethod
-from typing import Set, Tuple, Dict
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from threading import BrokenBarrierError
+from typing import AsyncIterable, Dict, Iterable, List, Optional, Set, Tuple
 
-from mower.resources.models.directions import RelativeDirection, OrdinalDirection
+from mower.resources.models.directions import RelativeDirection
+from mower.resources.models.fleet_model import Fleet
+from mower.resources.models.fleet_snapshot_model import FleetCheckpoints
 from mower.resources.models.lawn_model import LawnModel, LawnDimensions
+from mower.resources.models.macro_program_model import MacroProgram, MACRO_RUN, MACRO_TURN
+from mower.resources.models.movement_table import MOVE_DX, MOVE_DY, step, step_arrays
 from mower.resources.models.mower_model import MowerModel
-from mower.resources.models.position_model import Position
+from mower.resources.models.occupancy_model import OccupancyGrid, AsyncOccupancyGrid, BitmapOccupancyGrid, SortedOccupancyIndex
+from mower.resources.models.program_tree_model import ProgramTree, ProgramMove, apply_move, program_move
+from mower.resources.models.shared_fleet_model import SharedFleet, SharedFleetLayout
+from mower.utils.exceptions import MowerSimulationError
+from mower.utils.mower_stats import MowerStats
+
+# numpy is optional and slow to import, it is imported once a VectorizedMowerSimulationService is built
+np = None
+
+
+def check_no_program_trees(fleet: Fleet, engine: str) -> None:
+    """Raise when mowers run program trees, for the simulations reading whole programs that would expand them."""
+    if any(isinstance(program, ProgramTree) for program in fleet.programs):
+        raise MowerSimulationError(value=engine, message=f'The {engine} simulation can not run directions with counts or groups, '
+                                                         'run them with the sync, async or parallel one.')
+
+
+def import_numpy() -> bool:
+    """Import numpy for the vectorized simulation, returns whether it is installed."""
+    global np
+    if np is None:
+        try:
+            import numpy
+        except ImportError:  # pragma: no cover
+            return False
+        np = numpy
+    return True
+
+
+# Fleets with less pending instructions are simulated in process by ParallelMowerSimulationService
+PARALLEL_MIN_INSTRUCTIONS = 1 << 16
+# Mowers are run alone only when their reachable boxes cover at most this many times the lawn, in crowded
+# fleets hardly any mower is alone and grouping them costs more than it saves
+RUN_ALONE_MAX_COVERAGE = 1.0
+
 
 class MowerSimulationService(ABC):
     """Simulation Base Class."""
+    # Counters of the run (blocked_moves) and its contention are added to stats when set
+    stats: Optional[MowerStats] = None
+    # Fleet snapshots are written along the run when set, by the simulations running all mowers round by round
+    checkpoints: Optional[FleetCheckpoints] = None
+
     @abstractmethod
-    def run(self, mowers: Dict[Position, MowerModel], lawn: LawnModel) -> Set[MowerModel]:
+    def run(self, fleet: Fleet, lawn: LawnModel) -> Fleet:
         pass
 
+    async def run_stream(self, mowers: AsyncIterable[MowerModel], lawn: LawnModel, results: Optional[asyncio.Queue] = None,
+                         window: Optional[int] = None) -> int:
+        """Run simulation with mowers coming from an asynchronous stream, see AsyncMowerSimulationService."""
+        raise MowerSimulationError(value=type(self).__name__, message='This simulation can not run mowers coming from a stream.')
+
 
 class SyncMowerSimulationService(MowerSimulationService):
     """Synchronous simulation class."""
     @staticmethod
-    def move_mower(mowers: Dict[Position, MowerModel], mower: MowerModel, lawn_dims: LawnDimensions) -> Dict[Position, MowerModel]:
+    def move_mower(occupancy: OccupancyGrid, fleet: Fleet, index: int, lawn_dims: LawnDimensions,
+                   stats: Optional[MowerStats] = None) -> OccupancyGrid:
         """Mover mower in lawn."""
-        direction = mower.directions.pop(0)
-        position = mower.position
-        if direction in (RelativeDirection.FRONT, RelativeDirection.BACK):
-            position = MowerModel.translate_mower_position(position, 1, direction, lawn_dims)
-        elif direction in (RelativeDirection.LEFT, RelativeDirection.RIGHT):
-            position = MowerModel.rotate_mower_position(position, direction)
-        if (pos := position.x, position.y) in mowers:
-            mower.position = position
-            mowers[pos] = mower
-        return mowers
-
-    def run(self, mowers: Dict[Position, MowerModel], lawn: LawnModel) -> Set[MowerModel]:
-        """Run simulation with in a lawn with several mowers."""
-        output_mowers: Set[MowerModel] = set()
-        while len(mowers) > len(output_mowers):
-            for mower in mowers:
-                if not mower.directions:
-                    output_mowers.add(mower)
+        code = fleet.programs[index].code_at(fleet.cursors[index])
+        fleet.cursors[index] += 1
+        x, y = fleet.xs[index], fleet.ys[index]
+        to_x, to_y, fleet.orientations[index] = step(x, y, fleet.orientations[index], code, lawn_dims.w, lawn_dims.h)
+        if to_x == x and to_y == y:
+            return occupancy
+        if not occupancy.occupied(to_x, to_y):
+            # Moves into an occupied cell are dropped
+            occupancy.move(x, y, to_x, to_y)
+            fleet.xs[index], fleet.ys[index] = to_x, to_y
+        elif stats is not None:
+            stats.blocked(index, to_x, to_y)
+        return occupancy
+
+    @staticmethod
+    def build_occupancy(fleet: Fleet, lawn: LawnModel) -> OccupancyGrid:
+        """Build the occupancy grid of the fleet in the lawn."""
+        occupancy = OccupancyGrid.for_lawn(lawn.width, lawn.height, len(fleet))
+        for x, y in zip(fleet.xs, fleet.ys):
+            occupancy.occupy(x, y)
+        return occupancy
+
+    @staticmethod
+    def run_alone(fleet: Fleet, lawn: LawnModel) -> None:
+        """Move at once to their final position the mowers no other mower can get in the way of.
+
+        Such a mower is alone in its interaction group (see ParallelMowerSimulationService.interaction_groups),
+        it ends where it would running alone on the lawn whatever the rounds of the other mowers. Moves are
+        computed once per program and start orientation (see program_move), mowers sharing a program (see
+        ProgramTable) are then moved in constant time. Crowded fleets are left as they are (see
+        RUN_ALONE_MAX_COVERAGE).
+        """
+        lawn_dims = lawn.as_tuple()
+        moves: Dict[Tuple[int, int], ProgramMove] = {}
+        boxes = [ParallelMowerSimulationService.reachable_box(fleet, index, lawn_dims, moves) for index in range(len(fleet))]
+        coverage = sum((x1 - x0 + 1) * (y1 - y0 + 1) for x0, y0, x1, y1 in boxes)
+        if coverage > RUN_ALONE_MAX_COVERAGE * lawn_dims.w * lawn_dims.h:
+            return
+        for group in ParallelMowerSimulationService.interaction_groups(fleet, lawn, moves, boxes):
+            index = group[0]
+            if len(group) == 1 and not fleet.cursors[index]:
+                move = ParallelMowerSimulationService.program_move(fleet, index, lawn_dims, moves)
+                fleet.xs[index], fleet.ys[index], fleet.orientations[index] = apply_move(move, fleet.xs[index], fleet.ys[index])
+                fleet.cursors[index] = fleet.programs[index].size
+
+    def run(self, fleet: Fleet, lawn: LawnModel) -> Fleet:
+        """Run simulation with in a lawn with several mowers.
+
+        Every round each mower with pending directions executes one of them, in input order. When mowers
+        share programs or have program trees, the ones running alone are moved first, see run_alone.
+        """
+        programs = {id(program): program for program in fleet.programs}
+        if len(programs) < len(fleet) or any(isinstance(program, ProgramTree) for program in programs.values()):
+            SyncMowerSimulationService.run_alone(fleet, lawn)
+        occupancy = SyncMowerSimulationService.build_occupancy(fleet, lawn)
+        lawn_dims = lawn.as_tuple()
+        active_mowers = [index for index in range(len(fleet)) if fleet.pending(index)]
+        while active_mowers:
+            for index in active_mowers:
+                occupancy = SyncMowerSimulationService.move_mower(occupancy, fleet, index, lawn_dims, self.stats)
+            if self.checkpoints is not None:
+                # Mowers still active all ran every round so far, their cursor is the round
+                self.checkpoints.round_done(fleet, fleet.cursors[active_mowers[0]], len(active_mowers))
+            active_mowers = [index for index in active_mowers if fleet.pending(index)]
+        return fleet
+
+
+class MacroStepMowerSimulationService(SyncMowerSimulationService):
+    """Macro-step simulation class.
+
+    Programs are compiled into macro-ops (see MacroProgram) and mowers are scheduled, in round then input
+    order, by the round of their next macro-op. A whole macro-op is run at once when no other mower can get
+    in its way, otherwise the mower falls back to single steps. Final positions are the same as the ones of
+    SyncMowerSimulationService, and straight line programs cost their number of turns.
+
+    Mowers are kept in row and column sorted indexes, so straight runs are checked against the mowers around
+    them only. A mower blocked by a mower staying in front of it, or running head-on into it, skips all the
+    rounds it stays blocked at once.
+    """
+    def __init__(self) -> None:
+        self.fleet: Fleet = None
+        self.lawn_dims: LawnDimensions = None
+        # Mowers are ahead of the round being run: each one gets to its current cell by its free round at the latest,
+        # then it stays there or moves one cell per round at most
+        self.free_rounds: array = array('q')
+        # Round from which each mower is on its current cell, it stays there until its free round
+        self.arrive_rounds: array = array('q')
+        # Compiled programs, with the macro-op each mower is on and how many of its instructions were run
+        self.programs: List[MacroProgram] = []
+        self.op_indexes: array = array('q')
+        self.op_done: array = array('q')
+        # Cells of the mowers with instructions left, with the mower on each cell, and of the finished mowers
+        self.moving: SortedOccupancyIndex = None
+        self.mower_at: Dict[int, int] = {}
+        self.finished: SortedOccupancyIndex = None
+
+    def reach(self, index: int, dx: int, dy: int, cells: int) -> int:
+        """Number of cells, up to cells, a mower can travel straight before a lawn border or a finished mower."""
+        x, y = self.fleet.xs[index], self.fleet.ys[index]
+        if dx:
+            cells = min(cells, self.lawn_dims.w - 1 - x if dx > 0 else x)
+        else:
+            cells = min(cells, self.lawn_dims.h - 1 - y if dy > 0 else y)
+        obstacle = self.finished.first_on_ray(x, y, dx, dy, cells)
+        return obstacle - 1 if obstacle else cells
+
+    def safe_cells(self, index: int, dx: int, dy: int, round_: int, cells: int) -> int:
+        """Number of cells, up to cells, a mower can travel straight in the next rounds with no other mower in its way.
+
+        Running c cells is safe when no other mower is on them or can move into them in the next c rounds. The
+        largest safe c is solved per mower from the cell it is in at its free round. Only mowers less than 2c cells
+        across the run, and from c cells behind to 2c cells ahead, can make c smaller.
+        """
+        x, y, width = self.fleet.xs[index], self.fleet.ys[index], self.lawn_dims.w
+        horizontal, sign = dy == 0, dx + dy
+        key, position = (y, x) if horizontal else (x, y)
+        for line in self.moving.nearest_lines(horizontal, key):
+            across = abs(line - key)
+            if across > 2 * cells:
+                break
+            low, high = (position - cells, position + 2 * cells) if sign > 0 else (position - 2 * cells, position + cells)
+            for other_position in self.moving.line_range(horizontal, line, low, high):
+                along = (other_position - position) * sign
+                if not along and not across:
+                    # The mower itself
+                    continue
+                other = self.mower_at[line * width + other_position if horizontal else other_position * width + line]
+                rounds = max(self.free_rounds[other] - round_, 0)
+                if not across and along > 0:
+                    cells = min(cells, along - 1)
+                if along < 0:
+                    cells = min(cells, across - along + rounds - 1)
+                elif across - along + rounds > 0:
+                    cells = min(cells, across + rounds - 1)
                 else:
-                    mowers = SyncMowerSimulationService.move_mower(mowers, mower, lawn.as_tuple())
-        return output_mowers
+                    cells = min(cells, (across + along + rounds - 1) // 2)
+                if cells <= 0:
+                    return 0
+        return cells
+
+    def move(self, index: int, to_x: int, to_y: int, round_: int) -> None:
+        """Move a mower with instructions left, it gets to its new cell at the end of round_."""
+        fleet, width = self.fleet, self.lawn_dims.w
+        x, y = fleet.xs[index], fleet.ys[index]
+        self.moving.move(x, y, to_x, to_y)
+        del self.mower_at[y * width + x]
+        self.mower_at[to_y * width + to_x] = index
+        fleet.xs[index], fleet.ys[index] = to_x, to_y
+        self.arrive_rounds[index] = round_ + 1
+
+    def step(self, index: int, round_: int, kind: int, argument: int, remaining: int) -> int:
+        """Run the remaining instructions of a macro-op of a mower, or only the first ones, returns how many were run."""
+        fleet = self.fleet
+        x, y, orientation = fleet.xs[index], fleet.ys[index], fleet.orientations[index]
+        if kind == MACRO_TURN:
+            fleet.orientations[index] = (orientation + argument) & 3
+            return remaining
+        dx, dy = MOVE_DX[orientation << 2 | argument], MOVE_DY[orientation << 2 | argument]
+        cells = self.reach(index, dx, dy, remaining)
+        safe = self.safe_cells(index, dx, dy, round_, cells) if cells else 0
+        if safe:
+            self.move(index, x + dx * safe, y + dy * safe, round_ + safe - 1)
+        if safe or not cells:
+            # Instructions left after a border or a finished mower is reached are dropped
+            if safe == cells and self.stats is not None and 0 <= x + dx * (cells + 1) < self.lawn_dims.w \
+                    and 0 <= y + dy * (cells + 1) < self.lawn_dims.h:
+                self.stats.blocked(index, x + dx * (cells + 1), y + dy * (cells + 1), remaining - cells)
+            return remaining if safe == cells else safe
+        other = self.mower_at.get((y + dy) * self.lawn_dims.w + x + dx)
+        if other is None:
+            self.move(index, x + dx, y + dy, round_)
+            return 1
+        if self.arrive_rounds[other] <= round_ < self.free_rounds[other]:
+            # Blocked by a mower staying on the next cell, until its free round
+            return self.blocked(index, x + dx, y + dy, min(remaining, self.free_rounds[other] - round_))
+        if self.free_rounds[other] == round_ and other > index and self.op_indexes[other] < len(self.programs[other]):
+            # Blocked by a mower to run later in this round towards this mower: both are blocked until a run ends
+            kind, argument, count = self.programs[other][self.op_indexes[other]]
+            other_transition = fleet.orientations[other] << 2 | argument
+            if kind == MACRO_RUN and MOVE_DX[other_transition] == -dx and MOVE_DY[other_transition] == -dy:
+                return self.blocked(index, x + dx, y + dy, min(remaining, count - self.op_done[other]))
+        return self.blocked(index, x + dx, y + dy, 1)
+
+    def blocked(self, index: int, x: int, y: int, moves: int) -> int:
+        """Count moves of a mower dropped into the occupied cell (x, y), returns their number."""
+        if self.stats is not None:
+            self.stats.blocked(index, x, y, moves)
+        return moves
+
+    def run(self, fleet: Fleet, lawn: LawnModel) -> Fleet:
+        """Run simulation with in a lawn with several mowers.
+
+        Every round each mower with pending directions executes one of them, in input order. Program trees
+        are refused, compiling them would expand them.
+        """
+        check_no_program_trees(fleet, 'macro')
+        self.fleet, self.lawn_dims = fleet, lawn.as_tuple()
+        self.free_rounds = array('q', bytes(8 * len(fleet)))
+        self.arrive_rounds = array('q', bytes(8 * len(fleet)))
+        self.moving, self.finished = SortedOccupancyIndex(lawn.width, lawn.height), SortedOccupancyIndex(lawn.width, lawn.height)
+        self.mower_at = {}
+        self.programs = programs = [MacroProgram.compile(program, cursor) for program, cursor in zip(fleet.programs, fleet.cursors)]
+        self.op_indexes, self.op_done = op_indexes, op_done = array('q', bytes(8 * len(fleet))), array('q', bytes(8 * len(fleet)))
+        schedule = []
+        for index, (x, y, program) in enumerate(zip(fleet.xs, fleet.ys, programs)):
+            if len(program):
+                self.moving.occupy(x, y)
+                self.mower_at[y * lawn.width + x] = index
+                schedule.append((0, index))
+            else:
+                self.finished.occupy(x, y)
+        while schedule:
+            round_, index = heapq.heappop(schedule)
+            program, op_index = programs[index], op_indexes[index]
+            if op_index == len(program):
+                x, y = fleet.xs[index], fleet.ys[index]
+                self.moving.release(x, y)
+                del self.mower_at[y * lawn.width + x]
+                self.finished.occupy(x, y)
+                continue
+            kind, argument, count = program[op_index]
+            done = self.step(index, round_, kind, argument, count - op_done[index])
+            fleet.cursors[index] += done
+            self.free_rounds[index] = round_ + done
+            op_done[index] += done
+            if op_done[index] == count:
+                op_indexes[index], op_done[index] = op_index + 1, 0
+            heapq.heappush(schedule, (round_ + done, index))
+        return fleet
+
+
+class VectorizedMowerSimulationService(MowerSimulationService):
+    """Vectorized simulation class.
+
+    The fleet is stored as numpy arrays and every round is run as batched array operations,
+    giving the same final positions as SyncMowerSimulationService.
+    """
+    def __init__(self) -> None:
+        if not import_numpy():
+            raise MowerSimulationError(value='numpy', message='VectorizedMowerSimulationService requires numpy to be installed.')
+
+    @staticmethod
+    def find_occupants(cells: 'np.ndarray', target_cells: 'np.ndarray') -> 'np.ndarray':
+        """Find the position in cells of each target cell, -1 if missing."""
+        if not target_cells.size:
+            return np.full(0, -1, dtype=np.int64)
+        order = np.argsort(cells)
+        sorted_cells = cells[order]
+        # Sorted lookups are far more cache friendly
+        targets_order = np.argsort(target_cells)
+        found = np.minimum(np.searchsorted(sorted_cells, target_cells[targets_order]), cells.size - 1)
+        occupants = np.empty(target_cells.size, dtype=np.int64)
+        occupants[targets_order] = np.where(sorted_cells[found] == target_cells[targets_order], order[found], -1)
+        return occupants
+
+    @staticmethod
+    def resolve_moves(target_cells: 'np.ndarray', occupied: 'np.ndarray', holders: 'np.ndarray') -> 'np.ndarray':
+        """Resolve which movers, given in index order, enter their target cell.
+
+        holders is the mover holding each target cell, -1 if it is free or held by a mower that does not move.
+        The outcome is the one of moving the mowers one by one in index order: a mover is blocked if its
+        target is held by a mower that does not move, by a later mower, or by an earlier mower that was blocked
+        itself, and only the first mower reaching a free cell gets it.
+        """
+        # Group movers by target cell, in index order inside each group
+        grouped = np.argsort(target_cells, kind='stable')
+        g_cells, g_holders = target_cells[grouped], holders[grouped]
+        group_start = np.ones(grouped.size, dtype=bool)
+        group_start[1:] = g_cells[1:] != g_cells[:-1]
+        previous = np.full(grouped.size, -1, dtype=np.int64)
+        previous[1:] = grouped[:-1]
+
+        free = ~occupied[grouped]
+        # Cell held by an earlier mover: the first following mover gets it if the holder moves away
+        waiting = (g_holders >= 0) & (g_holders < grouped) & (group_start | (previous < g_holders))
+
+        success = np.zeros(grouped.size, dtype=bool)
+        success[grouped[free & group_start]] = True
+        depends_on = np.full(grouped.size, -1, dtype=np.int64)
+        depends_on[grouped[waiting]] = g_holders[waiting]
+
+        # Dependencies always point to a lower index, pointer jumping resolves the chains
+        pending = grouped[waiting]
+        while pending.size:
+            holders = depends_on[pending]
+            next_holders = depends_on[holders]
+            resolved = next_holders < 0
+            success[pending[resolved]] = success[holders[resolved]]
+            depends_on[pending[resolved]] = -1
+            depends_on[pending[~resolved]] = next_holders[~resolved]
+            pending = pending[~resolved]
+        return success
+
+    @staticmethod
+    def build_occupancy(xs: 'np.ndarray', ys: 'np.ndarray', lawn_dims: LawnDimensions) -> OccupancyGrid:
+        """Build the occupancy grid of the fleet in the lawn."""
+        occupancy = OccupancyGrid.for_lawn(lawn_dims.w, lawn_dims.h, xs.size)
+        cells = ys.astype(np.int64) * lawn_dims.w + xs
+        if isinstance(occupancy, BitmapOccupancyGrid):
+            np.bitwise_or.at(np.frombuffer(occupancy.bits, dtype=np.uint8), cells >> 3, (1 << (cells & 7)).astype(np.uint8))
+        else:
+            occupancy.cells.update(cells.tolist())
+        return occupancy
+
+    @classmethod
+    def simulate(cls, xs: 'np.ndarray', ys: 'np.ndarray', orientations: 'np.ndarray', codes: 'np.ndarray', starts: 'np.ndarray',
+                 lengths: 'np.ndarray', cursors: 'np.ndarray', occupancy: OccupancyGrid, lawn_dims: LawnDimensions,
+                 stats: Optional[MowerStats] = None, checkpoints: Optional[FleetCheckpoints] = None, fleet: Optional[Fleet] = None) -> None:
+        """Run all the rounds in place over the fleet arrays and the occupancy grid.
+
+        Checkpoints are given the fleet whose arrays are run over.
+        """
+        bits = np.frombuffer(occupancy.bits, dtype=np.uint8) if isinstance(occupancy, BitmapOccupancyGrid) else None
+        width = lawn_dims.w
+        active = np.flatnonzero(cursors < lengths)
+        while active.size:
+            instructions = codes[starts[active] + cursors[active]]
+            x, y = xs[active].astype(np.int64), ys[active].astype(np.int64)
+            target_x, target_y, orientations[active] = step_arrays(x, y, orientations[active], instructions, lawn_dims.w, lawn_dims.h)
+
+            moving = (target_x != x) | (target_y != y)
+            if moving.any():
+                movers, target_x, target_y = active[moving], target_x[moving], target_y[moving]
+                cells, target_cells = y[moving] * width + x[moving], target_y * width + target_x
+                if bits is not None:
+                    occupied = (bits[target_cells >> 3] >> (target_cells & 7)) & 1 == 1
+                else:
+                    occupied = np.fromiter(map(occupancy.cells.__contains__, target_cells.tolist()), dtype=bool, count=target_cells.size)
+                # Only occupied targets can be held by another mover
+                holders = np.full(target_cells.size, -1, dtype=np.int64)
+                holders[occupied] = cls.find_occupants(cells, target_cells[occupied])
+                success = cls.resolve_moves(target_cells, occupied, holders)
+                if stats is not None:
+                    blocked = ~success
+                    stats.blocked_many(movers[blocked].tolist(), target_x[blocked].tolist(), target_y[blocked].tolist())
+
+                cells, target_cells = cells[success], target_cells[success]
+                if bits is not None:
+                    np.bitwise_and.at(bits, cells >> 3, ~(1 << (cells & 7)).astype(np.uint8))
+                    np.bitwise_or.at(bits, target_cells >> 3, (1 << (target_cells & 7)).astype(np.uint8))
+                else:
+                    occupancy.cells.difference_update(cells.tolist())
+                    occupancy.cells.update(target_cells.tolist())
+                xs[movers[success]] = target_x[success]
+                ys[movers[success]] = target_y[success]
+
+            cursors[active] += 1
+            if checkpoints is not None:
+                checkpoints.round_done(fleet, int(cursors[active[0]]), int(active.size))
+            active = active[cursors[active] < lengths[active]]
+
+    def run(self, fleet: Fleet, lawn: LawnModel) -> Fleet:
+        """Run simulation with in a lawn with several mowers, program trees are refused as they would be expanded."""
+        check_no_program_trees(fleet, 'vectorized')
+        # Views over the fleet arrays, the simulation runs in place
+        xs = np.frombuffer(fleet.xs, dtype=np.int32)
+        ys = np.frombuffer(fleet.ys, dtype=np.int32)
+        orientations = np.frombuffer(fleet.orientations, dtype=np.uint8)
+        cursors = np.frombuffer(fleet.cursors, dtype=np.int64)
+        lengths = np.array([program.size for program in fleet.programs], dtype=np.int64)
+        starts = np.zeros(len(fleet), dtype=np.int64)
+        np.cumsum(lengths[:-1], out=starts[1:])
+        codes = np.frombuffer(b''.join(program.codes(0) for program in fleet.programs), dtype=np.uint8)
+        lawn_dims = lawn.as_tuple()
+
+        self.simulate(xs, ys, orientations, codes, starts, lengths, cursors, self.build_occupancy(xs, ys, lawn_dims), lawn_dims, self.stats,
+                      self.checkpoints, fleet)
+        return fleet
+
+
+class MowerTurns:
+    """Hands the turn to mower coroutines one at a time, in index order every round, as the sync simulation does."""
+
+    def __init__(self, indexes: Iterable[int]) -> None:
+        self.order: List[int] = sorted(indexes)
+        self.events: Dict[int, asyncio.Event] = {index: asyncio.Event() for index in self.order}
+        self.position: int = 0
+        if self.order:
+            self.events[self.order[0]].set()
+
+    async def wait(self, index: int) -> None:
+        """Wait for the turn of a mower."""
+        event = self.events[index]
+        await event.wait()
+        event.clear()
+
+    def next(self, finished: bool) -> None:
+        """Hand the turn to the next mower, the mower having the turn leaves the rounds once finished."""
+        if finished:
+            self.order.pop(self.position)
+        else:
+            self.position += 1
+        if self.position >= len(self.order):
+            self.position = 0
+        if self.order:
+            self.events[self.order[self.position]].set()
+
+
+class MowerWindow:
+    """Lets mowers of a stream start at most size mowers after the first one not finished yet, in input order.
+
+    Results are printed in input order, so a mower finishing early waits for the ones before: the window
+    bounds these results, and the mowers running at once, whatever the time the first ones take.
+    """
+
+    def __init__(self, size: int) -> None:
+        self.size: int = size
+        # Index of the first mower not finished yet, and the finished mowers after it
+        self.first: int = 0
+        self.finished: Set[int] = set()
+        self.moved: asyncio.Event = asyncio.Event()
+
+    async def enter(self, index: int) -> None:
+        """Wait for a mower to be in the window."""
+        while index >= self.first + self.size:
+            self.moved.clear()
+            await self.moved.wait()
+
+    def leave(self, index: int) -> None:
+        """Record a mower has finished, moving the window past the first mowers once they all are."""
+        self.finished.add(index)
+        while self.first in self.finished:
+            self.finished.remove(self.first)
+            self.first += 1
+        self.moved.set()
 
 
 class AsyncMowerSimulationService(MowerSimulationService):
-    """Asynchronous simulation class."""
-    def run(self, mowers: Dict[Position, MowerModel], lawn: LawnModel) -> Set[MowerModel]:
-        pass
+    """Asynchronous simulation class.
+
+    Each mower is a coroutine, yielding to the event loop after each instruction, so that the simulation
+    overlaps with the coroutines reading the input or writing the results. Cells are shared through an
+    AsyncOccupancyGrid.
+
+    When deterministic, mowers take turns in index order every round and final positions are the same as
+    the ones of SyncMowerSimulationService: the whole fleet must be known before the first move, so mowers
+    coming from a stream are collected first. Otherwise mowers join the lawn and start as soon as they
+    arrive, the ones arriving on a held cell wait for it to be released. A mower of a stream then runs alone
+    in its own fleet, dropped with its program once it has finished: only its cell stays held.
+    """
+    def __init__(self, deterministic: bool = True) -> None:
+        self.deterministic: bool = deterministic
+
+    def run(self, fleet: Fleet, lawn: LawnModel) -> Fleet:
+        """Run simulation with in a lawn with several mowers."""
+        return asyncio.run(self.run_async(fleet, lawn))
+
+    async def run_async(self, fleet: Fleet, lawn: LawnModel) -> Fleet:
+        """Run simulation with in a lawn with several mowers, from a running event loop."""
+        occupancy = AsyncOccupancyGrid(SyncMowerSimulationService.build_occupancy(fleet, lawn),
+                                       moving=sum(1 for index in range(len(fleet)) if fleet.pending(index)))
+        if self.deterministic:
+            await self.simulate(fleet, occupancy, lawn, range(len(fleet)))
+        else:
+            await asyncio.gather(*(self.join(fleet, occupancy, lawn.as_tuple(), index, placed=True) for index in range(len(fleet))))
+        return fleet
+
+    async def run_stream(self, mowers: AsyncIterable[MowerModel], lawn: LawnModel, results: Optional[asyncio.Queue] = None,
+                         window: Optional[int] = None) -> int:
+        """Run simulation with in a lawn with mowers coming from an asynchronous stream, in input order.
+
+        Once a mower has run all its instructions its index and final position are put in results, if given.
+        Not deterministic, with a window, mowers start at most window mowers after the first one not finished
+        yet (see MowerWindow). Returns the number of mowers.
+        """
+        occupancy = AsyncOccupancyGrid(OccupancyGrid.for_lawn(lawn.width, lawn.height))
+        if self.deterministic:
+            fleet = Fleet()
+            async for mower in mowers:
+                x, y, o = mower.position
+                index = fleet.add(x, y, o.code, mower.directions)
+                fleet.cursors[index] = mower.directions.cursor
+                occupancy.occupy(x, y)
+            await self.simulate(fleet, occupancy, lawn, range(len(fleet)), results)
+            return len(fleet)
+
+        mowers_window = MowerWindow(window) if window else None
+        # Running mowers, and the ones that failed, raised once the stream is over
+        tasks: Set[asyncio.Task] = set()
+
+        def forget(task: asyncio.Task) -> None:
+            if not task.cancelled() and task.exception() is None:
+                tasks.discard(task)
+
+        index = 0
+        async for mower in mowers:
+            if mowers_window is not None:
+                await mowers_window.enter(index)
+            task = asyncio.ensure_future(self.join_stream(mower, occupancy, lawn.as_tuple(), index, results, mowers_window))
+            task.add_done_callback(forget)
+            tasks.add(task)
+            index += 1
+        await asyncio.gather(*tasks)
+        return index
+
+    async def simulate(self, fleet: Fleet, occupancy: AsyncOccupancyGrid, lawn: LawnModel, indexes: Iterable[int],
+                       results: Optional[asyncio.Queue] = None) -> None:
+        """Run mowers already on the lawn, taking turns in index order."""
+        lawn_dims = lawn.as_tuple()
+        turns = MowerTurns(index for index in indexes if fleet.pending(index))
+        if results is not None:
+            for index in indexes:
+                if not fleet.pending(index):
+                    await results.put((index, fleet.position(index)))
+        await asyncio.gather(*(self.take_turns(fleet, occupancy, lawn_dims, index, turns, results) for index in turns.order))
+
+    async def take_turns(self, fleet: Fleet, occupancy: AsyncOccupancyGrid, lawn_dims: LawnDimensions, index: int,
+                         turns: MowerTurns, results: Optional[asyncio.Queue] = None) -> None:
+        """Mower coroutine, running one instruction per turn."""
+        while fleet.pending(index):
+            await turns.wait(index)
+            SyncMowerSimulationService.move_mower(occupancy, fleet, index, lawn_dims, self.stats)
+            turns.next(not fleet.pending(index))
+        if results is not None:
+            await results.put((index, fleet.position(index)))
+
+    async def join_stream(self, mower: MowerModel, occupancy: AsyncOccupancyGrid, lawn_dims: LawnDimensions, index: int,
+                          results: Optional[asyncio.Queue] = None, window: Optional[MowerWindow] = None) -> None:
+        """Mower coroutine of a stream, run as join does in a fleet of its own mower."""
+        try:
+            fleet = Fleet.from_models([mower])
+            await self.join(fleet, occupancy, lawn_dims, 0)
+            if results is not None:
+                await results.put((index, fleet.position(0)))
+        finally:
+            if window is not None:
+                window.leave(index)
+
+    async def join(self, fleet: Fleet, occupancy: AsyncOccupancyGrid, lawn_dims: LawnDimensions, index: int,
+                   results: Optional[asyncio.Queue] = None, placed: bool = False) -> None:
+        """Mower coroutine, joining the lawn then running one instruction each time it is scheduled."""
+        if not placed:
+            await occupancy.place(fleet.xs[index], fleet.ys[index], moving=fleet.pending(index) > 0)
+        if fleet.pending(index):
+            while fleet.pending(index):
+                SyncMowerSimulationService.move_mower(occupancy, fleet, index, lawn_dims, self.stats)
+                await asyncio.sleep(0)
+            occupancy.leave()
+        if results is not None:
+            await results.put((index, fleet.position(index)))
+
+
+def simulate_fleet_chunk(engine: MowerSimulationService, fleet: Fleet, lawn: LawnModel) -> Tuple[array, array, bytearray, array]:
+    """Simulate a fleet chunk, run in a worker process.
+
+    Returns the final positions and cursors of the chunk, programs are not sent back.
+    """
+    fleet = engine.run(fleet, lawn)
+    return fleet.xs, fleet.ys, fleet.orientations, fleet.cursors
+
+
+class ParallelMowerSimulationService(MowerSimulationService):
+    """Process pool simulation class.
+
+    A mower can not get further from its start position in a direction than its number of pending translations
+    heading that way, so two mowers whose reachable boxes do not overlap never interact. Mowers are grouped by overlapping boxes,
+    and groups are spread over worker processes, each one simulating its chunk of groups with engine.
+    Final positions are the same as the ones of engine on the whole fleet.
+    """
+    def __init__(self, workers: Optional[int] = None, engine: Optional[MowerSimulationService] = None,
+                 min_instructions: int = PARALLEL_MIN_INSTRUCTIONS) -> None:
+        self.workers: int = workers or os.cpu_count() or 1
+        self.engine: MowerSimulationService = engine if engine is not None else SyncMowerSimulationService()
+        self.min_instructions: int = min_instructions
+
+    @staticmethod
+    def program_move(fleet: Fleet, index: int, lawn_dims: LawnDimensions, moves: Dict[Tuple[int, int], ProgramMove]) -> ProgramMove:
+        """Move of the whole program of a mower from its orientation, moves of the programs already seen are kept in moves."""
+        key = (id(fleet.programs[index]), fleet.orientations[index])
+        move = moves.get(key)
+        if move is None:
+            move = moves[key] = program_move(fleet.programs[index], fleet.orientations[index], lawn_dims.w, lawn_dims.h)
+        return move
+
+    @staticmethod
+    def reachable_box(fleet: Fleet, index: int, lawn_dims: LawnDimensions,
+                      moves: Optional[Dict[Tuple[int, int], ProgramMove]] = None) -> Tuple[int, int, int, int]:
+        """Box (x0, y0, x1, y1), bounds included, a mower stays in whatever the other mowers do.
+
+        Rotations are never dropped, so each translation of the program always heads the same way: the mower
+        can not go further in a direction than its number of translations heading that way. Mowers not
+        started count them once per program and orientation, the moves of their programs are kept in moves.
+        Program trees are not expanded: trees already started may head any way for all their translations.
+        """
+        orientation = fleet.orientations[index]
+        program = fleet.programs[index]
+        if not fleet.pending(index):
+            steps = [0, 0, 0, 0]
+        elif not fleet.cursors[index]:
+            steps = ParallelMowerSimulationService.program_move(fleet, index, lawn_dims, {} if moves is None else moves)[3]
+        elif isinstance(program, ProgramTree):
+            steps = [sum(program.move(orientation, lawn_dims.w, lawn_dims.h)[3])] * 4
+        else:
+            # Number of translations heading each way, indexed by orientation code
+            steps = [0, 0, 0, 0]
+            program = MacroProgram.compile(program, fleet.cursors[index])
+            for op_index in range(len(program)):
+                kind, argument, count = program[op_index]
+                if kind == MACRO_TURN:
+                    orientation = (orientation + argument) & 3
+                else:
+                    steps[orientation if argument == RelativeDirection.FRONT.code else orientation ^ 2] += count
+        x, y = fleet.xs[index], fleet.ys[index]
+        return (max(x - steps[3], 0), max(y - steps[2], 0), min(x + steps[1], lawn_dims.w - 1), min(y + steps[0], lawn_dims.h - 1))
+
+    @staticmethod
+    def interaction_groups(fleet: Fleet, lawn: LawnModel, moves: Optional[Dict[Tuple[int, int], ProgramMove]] = None,
+                           boxes: Optional[List[Tuple[int, int, int, int]]] = None) -> List[List[int]]:
+        """Group mowers by overlapping reachable boxes, in index order.
+
+        Groups without pending instructions are left out. Boxes are swept by x and each one is checked
+        against the boxes still open across it, so this is fast for sparse fleets. The moves of the programs
+        are kept in moves, see reachable_box, boxes already computed may be given.
+        """
+        lawn_dims = lawn.as_tuple()
+        moves = {} if moves is None else moves
+        if boxes is None:
+            boxes = [ParallelMowerSimulationService.reachable_box(fleet, index, lawn_dims, moves) for index in range(len(fleet))]
+        parents = list(range(len(fleet)))
+
+        def find(index: int) -> int:
+            while parents[index] != index:
+                parents[index] = parents[parents[index]]
+                index = parents[index]
+            return index
+
+        # Boxes open across the sweep line, with a heap of their right bounds to close them
+        open_boxes: Dict[int, Tuple[int, int, int, int]] = {}
+        closing: List[Tuple[int, int]] = []
+        for index in sorted(range(len(boxes)), key=lambda index: boxes[index][0]):
+            x0, y0, x1, y1 = boxes[index]
+            while closing and closing[0][0] < x0:
+                open_boxes.pop(heapq.heappop(closing)[1])
+            root = find(index)
+            for other, (_, other_y0, _, other_y1) in open_boxes.items():
+                if other_y0 <= y1 and y0 <= other_y1:
+                    other_root = find(other)
+                    if other_root != root:
+                        parents[max(root, other_root)] = min(root, other_root)
+                        root = min(root, other_root)
+            open_boxes[index] = boxes[index]
+            heapq.heappush(closing, (x1, index))
+
+        groups: Dict[int, List[int]] = {}
+        for index in range(len(fleet)):
+            groups.setdefault(find(index), []).append(index)
+        return [group for group in groups.values() if any(fleet.pending(index) for index in group)]
+
+    @staticmethod
+    def balance(fleet: Fleet, groups: List[List[int]], chunks: int) -> List[List[int]]:
+        """Spread groups into chunks of about the same number of pending instructions, mowers in index order."""
+        loads = [(0, chunk) for chunk in range(chunks)]
+        indexes: List[List[int]] = [[] for _ in range(chunks)]
+        weighted = sorted(((sum(fleet.pending(index) for index in group), group) for group in groups), key=lambda item: -item[0])
+        for weight, group in weighted:
+            load, chunk = heapq.heappop(loads)
+            indexes[chunk].extend(group)
+            heapq.heappush(loads, (load + weight, chunk))
+        return [sorted(chunk) for chunk in indexes if chunk]
+
+    @staticmethod
+    def sub_fleet(fleet: Fleet, indexes: List[int]) -> Fleet:
+        """Build the fleet of some mowers, programs are shared."""
+        chunk = Fleet()
+        for index in indexes:
+            chunk.add(fleet.xs[index], fleet.ys[index], fleet.orientations[index], fleet.programs[index])
+            chunk.cursors[-1] = fleet.cursors[index]
+        return chunk
+
+    def run(self, fleet: Fleet, lawn: LawnModel) -> Fleet:
+        """Run simulation with in a lawn with several mowers."""
+        if self.workers <= 1 or sum(fleet.pending(index) for index in range(len(fleet))) < self.min_instructions:
+            return self.engine.run(fleet, lawn)
+        groups = ParallelMowerSimulationService.interaction_groups(fleet, lawn)
+        chunks = ParallelMowerSimulationService.balance(fleet, groups, min(self.workers, len(groups)))
+        if len(chunks) <= 1:
+            return self.engine.run(fleet, lawn)
+        with ProcessPoolExecutor(max_workers=len(chunks)) as executor:
+            results = executor.map(simulate_fleet_chunk, repeat(self.engine),
+                                   (ParallelMowerSimulationService.sub_fleet(fleet, chunk) for chunk in chunks), repeat(lawn))
+            for chunk, (xs, ys, orientations, cursors) in zip(chunks, results):
+                for chunk_index, index in enumerate(chunk):
+                    fleet.xs[index], fleet.ys[index] = xs[chunk_index], ys[chunk_index]
+                    fleet.orientations[index], fleet.cursors[index] = orientations[chunk_index], cursors[chunk_index]
+        return fleet
+
+
+class TiledMowerSimulationService(MowerSimulationService):
+    """Tiled multi-process simulation class.
+
+    The lawn is split into rectangular tiles, each one run by a worker process on the mowers standing in it.
+    The fleet and the mower on each cell are shared by all workers (see SharedFleet), rounds are run in
+    phases separated by barriers:
+
+    1. each worker reads the instruction of its mowers and computes their target cell,
+    2. each mover looks at the movers around its target cell: in index order the first one gets a free cell,
+       and a cell held by a mover goes to the first mover after it, if the holder moves itself,
+    3. movers depending on their holder follow the chain of holders, moving ones leave their cell,
+    4. moving mowers enter their target cell,
+    5. mowers that left a tile are handed off to the tile they entered, found on its border cells.
+
+    Final positions are the same as the ones of SyncMowerSimulationService. Dense fleets on large lawns get
+    all cores, at the cost of 4 bytes per lawn cell.
+    """
+    # Outcomes of a move in its target cell
+    LOST = 0
+    WON = 1
+    WON_IF_HOLDER_MOVES = 2
+
+    def __init__(self, workers: Optional[int] = None, min_instructions: int = PARALLEL_MIN_INSTRUCTIONS) -> None:
+        self.workers: int = workers or os.cpu_count() or 1
+        self.min_instructions: int = min_instructions
+
+    @staticmethod
+    def tile_grid(lawn_dims: LawnDimensions, workers: int) -> Tuple[int, int]:
+        """Number of tile columns and rows: as many tiles as possible up to workers, as square as possible."""
+        best = (1, 1)
+        for columns in range(1, min(workers, lawn_dims.w) + 1):
+            rows = min(workers // columns, lawn_dims.h)
+            score = (columns * rows, -(lawn_dims.w // columns + lawn_dims.h // rows))
+            if score > (best[0] * best[1], -(lawn_dims.w // best[0] + lawn_dims.h // best[1])):
+                best = (columns, rows)
+        return best
+
+    @staticmethod
+    def tiles(lawn_dims: LawnDimensions, columns: int, rows: int) -> List[Tuple[int, int, int, int]]:
+        """Tiles (x0, y0, x1, y1), upper bounds excluded, row by row."""
+        return [(column * lawn_dims.w // columns, row * lawn_dims.h // rows,
+                 (column + 1) * lawn_dims.w // columns, (row + 1) * lawn_dims.h // rows)
+                for row in range(rows) for column in range(columns)]
+
+    def run_tile(self, name: str, layout: SharedFleetLayout, tile: Tuple[int, int, int, int], lawn_dims: LawnDimensions,
+                 barrier: multiprocessing.Barrier, worker: int) -> None:
+        """Worker process, run the mowers of a tile round after round until no mower of the lawn is left active."""
+        shared = SharedFleet.attach(name, layout)
+        try:
+            self.simulate_tile(shared, tile, lawn_dims, barrier, worker)
+        except BrokenBarrierError:
+            # Another worker failed
+            raise
+        except BaseException:
+            barrier.abort()
+            raise
+        finally:
+            shared.close()
+
+    def simulate_tile(self, shared: SharedFleet, tile: Tuple[int, int, int, int], lawn_dims: LawnDimensions,
+                      barrier: multiprocessing.Barrier, worker: int) -> None:
+        """Run the rounds of a tile, see the phases in the class documentation."""
+        x0, y0, x1, y1 = tile
+        width, height = lawn_dims
+        xs, ys, orientations, cursors, codes, starts = shared.xs, shared.ys, shared.orientations, shared.cursors, shared.codes, shared.starts
+        targets, holders, outcomes, moved, cells, actives = shared.targets, shared.holders, shared.outcomes, shared.moved, shared.cells, shared.actives
+        # Border cells of the tile, where mowers from other tiles enter it
+        columns = {y * width + x for y in range(y0, y1) for x in (x0, x1 - 1)}
+        rows = {y * width + x for x in range(x0, x1) for y in (y0, y1 - 1)}
+        border = sorted(columns | rows)
+        owned: Set[int] = {index for index in range(len(xs))
+                           if x0 <= xs[index] < x1 and y0 <= ys[index] < y1 and shared.pending(index)}
+        while True:
+            actives[worker] = len(owned)
+            barrier.wait()
+            if not any(actives):
+                break
+
+            # 1. Instructions and target cells
+            for index in owned:
+                code = codes[starts[index] + cursors[index]]
+                cursors[index] += 1
+                x, y = xs[index], ys[index]
+                to_x, to_y, orientations[index] = step(x, y, orientations[index], code, width, height)
+                targets[index] = to_y * width + to_x if (to_x, to_y) != (x, y) else -1
+            barrier.wait()
+
+            # 2. Outcome of each move in its target cell
+            for index in owned:
+                target = targets[index]
+                if target < 0:
+                    continue
+                holder = cells[target]
+                if holder >= 0 and targets[holder] < 0:
+                    outcomes[index] = self.LOST
+                    continue
+                to_x, to_y = target % width, target // width
+                first = index
+                for neighbour_x, neighbour_y in ((to_x, to_y + 1), (to_x + 1, to_y), (to_x, to_y - 1), (to_x - 1, to_y)):
+                    if 0 <= neighbour_x < width and 0 <= neighbour_y < height:
+                        neighbour = cells[neighbour_y * width + neighbour_x]
+                        if holder < neighbour < first and targets[neighbour] == target:
+                            first = neighbour
+                if first != index or index < holder:
+                    outcomes[index] = self.LOST
+                elif holder < 0:
+                    outcomes[index] = self.WON
+                else:
+                    outcomes[index], holders[index] = self.WON_IF_HOLDER_MOVES, holder
+            barrier.wait()
+
+            # 3. Chains of holders, holders always have a lower index
+            resolved: Dict[int, bool] = {}
+            for index in owned:
+                if targets[index] < 0:
+                    continue
+                chain, mover = [], index
+                while mover not in resolved and outcomes[mover] == self.WON_IF_HOLDER_MOVES:
+                    chain.append(mover)
+                    mover = holders[mover]
+                success = resolved[mover] if mover in resolved else outcomes[mover] == self.WON
+                for mover in chain:
+                    resolved[mover] = success
+                resolved[index] = success
+                moved[index] = success
+                if success:
+                    cells[ys[index] * width + xs[index]] = -1
+            barrier.wait()
+
+            # 4. Moves
+            for index in owned:
+                target = targets[index]
+                if target >= 0 and moved[index]:
+                    cells[target] = index
+                    xs[index], ys[index] = target % width, target // width
+            barrier.wait()
+
+            # 5. Hand-offs, finished mowers are left out and do not move anymore
+            for index in owned:
+                if not shared.pending(index):
+                    targets[index] = -1
+            owned = {index for index in owned if x0 <= xs[index] < x1 and y0 <= ys[index] < y1 and shared.pending(index)}
+            for cell in border:
+                index = cells[cell]
+                if index >= 0 and index not in owned and shared.pending(index):
+                    owned.add(index)
+
+    def run(self, fleet: Fleet, lawn: LawnModel) -> Fleet:
+        """Run simulation with in a lawn with several mowers."""
+        if self.workers <= 1 or sum(fleet.pending(index) for index in range(len(fleet))) < self.min_instructions:
+            return SyncMowerSimulationService().run(fleet, lawn)
+        # Programs are copied expanded into the shared memory
+        check_no_program_trees(fleet, 'tiled')
+        lawn_dims = lawn.as_tuple()
+        tiles = self.tiles(lawn_dims, *self.tile_grid(lawn_dims, self.workers))
+        shared = SharedFleet.create(fleet, lawn, len(tiles))
+        try:
+            context = multiprocessing.get_context()
+            barrier = context.Barrier(len(tiles))
+            processes = [context.Process(target=self.run_tile, args=(shared.memory.name, shared.layout, tile, lawn_dims, barrier, worker))
+                         for worker, tile in enumerate(tiles)]
+            for process in processes:
+                process.start()
+            for process in processes:
+                process.join()
+            if any(process.exitcode for process in processes):
+                raise MowerSimulationError(value=[process.exitcode for process in processes], message='Tiled simulation worker failed.')
+            shared.write_back(fleet)
+        finally:
+            shared.close()
+            shared.memory.unlink()
+        return fleet
@@ -0,0 +1,116 @@
+from __future__ import annotations
+import sys
+from array import array
+from heapq import nlargest
+from typing import Any, Dict, IO, List, Tuple, Union
+
+from mower.resources.models.fleet_model import Fleet
+from mower.resources.models.lawn_model import LawnModel
+
+
+class ContentionStats:
+    """Where and by which mowers moves are blocked during a simulation, and how many mowers are active each round.
+
+    Blocked moves are counted per mower and per target cell, in arrays, or in a dict on lawns too large for
+    an array of their cells. Active mowers per round only depend on the programs (every active mower runs an
+    instruction each round, blocked or not), so they are counted before the simulation runs.
+    """
+
+    # Largest lawn, in cells, whose blocked moves are counted in an array (128 MB)
+    ARRAY_MAX_CELLS = 1 << 24
+    # Number of mowers and cells listed in summaries
+    SUMMARY_TOP = 10
+
+    def __init__(self, mowers: int, width: int, height: int) -> None:
+        self.width: int = width
+        self.height: int = height
+        self.mower_blocks: array = array('q', bytes(8 * mowers))
+        self.cell_blocks: Union[array, Dict[int, int]] = array('q', bytes(8 * width * height)) \
+            if width * height <= self.ARRAY_MAX_CELLS else {}
+        self.active_rounds: array = array('q')
+
+    @classmethod
+    def for_fleet(cls, fleet: Fleet, lawn: LawnModel) -> ContentionStats:
+        """Contention stats of a fleet about to be simulated, with its active mowers per round."""
+        contention = cls(len(fleet), lawn.width, lawn.height)
+        pendings = [fleet.pending(index) for index in range(len(fleet))]
+        rounds = max(pendings, default=0)
+        # Number of mowers running out of instructions at each round
+        ends = array('q', bytes(8 * (rounds + 1)))
+        for pending in pendings:
+            ends[pending] += 1
+        active = len(fleet) - ends[0]
+        for round_ in range(rounds):
+            contention.active_rounds.append(active)
+            active -= ends[round_ + 1]
+        return contention
+
+    def blocked(self, index: int, x: int, y: int, moves: int = 1) -> None:
+        """Count moves of a mower dropped into the occupied cell (x, y)."""
+        self.mower_blocks[index] += moves
+        cell = y * self.width + x
+        if isinstance(self.cell_blocks, array):
+            self.cell_blocks[cell] += moves
+        else:
+            self.cell_blocks[cell] = self.cell_blocks.get(cell, 0) + moves
+
+    def cells(self) -> List[Tuple[int, int, int]]:
+        """Cells some moves were blocked into, as (x, y, blocked moves) in cell order."""
+        if isinstance(self.cell_blocks, array):
+            counts = ((cell, count) for cell, count in enumerate(self.cell_blocks) if count)
+        else:
+            counts = sorted(self.cell_blocks.items())
+        return [(cell % self.width, cell // self.width, count) for cell, count in counts]
+
+    def summary(self) -> Dict[str, Any]:
+        """Summary statistics, JSON serializable."""
+        blocked_moves = sum(self.mower_blocks)
+        mower_rounds = sum(self.active_rounds)
+        cells = self.cells()
+        return {
+            'rounds': len(self.active_rounds),
+            'peak_active_mowers': max(self.active_rounds, default=0),
+            'mean_active_mowers': mower_rounds / len(self.active_rounds) if self.active_rounds else 0.0,
+            'blocked_moves': blocked_moves,
+            'blocked_share': blocked_moves / mower_rounds if mower_rounds else 0.0,
+            'blocked_mowers': sum(1 for count in self.mower_blocks if count),
+            'blocked_cells': len(cells),
+            'top_mowers': [[index, self.mower_blocks[index]]
+                           for index in nlargest(self.SUMMARY_TOP, (index for index, count in enumerate(self.mower_blocks) if count),
+                                                 key=self.mower_blocks.__getitem__)],
+            'top_cells': [list(cell) for cell in nlargest(self.SUMMARY_TOP, cells, key=lambda cell: cell[2])],
+        }
+
+    def write_csv(self, stream: IO[str]) -> None:
+        """Write the cells some moves were blocked into as CSV."""
+        stream.write('x,y,blocked_moves\n')
+        stream.writelines(f'{x},{y},{count}\n' for x, y, count in self.cells())
+
+    def write_pgm(self, stream: IO[bytes]) -> None:
+        """Write blocked moves per cell as a binary PGM image, north up, the hottest cell in white."""
+        peak = max((count for _, _, count in self.cells()), default=0)
+        max_value = min(max(peak, 1), 0xffff)
+        typecode = 'B' if max_value <= 0xff else 'H'
+        stream.write(b'P5\n%d %d\n%d\n' % (self.width, self.height, max_value))
+        for y in reversed(range(self.height)):
+            row = array(typecode, bytes(array(typecode).itemsize * self.width))
+            if isinstance(self.cell_blocks, array):
+                counts = enumerate(self.cell_blocks[y * self.width:(y + 1) * self.width])
+            else:
+                counts = ((x, self.cell_blocks.get(y * self.width + x, 0)) for x in range(self.width))
+            for x, count in counts:
+                if count:
+                    row[x] = count * max_value // peak
+            if typecode == 'H' and sys.byteorder == 'little':
+                # PGM samples of two bytes are big endian
+                row.byteswap()
+            stream.write(row.tobytes())
+
+    def write_heatmap(self, filename: str) -> None:
+        """Write blocked moves per cell as a PGM image for .pgm files, as CSV otherwise."""
+        if filename.lower().endswith('.pgm'):
+            with open(filename, 'wb') as heatmap_file:
+                self.write_pgm(heatmap_file)
+        else:
+            with open(filename, 'w') as heatmap_file:
+                self.write_csv(heatmap_file)
@@ -1,3 +1,5 @@
+from typing import Optional
+
 # from mower.utils.mower_logger import MowerLogger
 
 
@@ -49,5 +51,20 @@ class MowerModelError(MowerError):
 class LoadFileParserError(MowerError):
     """Custom error that is raised when FileParserService couldn't load correct data from the input file."""
 
+    def __init__(self, value: str, message: str, line_number: Optional[int] = None) -> None:
+        self.line_number = line_number
+        super().__init__(value, message if line_number is None else f'{message} Line {line_number}.')
+
+
+class MowerSimulationError(MowerError):
+    """Custom error that is raised when a MowerSimulationService couldn't run the simulation."""
+
+    def __init__(self, value: str, message: str) -> None:
+        super().__init__(value, message)
+
+
+class MowerPrinterError(MowerError):
+    """Custom error that is raised when a MowerPrinterService couldn't write the mowers."""
+
     def __init__(self, value: str, message: str) -> None:
         super().__init__(value, message)
@@ -0,0 +1,18 @@
+import logging
+import sys
+
+
+class MowerLogger:
+    """Mower logger, logs to stderr."""
+
+    NAME = 'mower'
+    FORMAT = '%(asctime)s %(levelname)s %(name)s: %(message)s'
+
+    def get_logger(self) -> logging.Logger:
+        """Get the mower logger, its handler is set on first use."""
+        logger = logging.getLogger(MowerLogger.NAME)
+        if not logger.handlers:
+            handler = logging.StreamHandler(sys.stderr)
+            handler.setFormatter(logging.Formatter(MowerLogger.FORMAT))
+            logger.addHandler(handler)
+        return logger
@@ -0,0 +1,71 @@
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Sequence
+
+from mower.utils.contention_stats import ContentionStats
+
+
+class MowerStats:
+    """Timings and counters of a Mower run.
+
+    Each phase records its wall and CPU times, and its peak of traced memory allocations when memory tracing
+    is on. Counters are free named integers, added to by the parsers, the simulations and the printers.
+    When contention is set, the simulations also record there which mowers are blocked and where.
+    """
+
+    def __init__(self, trace_memory: bool = False) -> None:
+        self.trace_memory: bool = trace_memory
+        self.phases: Dict[str, Dict[str, float]] = {}
+        self.counters: Dict[str, int] = {}
+        self.contention: Optional[ContentionStats] = None
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Time the block run in the context as a phase, phases run several times add up."""
+        tracing = self.trace_memory and not tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.start()
+        elif self.trace_memory and hasattr(tracemalloc, 'reset_peak'):
+            # Python 3.8 can not reset the peak, phases then report the peak since tracing started
+            tracemalloc.reset_peak()
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            phase = self.phases.setdefault(name, {'wall_seconds': 0.0, 'cpu_seconds': 0.0})
+            phase['wall_seconds'] += time.perf_counter() - wall
+            phase['cpu_seconds'] += time.process_time() - cpu
+            if self.trace_memory:
+                phase['peak_memory_bytes'] = max(phase.get('peak_memory_bytes', 0), tracemalloc.get_traced_memory()[1])
+            if tracing:
+                tracemalloc.stop()
+
+    def count(self, name: str, value: int = 1) -> None:
+        """Add to a counter."""
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def blocked(self, index: int, x: int, y: int, moves: int = 1) -> None:
+        """Count moves of a mower dropped into the occupied cell (x, y)."""
+        self.count('blocked_moves', moves)
+        if self.contention is not None:
+            self.contention.blocked(index, x, y, moves)
+
+    def blocked_many(self, indexes: Sequence[int], xs: Sequence[int], ys: Sequence[int]) -> None:
+        """Count a move of each mower dropped into the occupied cell (xs[i], ys[i])."""
+        self.count('blocked_moves', len(indexes))
+        if self.contention is not None:
+            for index, x, y in zip(indexes, xs, ys):
+                self.contention.blocked(index, x, y)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Phases, counters and contention summary as a JSON serializable dict."""
+        stats = {'phases': self.phases, 'counters': self.counters}
+        if self.contention is not None:
+            stats['contention'] = self.contention.summary()
+        return stats
+
+    def to_json(self) -> str:
+        """Phases, counters and contention summary as JSON."""
+        return json.dumps(self.to_dict(), indent=2)
@@ -0,0 +1,101 @@
+import hashlib
+import os
+import tempfile
+from contextlib import contextmanager
+from typing import BinaryIO, Iterator, List, Optional, Tuple
+
+
+# Default total size of the stored results (1 GB)
+DEFAULT_CACHE_MAX_BYTES = 1 << 30
+# Size of the chunks of input hashed at once (1 MB)
+HASH_CHUNK_SIZE = 1 << 20
+
+
+class ResultCache:
+    """Content-addressed store of simulation results, in a directory.
+
+    Results are stored in one file per key, the key being a hash of the input bytes and of anything else the
+    results depend on (engine, version). Files are written under a temporary name then renamed, so that
+    readers never see partial results. Once the stored results take more than max_bytes, the least recently
+    used ones are removed: reading results touches their file, so modification times order them by use.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = DEFAULT_CACHE_MAX_BYTES) -> None:
+        self.directory: str = directory
+        self.max_bytes: int = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(filename: str, *parts: str) -> str:
+        """Key of the results of an input file, parts being whatever else the results depend on."""
+        digest = hashlib.sha256()
+        for part in parts:
+            digest.update(part.encode() + b'\0')
+        with open(filename, 'rb') as input_file:
+            for chunk in iter(lambda: input_file.read(HASH_CHUNK_SIZE), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def path(self, key: str) -> str:
+        """Path of the results of a key."""
+        return os.path.join(self.directory, key)
+
+    def open(self, key: str) -> Optional[BinaryIO]:
+        """Open the stored results of a key, None when there are none."""
+        try:
+            stored_file = open(self.path(key), 'rb')
+        except FileNotFoundError:
+            return None
+        try:
+            os.utime(stored_file.fileno())
+        except OSError:
+            # Results are still readable when the store is read only, they are only not marked as used
+            pass
+        return stored_file
+
+    @contextmanager
+    def store(self, key: str) -> Iterator[BinaryIO]:
+        """Write the results of a key to the stream given in the context, they are stored once it exits without error."""
+        descriptor, temporary_path = tempfile.mkstemp(dir=self.directory, prefix='.', suffix='.tmp')
+        try:
+            with os.fdopen(descriptor, 'wb') as stored_file:
+                yield stored_file
+                stored_file.flush()
+                os.fsync(stored_file.fileno())
+            size = os.path.getsize(temporary_path)
+            if size <= self.max_bytes:
+                self.evict(self.max_bytes - size)
+                os.replace(temporary_path, self.path(key))
+        finally:
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+
+    def entries(self) -> List[Tuple[float, int, str]]:
+        """Stored results, as (last use time, size, path), least recently used first."""
+        entries = []
+        with os.scandir(self.directory) as scan:
+            for entry in scan:
+                if entry.name.startswith('.') or not entry.is_file():
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        entries.sort()
+        return entries
+
+    def evict(self, max_bytes: Optional[int] = None) -> None:
+        """Remove least recently used results until the stored results take max_bytes at most."""
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                # Removed by another process
+                pass
+            total -= size
@@ -0,0 +1,27 @@
+"""Commands of the mower CLI.
+
+COMMANDS is the registry the CLI resolves and lists commands from, without looking for the command modules nor
+importing them until one is run. discover_commands builds it from the cmd_*.py modules and a test checks that
+both agree: a new command module must be added to COMMANDS.
+"""
+import importlib
+import os
+from typing import Dict, Tuple
+
+
+# Command name: (module, short help)
+COMMANDS: Dict[str, Tuple[str, str]] = {
+    'batch': ('mower_cli.commands.cmd_batch', 'Runs many mower files in a pool of worker processes.'),
+    'convert': ('mower_cli.commands.cmd_convert', 'Converts a mower file between text and binary formats.'),
+}
+
+
+def discover_commands() -> Dict[str, Tuple[str, str]]:
+    """Registry of the cmd_*.py modules of the commands folder, importing each of them."""
+    commands = {}
+    for filename in sorted(os.listdir(os.path.dirname(os.path.abspath(__file__)))):
+        if filename.endswith('.py') and filename.startswith('cmd_'):
+            module = f'{__name__}.{filename[:-3]}'
+            command = importlib.import_module(module).cli
+            commands[command.name] = (module, command.get_short_help_str(limit=200))
+    return commands
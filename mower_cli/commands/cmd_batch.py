@@ -0,0 +1,55 @@
+import json
+import os
+import time
+
+import click
+
+from mower.resources.services.mower_batch_service import MowerBatchService, DEFAULT_BATCH_CHUNK_SIZE, DEFAULT_OUTPUT_SUFFIX
+from mower_cli.mower_cli import ENGINES, pass_context
+
+
+@click.command('batch', short_help='Runs many mower files in a pool of worker processes.')
+@click.argument('sources', nargs=-1)
+@click.option('-l', '--list', 'list_file', type=click.File('r'), default=None, help='File listing input files, one per line, - for stdin.')
+@click.option('-d', '--output-dir', type=click.Path(file_okay=False), default=None, help='Output directory, next to each input by default.')
+@click.option('--suffix', default=DEFAULT_OUTPUT_SUFFIX, show_default=True, help='Suffix added to input filenames to name outputs.')
+@click.option('-w', '--workers', type=int, default=None, help='Worker processes, one per CPU by default.')
+@click.option('--chunk-size', type=int, default=DEFAULT_BATCH_CHUNK_SIZE, show_default=True, help='Files given to a worker at once.')
+@click.option('--async', 'async_sim', is_flag=True, default=False, help='Runs the asynchronous simulation, as --engine async.')
+@click.option('--engine', type=click.Choice(ENGINES), default=None, help='Simulation engine, sync by default.')
+@click.option('--cache-dir', default=None, help='Results cache directory.')
+@click.option('--report', type=click.Path(dir_okay=False), default=None, help='Writes the result of every file and the summary as JSON.')
+@click.option('--stats', is_flag=True, default=False, help='Writes the batch summary as JSON to stderr.')
+@pass_context
+def cli(ctx, sources, list_file, output_dir, suffix, workers, chunk_size, async_sim, engine, cache_dir, report, stats):
+    """Runs the mowers of many files, directories of files or glob patterns, each file into its own output file.
+
+    Failed files are reported and do not stop the batch, the command fails once the batch is over.
+    """
+    if async_sim and engine not in (None, 'async'):
+        raise click.UsageError('--async runs the async engine, it can not be used with another --engine.')
+    inputs = MowerBatchService.expand_inputs(sources, suffix)
+    if list_file is not None:
+        inputs += MowerBatchService.read_list(list_file)
+    if not inputs:
+        raise click.ClickException('No input files.')
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    service = MowerBatchService(workers=workers, chunk_size=chunk_size, async_sim=async_sim, engine=engine,
+                                cache_dir=cache_dir)
+    start = time.perf_counter()
+    results = service.run(MowerBatchService.jobs(inputs, output_dir, suffix))
+    summary = MowerBatchService.summary(results, time.perf_counter() - start)
+
+    for result in results:
+        if not result.ok:
+            ctx.log('%s: %s', result.input_filename, result.error)
+    if report:
+        with open(report, 'w') as report_file:
+            json.dump({'summary': summary, 'files': [result.dict() for result in results]}, report_file, indent=2)
+    if stats:
+        click.echo(json.dumps(summary, indent=2), err=True)
+    ctx.vlog('Ran %d files in %.3f seconds.', len(results), summary['seconds'])
+    if summary['failed']:
+        raise click.ClickException(f'{summary["failed"]} of {summary["files"]} files failed.')
@@ -0,0 +1,28 @@
+import click
+
+from mower.resources.models.binary_fleet_model import BinaryFleetFile
+from mower.resources.services.mower_parsers_service import FileMowerParserService, BinaryMowerParserService
+from mower.resources.services.mower_printers_service import TextFleetPrinterService, BinaryMowerPrinterService
+from mower.utils.exceptions import MowerError
+from mower_cli.mower_cli import pass_context
+
+
+@click.command('convert', short_help='Converts a mower file between text and binary formats.')
+@click.argument('input_filename', type=click.Path(exists=True, dir_okay=False))
+@click.argument('output_filename', type=click.Path(dir_okay=False))
+@click.option('--to', 'output_format', type=click.Choice(['binary', 'text']), default=None,
+              help='Output format, the other format than the input one by default.')
+@pass_context
+def cli(ctx, input_filename, output_filename, output_format):
+    """Converts a mower file between text and binary formats."""
+    binary_input = BinaryFleetFile.is_binary(input_filename)
+    parser = BinaryMowerParserService(input_filename) if binary_input else FileMowerParserService(input_filename)
+    if output_format is None:
+        output_format = 'text' if binary_input else 'binary'
+    printer = BinaryMowerPrinterService(output_filename) if output_format == 'binary' else TextFleetPrinterService(output_filename)
+    try:
+        fleet, lawn = parser.parse()
+        printer.print(fleet, lawn)
+    except (MowerError, OSError) as error:
+        raise click.ClickException(str(error))
+    ctx.vlog('Converted %d mowers to %s format.', len(fleet), output_format)
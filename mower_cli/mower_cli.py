@@ -1,3 +1,4 @@
+import importlib
 import os
 import sys
 import click
@@ -5,11 +6,15 @@ import logging
 
 from pathlib import Path
 
-from mower import Mower
+from mower.utils.exceptions import MowerError
 from mower.utils.mower_logger import MowerLogger
+from mower.utils.result_cache import DEFAULT_CACHE_MAX_BYTES
+from mower_cli.commands import COMMANDS
 
 
 CONTEXT_SETTINGS = dict(auto_envvar_prefix='MOWER')
+# Simulation engines, the names of mower.mower.SIMULATION_ENGINES, not imported to keep the CLI startup light
+ENGINES = ('sync', 'async', 'macro', 'vectorized', 'parallel', 'tiled')
 
 
 class Context(object):
@@ -32,39 +37,89 @@ class Context(object):
             self.log(msg, *args)
 
 pass_context = click.make_pass_decorator(Context, ensure=True)
-cmd_folder = os.path.abspath(os.path.join(os.path.dirname(__file__), 'commands'))
 
 
 class MowerCLI(click.MultiCommand):
+    """Mower commands, listed from the COMMANDS registry and imported only when run."""
 
     def list_commands(self, ctx):
-        commands = []
-        for filename in os.listdir(cmd_folder):
-            if filename.endswith('.py') and filename.startswith('cmd_'):
-                commands.append(filename[4:-3])
-        commands.sort()
-        return commands
+        return sorted(COMMANDS)
 
     def get_command(self, ctx, name):
+        if name not in COMMANDS:
+            return None
         try:
-            if sys.version_info[0] == 2:
-                name = name.encode('ascii', 'replace')
-            mod = __import__(f'mower_cli.commands.cmd_{name}', None, None, ['cli'])
+            mod = importlib.import_module(COMMANDS[name][0])
         except ImportError as err:
             MowerLogger().get_logger().error(err)
             return
         return mod.cli
 
+    def format_commands(self, ctx, formatter):
+        """Lists commands with their registered short help, without importing them."""
+        rows = [(name, COMMANDS[name][1]) for name in self.list_commands(ctx)]
+        if rows:
+            with formatter.section('Commands'):
+                formatter.write_dl(rows)
 
-@click.command(cls=MOWERCLI, context_settings=CONTEXT_SETTINGS)
-@click.option('-f', '--filename', default=lambda: os.environ.get('MOWER_FILENAME',''), help='Mower filename.')
+
+@click.command(cls=MowerCLI, context_settings=CONTEXT_SETTINGS, invoke_without_command=True)
+@click.option('-f', '--filename', default=lambda: os.environ.get('MOWER_FILENAME', ''), help='Mower filename, stdin by default.')
+@click.option('-o', '--output', default='', help='Output filename, stdout by default.')
+@click.option('--async', 'async_sim', is_flag=True, default=False, help='Runs the asynchronous simulation, as --engine async.')
+@click.option('--engine', type=click.Choice(ENGINES), default=None, help='Simulation engine, sync by default.')
+@click.option('--stats', is_flag=True, default=False, help='Writes run timings and counters as JSON to stderr.')
+@click.option('--trace-memory', is_flag=True, default=False, help='Adds the peak memory of each phase to stats.')
+@click.option('--contention', is_flag=True, default=False, help='Adds blocked moves per mower, cell and round to stats.')
+@click.option('--heatmap', default='', help='Writes blocked moves per cell to a file, a PGM image for .pgm files, CSV otherwise.')
+@click.option('--cache-dir', default=lambda: os.environ.get('MOWER_CACHE_DIR', ''),
+              help='Results cache directory, results of files already run are copied from there.')
+@click.option('--cache-max-bytes', type=int, default=DEFAULT_CACHE_MAX_BYTES, show_default=True, help='Results cache size limit.')
+@click.option('--snapshot', default='',
+              help='Snapshot file, the fleet state is saved there and runs of an input grown by appended directions go on from it.')
+@click.option('--checkpoint', default='', help='Checkpoint file, the fleet state is saved there along the simulation.')
+@click.option('--checkpoint-steps', type=int, default=None, help='Instructions run between checkpoints.')
+@click.option('--checkpoint-seconds', type=float, default=None, help='Seconds between checkpoints, 60 without --checkpoint-steps.')
+@click.option('--resume', is_flag=True, default=False, help='Goes on from the checkpoint file when it matches the input.')
+@click.option('--pipelined', is_flag=True, default=False,
+              help='Prints results while the input is still being read and simulated. The whole fleet is still held until it is '
+                   'read, memory is only bounded with --arrival-order.')
+@click.option('--arrival-order', is_flag=True, default=False,
+              help='Pipelined, mowers start as soon as they are read: results depend on the order they arrive.')
+@click.option('--queue-size', type=int, default=None,
+              help='Mowers held between pipeline stages, 1024 by default. Bounds the mowers held only with --arrival-order.')
+@click.option('--compressed', is_flag=True, default=False, help='Reads directions with counts and groups, as F100 or (LFRF)*500.')
 @click.option('-v', '--verbose', is_flag=True, default=False, help='Enables verbose mode.')
 @pass_context
-def cli(ctx, verbose, filename):
+def cli(ctx, verbose, filename, output, async_sim, engine, stats, trace_memory, contention, heatmap, cache_dir, cache_max_bytes, snapshot, checkpoint,
+        checkpoint_steps, checkpoint_seconds, resume, pipelined, arrival_order, queue_size, compressed):
     """Mower command line interface."""
     if verbose is False:
         ctx.logger.setLevel(logging.NOTSET)
     else:
         ctx.logger.setLevel(logging.INFO)
-    
-    ctx.service = Mower(url)
\ No newline at end of file
+    ctx.verbose = verbose
+
+    if click.get_current_context().invoked_subcommand is None:
+        if async_sim and engine not in (None, 'async'):
+            raise click.UsageError('--async runs the async engine, it can not be used with another --engine.')
+        if (pipelined or arrival_order) and engine not in (None, 'async'):
+            raise click.UsageError('Pipelined runs use the async engine, --engine can not be another one.')
+        if (pipelined or arrival_order) and (contention or heatmap):
+            raise click.UsageError('--contention and --heatmap need the whole fleet, they can not be used with a pipelined run.')
+        # Imported here, the services are only needed to run mowers
+        from mower.mower import Mower, DEFAULT_QUEUE_SIZE
+        try:
+            ctx.service = Mower(input_filename=filename or None, async_sim=async_sim, output_filename=output or None,
+                                stats=stats or trace_memory, trace_memory=trace_memory, contention=contention or bool(heatmap),
+                                cache_dir=cache_dir or None, cache_max_bytes=cache_max_bytes, snapshot_filename=snapshot or None,
+                                checkpoint_filename=checkpoint or None, checkpoint_steps=checkpoint_steps,
+                                checkpoint_seconds=checkpoint_seconds, resume=resume, pipelined=pipelined, arrival_order=arrival_order,
+                                queue_size=queue_size or DEFAULT_QUEUE_SIZE, compressed=compressed, engine=engine)
+            ctx.service.run()
+            if heatmap:
+                ctx.service.stats.contention.write_heatmap(heatmap)
+            if stats or trace_memory or contention:
+                click.echo(ctx.service.stats.to_json(), err=True)
+        except (MowerError, OSError) as error:
+            raise click.ClickException(str(error))
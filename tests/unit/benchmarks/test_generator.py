@@ -0,0 +1,85 @@
+import os
+import pytest
+import tempfile
+
+from pydantic import ValidationError
+from unittest import TestCase
+
+from benchmarks.generator import FleetGenerator, WorkloadModel
+from mower.resources.services.mower_parsers_service import FileMowerParserService, BinaryMowerParserService
+
+
+class TestFleetGenerator(TestCase):
+    """FleetGenerator test."""
+    def test_fleet_is_deterministic(self):
+        """Test the same workload gives the same fleet, another seed another one."""
+        # Given
+        workload = WorkloadModel(width=20, height=10, density=0.3, program_length=15, seed=4)
+
+        # When
+        fleet = FleetGenerator(workload).fleet()
+        same_fleet = FleetGenerator(workload).fleet()
+        other_fleet = FleetGenerator(workload.copy(update={'seed': 5})).fleet()
+
+        # Then
+        self.assertEqual(60, len(fleet))
+        self.assertEqual(fleet.to_models(), same_fleet.to_models())
+        self.assertNotEqual(fleet.to_models(), other_fleet.to_models())
+        self.assertEqual(60, len({(x, y) for x, y in zip(fleet.xs, fleet.ys)}))
+        self.assertEqual([15] * 60, [fleet.pending(index) for index in range(60)])
+
+    def test_shared_fleet(self):
+        """Test mowers of a shared fleet run one program, at the positions of the fleet of the workload."""
+        # Given
+        generator = FleetGenerator(WorkloadModel(width=20, height=10, density=0.3, program_length=15))
+
+        # When
+        fleet = generator.fleet()
+        shared_fleet = generator.fleet(shared=True)
+
+        # Then
+        self.assertEqual(1, len({id(program) for program in shared_fleet.programs}))
+        self.assertEqual((fleet.xs, fleet.ys, fleet.orientations), (shared_fleet.xs, shared_fleet.ys, shared_fleet.orientations))
+
+    def test_instruction_mixes(self):
+        """Test instruction mixes weigh the instructions of the programs."""
+        for mix, most_common in (('turn-heavy', {2, 3}), ('straight-heavy', {0}), ('collision-heavy', {0})):
+            # When
+            fleet = FleetGenerator(WorkloadModel(width=10, height=10, density=0.5, program_length=200, mix=mix)).fleet()
+            codes = b''.join(program.codes() for program in fleet.programs)
+
+            # Then
+            counts = [codes.count(code) for code in range(4)]
+            self.assertEqual(most_common, {code for code in range(4) if counts[code] >= max(counts) * 0.8}, mix)
+
+    def test_collision_heavy_mowers_face_center(self):
+        """Test collision heavy mowers start facing the lawn center."""
+        # When
+        generator = FleetGenerator(WorkloadModel(width=9, height=9, density=1, program_length=0, mix='collision-heavy'))
+        fleet = generator.fleet()
+        orientations = {(x, y): orientation for x, y, orientation in zip(fleet.xs, fleet.ys, fleet.orientations)}
+
+        # Then
+        self.assertEqual((0, 1, 2, 3), (orientations[4, 0], orientations[0, 4], orientations[4, 8], orientations[8, 4]))
+
+    def test_workload_validation(self):
+        """Test unknown mixes and densities out of range are refused."""
+        for params in ({'mix': 'random'}, {'density': 1.5}):
+            with self.assertRaises(ValidationError):
+                WorkloadModel(**params)
+
+    def test_write_files(self):
+        """Test written text and binary files hold the fleet of the workload."""
+        # Given
+        generator = FleetGenerator(WorkloadModel(width=8, height=6, density=0.25, program_length=12, seed=1))
+        with tempfile.TemporaryDirectory() as directory:
+            text_filename, binary_filename = os.path.join(directory, 'fleet.txt'), os.path.join(directory, 'fleet.bin')
+
+            # When
+            generator.write_text(text_filename)
+            generator.write_binary(binary_filename)
+
+            # Then
+            for fleet, lawn in (FileMowerParserService(text_filename).parse(), BinaryMowerParserService(binary_filename).parse()):
+                self.assertEqual(generator.lawn(), lawn)
+                self.assertEqual(generator.fleet().to_models(), fleet.to_models())
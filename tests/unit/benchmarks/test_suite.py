@@ -0,0 +1,91 @@
+import json
+import os
+import pytest
+import tempfile
+import time
+
+from unittest import TestCase
+from unittest.mock import patch
+
+from benchmarks.__main__ import main
+from benchmarks.generator import FleetGenerator, WorkloadModel
+from benchmarks.suite import benchmark_kernel, benchmark_simulate, compare, run_suite
+from mower.resources.services import mower_simulations_service
+
+
+class TestSuite(TestCase):
+    """Benchmark suite test."""
+    def test_run_suite(self):
+        """Test running every phase on a small workload."""
+        # Given
+        workload = WorkloadModel(width=10, height=10, density=0.2, program_length=10)
+
+        # When
+        report = run_suite(workload, engines=['sync', 'macro'], repeat=1)
+
+        # Then
+        kernels = [('kernel', 'step')] + ([('kernel', 'step-arrays')] if mower_simulations_service.import_numpy() else [])
+        self.assertEqual(workload.dict(), report['workload'])
+        simulations = [('simulate', 'sync'), ('simulate', 'macro'), ('simulate-shared', 'sync'), ('simulate-shared', 'macro')]
+        self.assertEqual([('parse', 'text'), ('parse', 'parallel-text'), ('parse', 'binary')] + kernels + simulations + [('print', 'file')],
+                         [(result['phase'], result['name']) for result in report['results']])
+        self.assertEqual([200, 200, 200, 200], [result['mower_steps'] for result in report['results'] if result['phase'].startswith('simulate')])
+        self.assertTrue(all(result['seconds'] > 0 for result in report['results']))
+        json.dumps(report)
+
+    def test_simulate_times_only_the_runs(self):
+        """Test fleets are built outside the timed simulation runs."""
+        # Given
+        generator = FleetGenerator(WorkloadModel(width=5, height=5, density=0.2, program_length=5))
+        build_fleet = generator.fleet
+
+        def slow_fleet(shared=False):
+            time.sleep(0.2)
+            return build_fleet(shared)
+
+        # When
+        with patch.object(generator, 'fleet', slow_fleet):
+            results = benchmark_simulate(generator, ['sync'], repeat=2)
+
+        # Then
+        self.assertLess(results[0]['seconds'], 0.1)
+
+    def test_kernel(self):
+        """Test running the translate/rotate kernels over every instruction of the workload."""
+        # Given
+        generator = FleetGenerator(WorkloadModel(width=8, height=6, density=0.5, program_length=7))
+
+        # When
+        results = benchmark_kernel(generator, repeat=1)
+
+        # Then
+        self.assertEqual('step', results[0]['name'])
+        self.assertEqual({24 * 7}, {result['mower_steps'] for result in results})
+        self.assertTrue(all(result['mower_steps_per_second'] > 0 for result in results))
+
+    def test_compare(self):
+        """Test comparing two reports."""
+        # Given
+        baseline = {'results': [{'phase': 'simulate', 'name': 'sync', 'seconds': 2.0}, {'phase': 'print', 'name': 'file', 'seconds': 1.0}]}
+        current = {'results': [{'phase': 'simulate', 'name': 'sync', 'seconds': 0.5}, {'phase': 'simulate', 'name': 'tiled', 'seconds': 1.0}]}
+
+        # When
+        comparison = compare(baseline, current)
+
+        # Then
+        self.assertEqual([{'phase': 'simulate', 'name': 'sync', 'baseline_seconds': 2.0, 'seconds': 0.5, 'speedup': 4.0}], comparison)
+
+    def test_main_writes_report(self):
+        """Test the command line writes a JSON report."""
+        with tempfile.TemporaryDirectory() as directory:
+            output_filename = os.path.join(directory, 'report.json')
+
+            # When
+            status = main(['--width', '5', '--height', '5', '--program-length', '5', '--phases', 'simulate', '--engines', 'sync',
+                           '--repeat', '1', '--output', output_filename])
+
+            # Then
+            self.assertEqual(0, status)
+            with open(output_filename) as report_file:
+                report = json.load(report_file)
+            self.assertEqual(['sync'], [result['name'] for result in report['results']])
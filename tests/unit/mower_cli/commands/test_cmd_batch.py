@@ -0,0 +1,80 @@
+import json
+import os
+import shutil
+import tempfile
+
+from click.testing import CliRunner
+from unittest import TestCase
+
+from mower_cli.mower_cli import cli
+
+INPUT_FILENAME = os.path.join(os.path.dirname(__file__), os.pardir, os.pardir, os.pardir, 'data', 'input.txt')
+
+
+class TestBatchCommand(TestCase):
+    """batch command test."""
+    def test_batch(self):
+        """Test run a directory and a list of files, each one into its output file."""
+        # Given
+        with tempfile.TemporaryDirectory() as directory:
+            inputs, outputs = os.path.join(directory, 'inputs'), os.path.join(directory, 'outputs')
+            os.makedirs(inputs)
+            for name in ('a.txt', 'b.txt'):
+                shutil.copy(INPUT_FILENAME, os.path.join(inputs, name))
+            list_filename = os.path.join(directory, 'list.txt')
+            with open(list_filename, 'w') as list_file:
+                list_file.write(INPUT_FILENAME + '\n')
+            report_filename = os.path.join(directory, 'report.json')
+
+            # When
+            result = CliRunner().invoke(cli, ['batch', inputs, '--list', list_filename, '-d', outputs, '-w', '2', '--report', report_filename])
+
+            # Then
+            self.assertEqual(0, result.exit_code, result.output)
+            self.assertEqual(['a.txt.out', 'b.txt.out', 'input.txt.out'], sorted(os.listdir(outputs)))
+            with open(os.path.join(outputs, 'a.txt.out')) as output_file:
+                self.assertEqual('1 3 N\n5 1 E\n3 4 N\n2 4 E\n', output_file.read())
+            with open(report_filename) as report_file:
+                report = json.load(report_file)
+            self.assertEqual((3, 12), (report['summary']['succeeded'], report['summary']['mowers']))
+            self.assertEqual(3, len(report['files']))
+
+    def test_batch_with_engine(self):
+        """Test run files with a named simulation engine."""
+        # Given
+        with tempfile.TemporaryDirectory() as directory:
+            outputs = os.path.join(directory, 'outputs')
+
+            # When
+            result = CliRunner().invoke(cli, ['batch', INPUT_FILENAME, '-d', outputs, '-w', '1', '--engine', 'vectorized'])
+
+            # Then
+            self.assertEqual(0, result.exit_code, result.output)
+            with open(os.path.join(outputs, 'input.txt.out')) as output_file:
+                self.assertEqual('1 3 N\n5 1 E\n3 4 N\n2 4 E\n', output_file.read())
+
+    def test_batch_reports_failures(self):
+        """Test failed files are reported, the other files still run and the command fails."""
+        # Given
+        with tempfile.TemporaryDirectory() as directory:
+            shutil.copy(INPUT_FILENAME, os.path.join(directory, 'good.txt'))
+            with open(os.path.join(directory, 'bad.txt'), 'w') as bad_file:
+                bad_file.write('garbage\n')
+
+            # When
+            result = CliRunner().invoke(cli, ['batch', os.path.join(directory, '*.txt'), '-w', '1'])
+
+            # Then
+            self.assertEqual(1, result.exit_code)
+            self.assertIn('bad.txt: LoadFileParserError', result.output)
+            self.assertIn('1 of 2 files failed.', result.output)
+            self.assertTrue(os.path.exists(os.path.join(directory, 'good.txt.out')))
+
+    def test_batch_without_inputs(self):
+        """Test batches without input files fail."""
+        # When
+        result = CliRunner().invoke(cli, ['batch'])
+
+        # Then
+        self.assertEqual(1, result.exit_code)
+        self.assertIn('No input files.', result.output)
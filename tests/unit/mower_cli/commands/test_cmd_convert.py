@@ -0,0 +1,63 @@
+import os
+import pytest
+import tempfile
+
+from click.testing import CliRunner
+from unittest import TestCase
+
+from mower.resources.models.binary_fleet_model import BinaryFleetFile
+from mower_cli.mower_cli import cli
+
+INPUT_FILENAME = os.path.join(os.path.dirname(__file__), os.pardir, os.pardir, os.pardir, 'data', 'input.txt')
+
+
+class TestConvertCommand(TestCase):
+    """convert command test."""
+    def test_convert_text_to_binary_and_back(self):
+        """Test converting a text file to binary, then back to text."""
+        # Given
+        with tempfile.TemporaryDirectory() as directory:
+            binary_filename = os.path.join(directory, 'input.bin')
+            text_filename = os.path.join(directory, 'input.txt')
+
+            # When
+            to_binary = CliRunner().invoke(cli, ['convert', INPUT_FILENAME, binary_filename])
+            to_text = CliRunner().invoke(cli, ['convert', binary_filename, text_filename])
+
+            # Then
+            self.assertEqual((0, 0), (to_binary.exit_code, to_text.exit_code), to_binary.output + to_text.output)
+            self.assertTrue(BinaryFleetFile.is_binary(binary_filename))
+            with open(INPUT_FILENAME) as input_file, open(text_filename) as text_file:
+                self.assertEqual(input_file.read().strip(), text_file.read().strip())
+
+    def test_convert_to_given_format(self):
+        """Test converting a text file to text normalizes it."""
+        # Given
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, 'input.txt')
+            output_filename = os.path.join(directory, 'output.txt')
+            with open(filename, 'w') as mower_file:
+                mower_file.write(' 5  5\n\n1 2 N\nLF\nLF\n')
+
+            # When
+            result = CliRunner().invoke(cli, ['convert', '--to', 'text', filename, output_filename])
+
+            # Then
+            self.assertEqual(0, result.exit_code, result.output)
+            with open(output_filename) as output_file:
+                self.assertEqual('5 5\n1 2 N\nLFLF\n', output_file.read())
+
+    def test_convert_reports_errors(self):
+        """Test parse errors are reported without traceback."""
+        # Given
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, 'input.txt')
+            with open(filename, 'w') as mower_file:
+                mower_file.write('5 5\n9 2 N\n')
+
+            # When
+            result = CliRunner().invoke(cli, ['convert', filename, os.path.join(directory, 'output.bin')])
+
+        # Then
+        self.assertEqual(1, result.exit_code)
+        self.assertIn('Mower is outside the Lawn. Line 2.', result.output)
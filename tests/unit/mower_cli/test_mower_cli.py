@@ -0,0 +1,201 @@
+import json
+import os
+import pytest
+import subprocess
+import sys
+import tempfile
+
+from click.testing import CliRunner
+from unittest import TestCase
+
+from mower_cli.commands import COMMANDS, discover_commands
+from mower_cli.mower_cli import cli
+
+INPUT_FILENAME = os.path.join(os.path.dirname(__file__), os.pardir, os.pardir, 'data', 'input.txt')
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir, os.pardir, os.pardir))
+# Budget of importing the CLI, as measured by python -X importtime (microseconds), about 100 ms once modules are cached
+CLI_IMPORT_BUDGET_US = 250_000
+# Modules only needed to run mowers, that the CLI must not import before
+HEAVY_MODULES = ('mower.mower', 'mower.resources', 'pydantic', 'numpy', 'asyncio', 'mower_cli.commands.cmd_batch',
+                 'mower_cli.commands.cmd_convert')
+
+
+def import_times(code):
+    """Helper function to run code in a new interpreter, returns its imports as {module: cumulative microseconds}."""
+    process = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=ROOT_DIR, capture_output=True, text=True,
+                             env={**os.environ, 'PYTHONPATH': ROOT_DIR}, check=True)
+    times = {}
+    for line in process.stderr.splitlines():
+        if line.startswith('import time:'):
+            _, cumulative, name = line[len('import time:'):].split('|')
+            if cumulative.strip().isdigit():
+                times[name.strip()] = int(cumulative)
+    return times
+
+
+class TestMowerCLI(TestCase):
+    """Mower CLI test."""
+    def test_run(self):
+        """Test run the mowers of a file, final positions are printed."""
+        # When
+        result = CliRunner().invoke(cli, ['-f', INPUT_FILENAME])
+
+        # Then
+        self.assertEqual(0, result.exit_code, result.output)
+        self.assertEqual('1 3 N\n5 1 E\n3 4 N\n2 4 E\n', result.output)
+
+    def test_run_to_output_file(self):
+        """Test run the mowers of a file, final positions are written to a file."""
+        # Given
+        with tempfile.TemporaryDirectory() as directory:
+            output_filename = os.path.join(directory, 'output.txt')
+
+            # When
+            result = CliRunner().invoke(cli, ['-f', INPUT_FILENAME, '-o', output_filename, '--async'])
+
+            # Then
+            self.assertEqual(0, result.exit_code, result.output)
+            with open(output_filename) as output_file:
+                self.assertEqual('1 3 N\n5 1 E\n3 4 N\n2 4 E\n', output_file.read())
+
+    def test_run_with_engine(self):
+        """Test run the mowers of a file with a named simulation engine, final positions are printed."""
+        # When
+        result = CliRunner().invoke(cli, ['-f', INPUT_FILENAME, '--engine', 'macro'])
+
+        # Then
+        self.assertEqual(0, result.exit_code, result.output)
+        self.assertEqual('1 3 N\n5 1 E\n3 4 N\n2 4 E\n', result.output)
+
+    def test_run_rejects_engine_with_async(self):
+        """Test --async can not be used with another engine."""
+        # When
+        result = CliRunner().invoke(cli, ['-f', INPUT_FILENAME, '--async', '--engine', 'tiled'])
+
+        # Then
+        self.assertEqual(2, result.exit_code, result.output)
+
+    def test_run_with_stats(self):
+        """Test run the mowers of a file, timings and counters are written as JSON to stderr."""
+        # Given
+        with tempfile.TemporaryDirectory() as directory:
+            output_filename = os.path.join(directory, 'output.txt')
+
+            # When
+            result = CliRunner().invoke(cli, ['-f', INPUT_FILENAME, '-o', output_filename, '--stats'])
+
+            # Then
+            self.assertEqual(0, result.exit_code, result.output)
+            with open(output_filename) as output_file:
+                self.assertEqual('1 3 N\n5 1 E\n3 4 N\n2 4 E\n', output_file.read())
+            self.assertEqual(4, json.loads(result.output)['counters']['mowers'])
+
+    def test_run_with_heatmap(self):
+        """Test run the mowers of a file, blocked moves per cell are written to a heatmap file."""
+        # Given
+        with tempfile.TemporaryDirectory() as directory:
+            heatmap_filename = os.path.join(directory, 'heatmap.csv')
+
+            # When
+            result = CliRunner().invoke(cli, ['-f', INPUT_FILENAME, '--heatmap', heatmap_filename])
+
+            # Then
+            self.assertEqual(0, result.exit_code, result.output)
+            self.assertEqual('1 3 N\n5 1 E\n3 4 N\n2 4 E\n', result.output)
+            with open(heatmap_filename) as heatmap_file:
+                self.assertEqual('x,y,blocked_moves\n3,4,2\n', heatmap_file.read())
+
+    def test_run_with_cache(self):
+        """Test run the mowers of a file twice with a results cache, final positions are printed both times."""
+        # Given
+        with tempfile.TemporaryDirectory() as directory:
+            cache_dir = os.path.join(directory, 'cache')
+
+            # When
+            results = [CliRunner().invoke(cli, ['-f', INPUT_FILENAME, '--cache-dir', cache_dir]) for _ in range(2)]
+
+            # Then
+            for result in results:
+                self.assertEqual(0, result.exit_code, result.output)
+                self.assertEqual('1 3 N\n5 1 E\n3 4 N\n2 4 E\n', result.output)
+            self.assertEqual(1, len(os.listdir(cache_dir)))
+
+    def test_run_pipelined_from_stdin(self):
+        """Test run the mowers read from stdin through the pipeline, final positions are printed."""
+        # Given
+        with open(INPUT_FILENAME) as input_file:
+            content = input_file.read()
+
+        # When
+        result = CliRunner().invoke(cli, ['--pipelined', '--queue-size', '2'], input=content)
+
+        # Then
+        self.assertEqual(0, result.exit_code, result.output)
+        self.assertEqual('1 3 N\n5 1 E\n3 4 N\n2 4 E\n', result.output)
+
+    def test_run_compressed_from_stdin(self):
+        """Test run mowers with compressed directions read from stdin."""
+        # When
+        result = CliRunner().invoke(cli, ['--compressed'], input='5 6\n1 2 N\n(LF)*3 LF2\n3 3 E\nF2 R F2 R F R2 F\n')
+
+        # Then
+        self.assertEqual(0, result.exit_code, result.output)
+        self.assertEqual('1 3 N\n5 1 E\n', result.output)
+
+    def test_run_pipelined_rejects_heatmap(self):
+        """Test a pipelined run can not write a heatmap."""
+        # When
+        result = CliRunner().invoke(cli, ['-f', INPUT_FILENAME, '--pipelined', '--heatmap', 'heatmap.csv'])
+
+        # Then
+        self.assertEqual(2, result.exit_code, result.output)
+
+    def test_run_reports_errors(self):
+        """Test errors are reported without traceback."""
+        # Given
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, 'input.txt')
+            with open(filename, 'w') as mower_file:
+                mower_file.write('5 5\n1 2 N\nLFX\n')
+
+            # When
+            result = CliRunner().invoke(cli, ['-f', filename])
+
+        # Then
+        self.assertEqual(1, result.exit_code)
+        self.assertIn('Wrong Mower directions. Line 3.', result.output)
+
+
+class TestMowerCLIStartup(TestCase):
+    """Mower CLI startup test."""
+    def test_registry_matches_command_modules(self):
+        """Test the command registry lists every command module, with its short help."""
+        self.assertEqual(discover_commands(), COMMANDS)
+
+    def test_import_is_lazy(self):
+        """Test importing the CLI does not import the services nor the commands."""
+        # When
+        modules = import_times('import mower_cli.mower_cli')
+
+        # Then
+        self.assertIn('mower_cli.mower_cli', modules)
+        self.assertEqual([], [name for name in modules if name.startswith(HEAVY_MODULES)])
+
+    def test_help_does_not_import_commands(self):
+        """Test listing the commands does not import them."""
+        # When
+        modules = import_times('from click.testing import CliRunner\n'
+                               'from mower_cli.mower_cli import cli\n'
+                               'result = CliRunner().invoke(cli, ["--help"])\n'
+                               'assert "batch" in result.output and "convert" in result.output, result.output')
+
+        # Then
+        self.assertEqual([], [name for name in modules if name.startswith(HEAVY_MODULES)])
+
+    def test_import_time_budget(self):
+        """Test importing the CLI takes less than its budget, best of three runs."""
+        # When
+        best = min(import_times('import mower_cli.mower_cli')['mower_cli.mower_cli'] for _ in range(3))
+
+        # Then
+        self.assertLess(best, CLI_IMPORT_BUDGET_US)
@@ -0,0 +1,179 @@
+import io
+import os
+import pytest
+import struct
+import tempfile
+
+from unittest import TestCase
+
+from mower.resources.models.binary_fleet_model import BinaryFleetFile, BINARY_ARRAYS, BINARY_HEADER, aligned
+from mower.resources.models.directions import OrdinalDirection
+from mower.resources.models.fleet_model import Fleet
+from mower.resources.models.instruction_tape import InstructionTape
+from mower.resources.models.lawn_model import LawnModel
+from mower.resources.models.program_tree_model import ProgramTree
+from mower.utils.exceptions import LoadFileParserError, MowerPrinterError
+
+
+class TestBinaryFleetFile(TestCase):
+    """BinaryFleetFile Test."""
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.directory.name, 'fleet.bin')
+        self.lawn = LawnModel(height=5, width=6)
+        self.fleet = Fleet()
+        self.fleet.add(1, 2, OrdinalDirection.NORTH.code, InstructionTape.from_str('LFLFLFLFF'))
+        self.fleet.add(3, 3, OrdinalDirection.EAST.code, InstructionTape.from_str('FFRFFRFRRF'))
+        self.fleet.add(0, 4, OrdinalDirection.WEST.code)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, data):
+        """Helper method to write a file."""
+        with open(self.filename, 'wb') as fleet_file:
+            fleet_file.write(data)
+
+    def write_corrupted(self, *changes):
+        """Helper method to write the fleet with items of its arrays changed, as (array name, index, value)."""
+        stream = io.BytesIO()
+        BinaryFleetFile.write(stream, self.fleet, self.lawn)
+        data = bytearray(stream.getvalue())
+        offsets, offset = {}, BINARY_HEADER.size
+        for name, typecode in BINARY_ARRAYS:
+            offsets[name] = offset
+            offset += aligned(len(self.fleet) * struct.calcsize(typecode))
+        for name, index, value in changes:
+            typecode = dict(BINARY_ARRAYS)[name]
+            struct.pack_into(f'<{typecode}', data, offsets[name] + index * struct.calcsize(typecode), value)
+        self.write(bytes(data))
+
+    def test_write_and_open(self):
+        """Test a fleet written in binary format is loaded back."""
+        # Given
+        stream = io.BytesIO()
+
+        # When
+        written = BinaryFleetFile.write(stream, self.fleet, self.lawn)
+        self.write(stream.getvalue())
+        with BinaryFleetFile.open(self.filename) as fleet_file:
+            lawn, fleet = fleet_file.lawn(), fleet_file.to_fleet()
+            sizes, offsets = list(fleet_file.sizes), list(fleet_file.offsets)
+
+        # Then
+        self.assertEqual(len(stream.getvalue()), written)
+        self.assertEqual(0, written % 8)
+        self.assertEqual(self.lawn, lawn)
+        self.assertEqual([9, 10, 0], sizes)
+        self.assertEqual([0, 3, 6], offsets)
+        self.assertEqual([fleet.position(index) for index in range(3)], [self.fleet.position(index) for index in range(3)])
+        self.assertEqual(self.fleet.programs, fleet.programs)
+        self.assertEqual([0, 0, 0], list(fleet.cursors))
+
+    def test_write_pending_instructions(self):
+        """Test only instructions after the cursors are written."""
+        # Given
+        self.fleet.cursors[0] = 7
+        stream = io.BytesIO()
+
+        # When
+        BinaryFleetFile.write(stream, self.fleet, self.lawn)
+        self.write(stream.getvalue())
+        with BinaryFleetFile.open(self.filename) as fleet_file:
+            program = fleet_file.program(0)
+
+        # Then
+        self.assertEqual('FF', str(program))
+
+    def test_write_refuses_program_trees(self):
+        """Test mowers with program trees are not written, their programs would be expanded."""
+        # Given
+        self.fleet.add(9, 9, OrdinalDirection.NORTH.code, ProgramTree.parse(b'F1000000000'))
+
+        # When / Then
+        with self.assertRaises(MowerPrinterError):
+            BinaryFleetFile.write(io.BytesIO(), self.fleet, self.lawn)
+
+    def test_is_binary(self):
+        """Test binary files are told from text files."""
+        # Given
+        stream = io.BytesIO()
+        BinaryFleetFile.write(stream, self.fleet, self.lawn)
+        self.write(stream.getvalue())
+        text_filename = os.path.join(self.directory.name, 'fleet.txt')
+        with open(text_filename, 'w') as text_file:
+            text_file.write('5 6\n')
+
+        # Then
+        self.assertTrue(BinaryFleetFile.is_binary(self.filename))
+        self.assertFalse(BinaryFleetFile.is_binary(text_filename))
+
+    def test_open_wrong_magic(self):
+        """Test opening a file that is not a binary fleet file."""
+        # Given
+        self.write(b'5 6\n' + bytes(BINARY_HEADER.size))
+
+        # Then
+        with self.assertRaises(LoadFileParserError):
+            BinaryFleetFile.open(self.filename)
+
+    def test_open_truncated_file(self):
+        """Test opening truncated binary fleet files."""
+        # Given
+        stream = io.BytesIO()
+        BinaryFleetFile.write(stream, self.fleet, self.lawn)
+
+        for data in (b'', stream.getvalue()[:BINARY_HEADER.size - 1], stream.getvalue()[:-8]):
+            self.write(data)
+
+            # Then
+            with self.assertRaises(LoadFileParserError):
+                BinaryFleetFile.open(self.filename)
+
+    def test_open_mower_outside_lawn(self):
+        """Test opening a file with a mower outside the lawn."""
+        for name, value in (('xs', 99), ('xs', -1), ('ys', 5)):
+            # Given
+            self.write_corrupted((name, 1, value))
+
+            # Then
+            with self.assertRaises(LoadFileParserError):
+                BinaryFleetFile.open(self.filename)
+
+    def test_open_wrong_orientation(self):
+        """Test opening a file with an unknown orientation code."""
+        # Given
+        self.write_corrupted(('orientations', 2, 7))
+
+        # Then
+        with self.assertRaises(LoadFileParserError):
+            BinaryFleetFile.open(self.filename)
+
+    def test_open_program_size_outside_data(self):
+        """Test opening a file with a program longer than the program data."""
+        for value in (10 ** 6, -1):
+            # Given
+            self.write_corrupted(('sizes', 1, value))
+
+            # Then
+            with self.assertRaises(LoadFileParserError):
+                BinaryFleetFile.open(self.filename)
+
+    def test_open_program_offset_outside_data(self):
+        """Test opening a file with a program starting after the program data."""
+        for value in (10 ** 6, -1):
+            # Given
+            self.write_corrupted(('offsets', 0, value))
+
+            # Then
+            with self.assertRaises(LoadFileParserError):
+                BinaryFleetFile.open(self.filename)
+
+    def test_open_two_mowers_same_position(self):
+        """Test opening a file with two mowers on the same cell."""
+        # Given
+        self.write_corrupted(('xs', 2, 3), ('ys', 2, 3))
+
+        # Then
+        with self.assertRaises(LoadFileParserError):
+            BinaryFleetFile.open(self.filename)
@@ -0,0 +1,169 @@
+import pickle
+import pytest
+import sys
+
+from unittest import TestCase
+
+from mower.resources.models.directions import OrdinalDirection, RelativeDirection
+from mower.resources.models.fleet_model import Fleet
+from mower.resources.models.instruction_tape import InstructionTape
+from mower.resources.models.mower_model import MowerModel
+from mower.resources.models.program_tree_model import ProgramTree
+
+
+class TestFleet(TestCase):
+    """Fleet Test."""
+    def test_add(self):
+        """Test adding mowers to a fleet."""
+        # Given
+        fleet = Fleet()
+
+        # When
+        first = fleet.add(1, 2, OrdinalDirection.EAST.code)
+        second = fleet.add(3, 4, OrdinalDirection.WEST.code, InstructionTape.from_str('LF'))
+
+        # Then
+        self.assertEqual((0, 1), (first, second))
+        self.assertEqual(2, len(fleet))
+        self.assertEqual((1, 2, OrdinalDirection.EAST), fleet.position(first))
+        self.assertEqual((3, 4, OrdinalDirection.WEST), fleet.position(second))
+        self.assertEqual([0, 2], [fleet.pending(first), fleet.pending(second)])
+
+    def test_set_position(self):
+        """Test moving a mower of a fleet."""
+        # Given
+        fleet = Fleet()
+        fleet.add(1, 2, OrdinalDirection.EAST.code)
+
+        # When
+        fleet.set_position(0, (2, 2, OrdinalDirection.SOUTH))
+
+        # Then
+        self.assertEqual((2, 2, OrdinalDirection.SOUTH), fleet.position(0))
+
+    def test_to_models(self):
+        """Test building mower models with the pending directions."""
+        # Given
+        fleet = Fleet()
+        fleet.add(1, 2, OrdinalDirection.EAST.code, InstructionTape.from_str('LFR'))
+        fleet.cursors[0] = 1
+
+        # When
+        mowers = fleet.to_models()
+
+        # Then
+        expected_mowers = [MowerModel(position=(1, 2, OrdinalDirection.EAST), directions='FR')]
+
+        self.assertEqual(expected_mowers, mowers)
+
+    def test_to_models_keeps_program_trees(self):
+        """Test mower models get the program trees not started as they are, the started ones from their cursor."""
+        # Given
+        tree = ProgramTree.parse(b'F1000000000')
+        fleet = Fleet()
+        fleet.add(1, 2, OrdinalDirection.EAST.code, tree)
+        fleet.add(0, 0, OrdinalDirection.SOUTH.code, ProgramTree.parse(b'(LF)*2'))
+        fleet.cursors[1] = 1
+
+        # When
+        mowers = fleet.to_models()
+
+        # Then
+        self.assertIs(tree, mowers[0].directions)
+        self.assertEqual('FLF', str(mowers[1].directions))
+        self.assertEqual([0, 0], list(Fleet.from_models(mowers).cursors))
+
+    def test_from_models(self):
+        """Test building a fleet from mower models."""
+        # Given
+        mower = MowerModel(position=(1, 2, OrdinalDirection.EAST), directions='LFR')
+        mower.directions.read()
+
+        # When
+        fleet = Fleet.from_models([mower])
+
+        # Then
+        self.assertEqual((1, 2, OrdinalDirection.EAST), fleet.position(0))
+        self.assertEqual(2, fleet.pending(0))
+        self.assertEqual(RelativeDirection.FRONT.code, fleet.programs[0].code_at(fleet.cursors[0]))
+
+    def test_extend(self):
+        """Test appending the mowers of another fleet."""
+        # Given
+        fleet, other_fleet = Fleet(), Fleet()
+        fleet.add(1, 2, OrdinalDirection.EAST.code, InstructionTape.from_str('F'))
+        other_fleet.add(3, 4, OrdinalDirection.WEST.code, InstructionTape.from_str('LR'))
+
+        # When
+        fleet.extend(other_fleet)
+
+        # Then
+        self.assertEqual([(1, 2, OrdinalDirection.EAST), (3, 4, OrdinalDirection.WEST)], [fleet.position(0), fleet.position(1)])
+        self.assertIs(other_fleet.programs[0], fleet.programs[1])
+
+    def test_pickle(self):
+        """Test a fleet survives pickling with its programs and cursors."""
+        # Given
+        fleet = Fleet()
+        fleet.add(1, 2, OrdinalDirection.EAST.code, InstructionTape.from_str('LFRBR'))
+        fleet.add(0, 0, OrdinalDirection.SOUTH.code)
+        fleet.add(5, 3, OrdinalDirection.NORTH.code, InstructionTape.from_str('FFFFFFFFF'))
+        fleet.cursors[2] = 4
+
+        # When
+        unpickled_fleet = pickle.loads(pickle.dumps(fleet))
+
+        # Then
+        self.assertEqual([fleet.position(index) for index in range(3)], [unpickled_fleet.position(index) for index in range(3)])
+        self.assertEqual(['LFRBR', '', 'FFFFFFFFF'], [str(program) for program in unpickled_fleet.programs])
+        self.assertEqual(fleet.cursors, unpickled_fleet.cursors)
+
+    def test_pickle_program_trees(self):
+        """Test program trees are pickled without being expanded."""
+        # Given
+        fleet = Fleet()
+        fleet.add(1, 2, OrdinalDirection.EAST.code, ProgramTree.parse(b'F1000000000'))
+        fleet.add(0, 0, OrdinalDirection.SOUTH.code, InstructionTape.from_str('LF'))
+        fleet.cursors[0] = 7
+
+        # When
+        data = pickle.dumps(fleet)
+        unpickled_fleet = pickle.loads(data)
+
+        # Then
+        self.assertLess(len(data), 1000)
+        self.assertEqual(['F1000000000', 'LF'], [str(program) for program in unpickled_fleet.programs])
+        self.assertEqual(fleet.cursors, unpickled_fleet.cursors)
+
+    def test_pickle_shared_programs(self):
+        """Test programs shared by mowers are pickled once and stay shared."""
+        # Given
+        shared = InstructionTape.from_str('LFRF' * 10000)
+        fleet = Fleet()
+        for index in range(100):
+            fleet.add(index, 0, OrdinalDirection.NORTH.code, shared)
+        fleet.add(0, 1, OrdinalDirection.NORTH.code, InstructionTape.from_str('B'))
+
+        # When
+        data = pickle.dumps(fleet)
+        unpickled_fleet = pickle.loads(data)
+
+        # Then
+        self.assertLess(len(data), 2 * len(shared.packed()))
+        self.assertEqual(2, len({id(program) for program in unpickled_fleet.programs}))
+        self.assertIs(unpickled_fleet.programs[0], unpickled_fleet.programs[99])
+        self.assertEqual(shared.codes(0), unpickled_fleet.programs[0].codes(0))
+        self.assertEqual('B', str(unpickled_fleet.programs[100]))
+
+    def test_memory_per_mower(self):
+        """Test the memory taken by a mower, without its program, is lower than 100 bytes."""
+        # Given
+        fleet = Fleet()
+        for index in range(1000):
+            fleet.add(index, index, OrdinalDirection.NORTH.code)
+
+        # When
+        arrays_size = sum(sys.getsizeof(values) for values in (fleet.xs, fleet.ys, fleet.orientations, fleet.programs, fleet.cursors))
+
+        # Then
+        self.assertLess(arrays_size / len(fleet), 100)
@@ -0,0 +1,203 @@
+import os
+import tempfile
+
+from unittest import TestCase
+from unittest.mock import patch
+
+from mower.resources.models.fleet_model import Fleet
+from mower.resources.models.fleet_snapshot_model import FleetSnapshot, FleetCheckpoints
+from mower.resources.models.instruction_tape import InstructionTape
+from mower.resources.models.lawn_model import LawnModel
+from mower.resources.models.program_tree_model import ProgramTree
+from mower.resources.services.mower_simulations_service import SyncMowerSimulationService
+from mower.utils.exceptions import LoadFileParserError
+
+
+LAWN = LawnModel(height=5, width=6)
+
+
+def build_fleet(programs):
+    """Helper function to build a fleet of mowers at the same start positions with some programs."""
+    fleet = Fleet()
+    for index, program in enumerate(programs):
+        fleet.add(index, index, index % 4, InstructionTape.from_str(program))
+    return fleet
+
+
+def simulate_and_capture(programs):
+    """Helper function to simulate a fleet and snapshot its final state."""
+    fleet = build_fleet(programs)
+    start_digest = FleetSnapshot.start_digest(fleet, LAWN)
+    fleet = SyncMowerSimulationService().run(fleet, LAWN)
+    return fleet, FleetSnapshot.capture(fleet, LAWN, max(fleet.cursors), start_digest)
+
+
+class TestFleetSnapshot(TestCase):
+    """FleetSnapshot test."""
+    def test_capture(self):
+        """Test a snapshot holds the fleet state."""
+        # When
+        fleet, snapshot = simulate_and_capture(['FFRF', 'LF'])
+
+        # Then
+        self.assertEqual(4, snapshot.round)
+        self.assertEqual((list(fleet.xs), list(fleet.ys)), (list(snapshot.xs), list(snapshot.ys)))
+        self.assertEqual(list(fleet.orientations), list(snapshot.orientations))
+        self.assertEqual([4, 2], list(snapshot.cursors))
+
+    def test_matches(self):
+        """Test a snapshot matches fleets with the same start and programs grown only for mowers run up to its round."""
+        # Given
+        _, snapshot = simulate_and_capture(['FFRF', 'LF'])
+
+        # When / Then
+        for programs, expected_match in ((['FFRF', 'LF'], True), (['FFRFLLB', 'LF'], True), (['FFRF', 'LFF'], False),
+                                         (['FFRL', 'LF'], False), (['FFR', 'LF'], False), (['FFRF', 'LF', ''], False)):
+            fleet = build_fleet(programs)
+            self.assertEqual(expected_match, snapshot.matches(fleet, LAWN, FleetSnapshot.start_digest(fleet, LAWN)), programs)
+
+    def test_matches_program_trees(self):
+        """Test snapshots of program trees match the same trees, hashed without expanding them."""
+        # Given
+        fleet = build_fleet(['', 'LF'])
+        fleet.programs[0] = ProgramTree.parse(b'(LFRF)*500000000')
+        start_digest = FleetSnapshot.start_digest(fleet, LAWN)
+        fleet.cursors[0] = fleet.cursors[1] = 2
+        snapshot = FleetSnapshot.capture(fleet, LAWN, 2, start_digest)
+
+        # When / Then
+        for directions, expected_match in ((b'(LFRF)*500000000', True), (b'(LFRF)500000000', True), (b'(LFRF)*500000001', False),
+                                           (b'LF(RFLF)*499999999RF', False)):
+            fleet.programs[0] = ProgramTree.parse(directions)
+            self.assertEqual(expected_match, snapshot.matches(fleet, LAWN, start_digest), directions)
+
+    def test_matches_checks_start_and_lawn(self):
+        """Test a snapshot does not match fleets starting elsewhere or on other lawns."""
+        # Given
+        _, snapshot = simulate_and_capture(['FFRF', 'LF'])
+        moved_fleet = build_fleet(['FFRF', 'LF'])
+        moved_fleet.xs[1] = 3
+        fleet = build_fleet(['FFRF', 'LF'])
+        lawn = LawnModel(height=6, width=6)
+
+        # When / Then
+        self.assertFalse(snapshot.matches(moved_fleet, LAWN, FleetSnapshot.start_digest(moved_fleet, LAWN)))
+        self.assertFalse(snapshot.matches(fleet, lawn, FleetSnapshot.start_digest(fleet, lawn)))
+
+    def test_restore_goes_on_as_a_full_simulation(self):
+        """Test the simulation of a grown fleet from a snapshot ends as its simulation from the start."""
+        # Given
+        _, snapshot = simulate_and_capture(['FFRF', 'LF', 'RFFL'])
+        expected_fleet = SyncMowerSimulationService().run(build_fleet(['FFRFFFLF', 'LF', 'RFFLBB']), LAWN)
+        fleet = build_fleet(['FFRFFFLF', 'LF', 'RFFLBB'])
+
+        # When
+        snapshot.restore(fleet)
+        fleet = SyncMowerSimulationService().run(fleet, LAWN)
+
+        # Then
+        self.assertEqual(expected_fleet.to_models(), fleet.to_models())
+
+    def test_write_and_read(self):
+        """Test a snapshot is read back from its file."""
+        # Given
+        _, snapshot = simulate_and_capture(['FFRF', 'LF', 'RFFL'])
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, 'snapshot.bin')
+
+            # When
+            snapshot.write(filename)
+            read_snapshot = FleetSnapshot.read(filename)
+
+            # Then
+            self.assertEqual(['snapshot.bin'], os.listdir(directory))
+        for name in FleetSnapshot.__slots__:
+            self.assertEqual(getattr(snapshot, name), getattr(read_snapshot, name), name)
+
+    def test_read_raises_on_wrong_files(self):
+        """Test reading files that are not whole snapshots raises."""
+        # Given
+        _, snapshot = simulate_and_capture(['FFRF', 'LF'])
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, 'snapshot.bin')
+            snapshot.write(filename)
+            with open(filename, 'rb') as snapshot_file:
+                data = snapshot_file.read()
+
+            for wrong_data in (data[:10], b'XXXX' + data[4:], data[:-8]):
+                with open(filename, 'wb') as snapshot_file:
+                    snapshot_file.write(wrong_data)
+
+                # When / Then
+                with self.assertRaises(LoadFileParserError):
+                    FleetSnapshot.read(filename)
+
+
+class TestFleetCheckpoints(TestCase):
+    """FleetCheckpoints test."""
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.directory.name, 'checkpoint.bin')
+        self.fleet = build_fleet(['FFRF', 'LF'])
+        self.start_digest = FleetSnapshot.start_digest(self.fleet, LAWN)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_round_done_every_steps(self):
+        """Test a snapshot is written once the steps interval is over."""
+        # Given
+        checkpoints = FleetCheckpoints(self.filename, LAWN, self.start_digest, every_steps=3)
+
+        # When
+        checkpoints.round_done(self.fleet, 1, 2)
+        written_after_first_round = os.path.exists(self.filename)
+        checkpoints.round_done(self.fleet, 2, 2)
+
+        # Then
+        self.assertFalse(written_after_first_round)
+        self.assertEqual(1, checkpoints.written)
+        self.assertEqual(0, checkpoints.steps)
+        self.assertEqual(2, FleetSnapshot.read(self.filename).round)
+
+    @patch('mower.resources.models.fleet_snapshot_model.time.monotonic')
+    def test_round_done_every_seconds(self, monotonic_mock):
+        """Test a snapshot is written once the time interval is over."""
+        # Given
+        monotonic_mock.return_value = 100.0
+        checkpoints = FleetCheckpoints(self.filename, LAWN, self.start_digest, every_seconds=10)
+
+        # When
+        monotonic_mock.return_value = 105.0
+        checkpoints.round_done(self.fleet, 1, 2)
+        monotonic_mock.return_value = 110.0
+        checkpoints.round_done(self.fleet, 2, 2)
+        checkpoints.round_done(self.fleet, 3, 1)
+
+        # Then
+        self.assertEqual(1, checkpoints.written)
+        self.assertEqual(2, FleetSnapshot.read(self.filename).round)
+
+    def test_checkpoint_matches_its_fleet(self):
+        """Test a checkpoint taken along a simulation is resumed as a full simulation."""
+        # Given
+        programs = ['FFRFFFLF', 'LF', 'RFFLBB']
+        expected_fleet = SyncMowerSimulationService().run(build_fleet(programs), LAWN)
+        simulation = SyncMowerSimulationService()
+        fleet = build_fleet(programs)
+        simulation.checkpoints = FleetCheckpoints(self.filename, LAWN, FleetSnapshot.start_digest(fleet, LAWN), every_steps=7)
+        with patch.object(FleetSnapshot, 'write', side_effect=[None, RuntimeError()], autospec=True) as write_mock:
+            with self.assertRaises(RuntimeError):
+                simulation.run(fleet, LAWN)
+        snapshot = write_mock.call_args_list[0][0][0]
+        fleet = build_fleet(programs)
+
+        # When
+        matches = snapshot.matches(fleet, LAWN, FleetSnapshot.start_digest(fleet, LAWN))
+        snapshot.restore(fleet)
+        fleet = SyncMowerSimulationService().run(fleet, LAWN)
+
+        # Then
+        self.assertTrue(matches)
+        self.assertEqual(3, snapshot.round)
+        self.assertEqual(expected_fleet.to_models(), fleet.to_models())
@@ -0,0 +1,122 @@
+import pytest
+
+from unittest import TestCase
+
+from mower.resources.models.directions import RelativeDirection
+from mower.resources.models.instruction_tape import InstructionTape
+from mower.utils.exceptions import RelativeDirectionError
+
+
+class TestInstructionTape(TestCase):
+    """InstructionTape Test."""
+    def test_from_str(self):
+        """Test building a tape from a directions string."""
+        # Given
+        raw_directions = ' LF R\tBB\n'
+
+        # When
+        tape = InstructionTape.from_str(raw_directions)
+
+        # Then
+        expected_directions = [RelativeDirection.LEFT, RelativeDirection.FRONT, RelativeDirection.RIGHT,
+                               RelativeDirection.BACK, RelativeDirection.BACK]
+
+        self.assertEqual(expected_directions, list(tape))
+        self.assertEqual(5, len(tape))
+        self.assertEqual(b'\x02\x00\x03\x01\x01', tape.codes())
+
+    def test_from_str_raises_on_wrong_input(self):
+        """Test building a tape from a wrong directions string."""
+        self.assertRaises(RelativeDirectionError, InstructionTape.from_str, 'LFX')
+        self.assertRaises(RelativeDirectionError, InstructionTape.from_str, 'lf')
+        self.assertRaises(RelativeDirectionError, InstructionTape.from_str, 'L\x00')
+
+    def test_packs_four_instructions_per_byte(self):
+        """Test the tape memory footprint."""
+        # Given / When
+        tape = InstructionTape.from_str('FBLR' * 1000 + 'F')
+
+        # Then
+        self.assertEqual(1001, len(tape._data))
+
+    def test_from_packed(self):
+        """Test rebuilding a tape from its packed codes."""
+        # Given
+        tape = InstructionTape.from_str('LFRBRRL')
+
+        # When
+        rebuilt_tape = InstructionTape.from_packed(tape.packed(), tape.size)
+
+        # Then
+        self.assertEqual(2, len(tape.packed()))
+        self.assertEqual('LFRBRRL', str(rebuilt_tape))
+
+    def test_packed_prefix(self):
+        """Test packing the first codes of a tape, the same for tapes sharing them."""
+        # Given
+        tape = InstructionTape.from_str('LFRBRRL')
+        longer_tape = InstructionTape.from_str('LFRBRRLLR')
+
+        # When
+        prefixes = [tape.packed_prefix(size) for size in range(8)]
+
+        # Then
+        self.assertEqual([b'', b'\x02', b'\x02', b'\x32', b'\x72', b'\x72\x03', b'\x72\x0f', b'\x72\x2f'], prefixes)
+        self.assertEqual(prefixes, [longer_tape.packed_prefix(size) for size in range(8)])
+
+    def test_extend_from_str_appends_at_the_end(self):
+        """Test extending a tape keeps the previous instructions first."""
+        # Given
+        tape = InstructionTape.from_str('LLR')
+
+        # When
+        tape.extend_from_str('FB')
+        tape.extend_from_str('RRRRRF')
+
+        # Then
+        self.assertEqual('LLRFBRRRRRF', str(tape))
+
+    def test_read(self):
+        """Test reading instructions moves the cursor forward."""
+        # Given
+        tape = InstructionTape.from_str('LFRBF')
+
+        # When
+        codes = [tape.read(), tape.read()]
+
+        # Then
+        self.assertEqual([RelativeDirection.LEFT.code, RelativeDirection.FRONT.code], codes)
+        self.assertEqual(3, len(tape))
+        self.assertEqual('RBF', str(tape))
+        self.assertEqual(b'\x03\x01\x00', tape.codes())
+
+    def test_read_raises_on_exhausted_tape(self):
+        """Test reading an exhausted tape."""
+        # Given
+        tape = InstructionTape.from_str('L')
+        tape.read()
+
+        # When / Then
+        self.assertRaises(IndexError, tape.read)
+
+    def test_eq(self):
+        """Test tapes are compared by their pending instructions."""
+        # Given
+        tape = InstructionTape.from_str('RLF')
+        tape.read()
+
+        # When / Then
+        self.assertEqual(InstructionTape.from_str('LF'), tape)
+        self.assertEqual([RelativeDirection.LEFT, RelativeDirection.FRONT], tape)
+        self.assertNotEqual(InstructionTape.from_str('RLF'), tape)
+
+    def test_validate(self):
+        """Test building tapes from pydantic fields values."""
+        # Given
+        tape = InstructionTape.from_str('LF')
+
+        # When / Then
+        self.assertIs(tape, InstructionTape.validate(tape))
+        self.assertEqual(tape, InstructionTape.validate('LF'))
+        self.assertEqual(tape, InstructionTape.validate([RelativeDirection.LEFT, RelativeDirection.FRONT]))
+        self.assertRaises(TypeError, InstructionTape.validate, 3)
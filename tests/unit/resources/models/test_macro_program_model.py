@@ -0,0 +1,40 @@
+import pytest
+
+from unittest import TestCase
+
+from mower.resources.models.directions import RelativeDirection
+from mower.resources.models.instruction_tape import InstructionTape
+from mower.resources.models.macro_program_model import MacroProgram, MACRO_RUN, MACRO_TURN
+
+
+class TestMacroProgram(TestCase):
+    """MacroProgram Test."""
+    def test_compile(self):
+        """Test compiling a tape into runs and net turns."""
+        # Given
+        tape = InstructionTape.from_str('FFFFBBLRRRRLLFRRRR')
+
+        # When
+        program = MacroProgram.compile(tape)
+
+        # Then
+        expected_ops = [(MACRO_RUN, RelativeDirection.FRONT.code, 4), (MACRO_RUN, RelativeDirection.BACK.code, 2),
+                        (MACRO_TURN, 1, 7), (MACRO_RUN, RelativeDirection.FRONT.code, 1), (MACRO_TURN, 0, 4)]
+
+        self.assertEqual(expected_ops, [program[index] for index in range(len(program))])
+
+    def test_compile_from_cursor(self):
+        """Test compiling only the instructions left to run."""
+        # Given
+        tape = InstructionTape.from_str('LLFF')
+        tape.read()
+
+        # When
+        program = MacroProgram.compile(tape)
+
+        # Then
+        self.assertEqual([(MACRO_TURN, 3, 1), (MACRO_RUN, RelativeDirection.FRONT.code, 2)], [program[0], program[1]])
+
+    def test_compile_empty_tape(self):
+        """Test compiling an empty tape."""
+        self.assertEqual(0, len(MacroProgram.compile(InstructionTape())))
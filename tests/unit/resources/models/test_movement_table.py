@@ -0,0 +1,63 @@
+import pytest
+
+from unittest import TestCase, skipIf
+
+from mower.resources.models.directions import OrdinalDirection, RelativeDirection
+from mower.resources.models.lawn_model import LawnDimensions
+from mower.resources.models.movement_table import MOVE_ORIENTATION, step, step_arrays
+from mower.resources.models.mower_model import MowerModel, MowerPosition
+from mower.resources.services import mower_simulations_service
+
+
+def reference_step(x, y, orientation, instruction, width, height):
+    """Helper function to move a mower with the position model, as (x, y, orientation code)."""
+    position = MowerPosition(x, y, OrdinalDirection.from_code(orientation))
+    direction = RelativeDirection.from_code(instruction)
+    if direction in (RelativeDirection.FRONT, RelativeDirection.BACK):
+        position = MowerModel.translate_mower_position(position, 1, direction, LawnDimensions(w=width, h=height))
+    else:
+        position = MowerModel.rotate_mower_position(position, direction)
+    return position.x, position.y, position.o.code
+
+
+class TestMovementTable(TestCase):
+    """Movement table test."""
+    def test_rotations(self):
+        """Test the new orientation of each rotation."""
+        # Given
+        north, east, south, west = (direction.code for direction in (OrdinalDirection.NORTH, OrdinalDirection.EAST,
+                                                                     OrdinalDirection.SOUTH, OrdinalDirection.WEST))
+        left, right = RelativeDirection.LEFT.code, RelativeDirection.RIGHT.code
+
+        # When / Then
+        self.assertEqual([east, south, west, north], [MOVE_ORIENTATION[orientation << 2 | right] for orientation in (north, east, south, west)])
+        self.assertEqual([west, north, east, south], [MOVE_ORIENTATION[orientation << 2 | left] for orientation in (north, east, south, west)])
+
+    def test_step(self):
+        """Test moving a mower, on every cell of a lawn with every orientation and instruction, border moves are dropped."""
+        # Given
+        width, height = 3, 4
+
+        # When / Then
+        for x in range(width):
+            for y in range(height):
+                for orientation in range(4):
+                    for instruction in range(4):
+                        self.assertEqual(reference_step(x, y, orientation, instruction, width, height),
+                                         step(x, y, orientation, instruction, width, height))
+
+    @skipIf(not mower_simulations_service.import_numpy(), 'numpy is not installed')
+    def test_step_arrays(self):
+        """Test moving a whole fleet at once, mowers are moved as one at a time."""
+        # Given
+        import numpy as np
+        width, height = 3, 4
+        moves = [(x, y, orientation, instruction) for x in range(width) for y in range(height) for orientation in range(4)
+                 for instruction in range(4)]
+        xs, ys, orientations, instructions = (np.array(values) for values in zip(*moves))
+
+        # When
+        to_xs, to_ys, to_orientations = step_arrays(xs, ys, orientations.astype(np.uint8), instructions.astype(np.uint8), width, height)
+
+        # Then
+        self.assertEqual([step(*move, width, height) for move in moves], list(zip(to_xs.tolist(), to_ys.tolist(), to_orientations.tolist())))
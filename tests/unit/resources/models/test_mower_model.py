@@ -80,6 +80,20 @@ class TestMowerModel(TestCase):
 
         self.assertEquals(expected_directions, mower_model.directions)
 
+    def test_extend_directions_from_str_appends_to_base_directions(self):
+        """Test extend directions from string keeps base mower directions first."""
+        # Given
+        mower_model = MowerModel(position=(1, 1, OrdinalDirection.NORTH),
+                                 directions=[RelativeDirection.BACK, RelativeDirection.FRONT])
+
+        # When
+        mower_model = MowerModel.extend_directions_from_str(mower_model, 'LR\n')
+
+        # Then
+        expected_directions = [RelativeDirection.BACK, RelativeDirection.FRONT, RelativeDirection.LEFT, RelativeDirection.RIGHT]
+
+        self.assertEquals(expected_directions, mower_model.directions)
+
     def test_extend_directions_from_str_returns_empty_list_on_none_directions_input(self):
         """Test extend directions from string when empty direction."""
         # Given
@@ -0,0 +1,91 @@
+import pytest
+
+from unittest import TestCase
+from unittest.mock import patch
+
+from mower.resources.models.occupancy_model import OccupancyGrid, BitmapOccupancyGrid, SparseOccupancyGrid, SortedOccupancyIndex
+
+
+class TestOccupancyGrid(TestCase):
+    """OccupancyGrid Test."""
+    def assert_occupancy(self, occupancy):
+        # Given
+        occupancy.occupy(0, 0)
+        occupancy.occupy(4, 2)
+
+        # When
+        occupancy.move(4, 2, 3, 2)
+
+        # Then
+        self.assertTrue(occupancy.occupied(0, 0))
+        self.assertTrue(occupancy.occupied(3, 2))
+        self.assertFalse(occupancy.occupied(4, 2))
+        self.assertFalse(occupancy.occupied(1, 2))
+        self.assertFalse(occupancy.occupied(1, 0))
+
+        occupancy.release(0, 0)
+        self.assertFalse(occupancy.occupied(0, 0))
+
+    def test_bitmap_occupancy_grid(self):
+        """Test occupying and releasing cells of a bitmap grid."""
+        occupancy = BitmapOccupancyGrid(5, 3)
+        self.assert_occupancy(occupancy)
+        self.assertEqual(2, len(occupancy.bits))
+
+    def test_sparse_occupancy_grid(self):
+        """Test occupying and releasing cells of a sparse grid."""
+        occupancy = SparseOccupancyGrid(5, 3)
+        self.assert_occupancy(occupancy)
+        self.assertEqual({2 * 5 + 3}, occupancy.cells)
+
+    def test_sorted_occupancy_index(self):
+        """Test occupying and releasing cells of a sorted index."""
+        occupancy = SortedOccupancyIndex(5, 3)
+        self.assert_occupancy(occupancy)
+        self.assertEqual({2: [3]}, occupancy.rows)
+        self.assertEqual({3: [2]}, occupancy.columns)
+        self.assertEqual(([2], [3]), (occupancy.row_keys, occupancy.column_keys))
+
+    def test_for_lawn(self):
+        """Test the grid type fitting a lawn."""
+        self.assertIsInstance(OccupancyGrid.for_lawn(1000, 1000), BitmapOccupancyGrid)
+        self.assertIsInstance(OccupancyGrid.for_lawn(1000, 1000, mowers=1), BitmapOccupancyGrid)
+        self.assertIsInstance(OccupancyGrid.for_lawn(10000, 10000), BitmapOccupancyGrid)
+        self.assertIsInstance(OccupancyGrid.for_lawn(10000, 10000, mowers=10 ** 6), BitmapOccupancyGrid)
+        self.assertIsInstance(OccupancyGrid.for_lawn(10000, 10000, mowers=10), SparseOccupancyGrid)
+        self.assertIsInstance(OccupancyGrid.for_lawn(10 ** 6, 10 ** 6), SparseOccupancyGrid)
+        self.assertIsInstance(OccupancyGrid.for_lawn(10 ** 6, 10 ** 6, mowers=10 ** 6), SparseOccupancyGrid)
+
+
+class TestSortedOccupancyIndex(TestCase):
+    """SortedOccupancyIndex Test."""
+    def setUp(self):
+        self.occupancy = SortedOccupancyIndex(10, 10)
+        for x, y in ((2, 5), (7, 5), (5, 0), (5, 9), (9, 9), (1, 3)):
+            self.occupancy.occupy(x, y)
+
+    def test_first_on_ray(self):
+        """Test finding the first cell held along a row or a column."""
+        self.assertEqual(2, self.occupancy.first_on_ray(5, 5, 1, 0, 9))
+        self.assertEqual(3, self.occupancy.first_on_ray(5, 5, -1, 0, 9))
+        self.assertEqual(4, self.occupancy.first_on_ray(5, 5, 0, 1, 9))
+        self.assertEqual(5, self.occupancy.first_on_ray(5, 5, 0, -1, 9))
+        self.assertEqual(5, self.occupancy.first_on_ray(2, 5, 1, 0, 9))
+
+    def test_first_on_ray_within_distance(self):
+        """Test cells further than the ray length are ignored."""
+        self.assertEqual(0, self.occupancy.first_on_ray(5, 5, 1, 0, 1))
+        self.assertEqual(0, self.occupancy.first_on_ray(5, 5, 0, -1, 4))
+        self.assertEqual(0, self.occupancy.first_on_ray(0, 7, 1, 0, 9))
+
+    def test_nearest_lines(self):
+        """Test rows and columns holding a cell are listed by distance."""
+        self.assertEqual([5, 3, 9, 0], list(self.occupancy.nearest_lines(True, 5)))
+        self.assertEqual([9, 7, 5, 2, 1], list(self.occupancy.nearest_lines(False, 9)))
+
+    def test_line_range(self):
+        """Test listing cells held in a part of a row or a column."""
+        self.assertEqual([2, 7], self.occupancy.line_range(True, 5, 0, 9))
+        self.assertEqual([7], self.occupancy.line_range(True, 5, 3, 7))
+        self.assertEqual([0, 9], self.occupancy.line_range(False, 5, 0, 9))
+        self.assertEqual([], self.occupancy.line_range(False, 4, 0, 9))
@@ -0,0 +1,65 @@
+import pytest
+
+from unittest import TestCase
+
+from mower.resources.models.directions import OrdinalDirection
+from mower.resources.models.fleet_model import Fleet
+from mower.resources.models.instruction_tape import InstructionTape
+from mower.resources.models.program_table_model import ProgramTable
+from mower.resources.models.program_tree_model import ProgramTree
+
+
+class TestProgramTable(TestCase):
+    """ProgramTable Test."""
+    def test_intern(self):
+        """Test programs with the same directions are one shared program."""
+        # Given
+        programs = ProgramTable()
+        first = InstructionTape.from_str('LFRF')
+
+        # When
+        interned = [programs.intern(program) for program in (first, InstructionTape.from_str('LFRF'), InstructionTape.from_str('LFR'),
+                                                             InstructionTape(), InstructionTape())]
+
+        # Then
+        self.assertIs(first, interned[0])
+        self.assertIs(first, interned[1])
+        self.assertIsNot(first, interned[2])
+        self.assertIs(interned[3], interned[4])
+        self.assertEqual(3, len(programs))
+
+    def test_intern_codes_packed_alike(self):
+        """Test tapes with the same packed codes but not the same size are distinct programs."""
+        # Given
+        programs = ProgramTable()
+        tape = InstructionTape.from_str('F')
+
+        # When / Then
+        self.assertIs(tape, programs.intern(tape))
+        self.assertIsNot(tape, programs.intern(InstructionTape.from_str('FF')))
+
+    def test_intern_trees(self):
+        """Test trees are shared by their compressed form, apart from tapes."""
+        # Given
+        programs = ProgramTable()
+        tree = ProgramTree.parse(b'(LF)*2')
+
+        # When / Then
+        self.assertIs(tree, programs.intern(tree))
+        self.assertIs(tree, programs.intern(ProgramTree.parse(b'(LF)2')))
+        self.assertIsNot(tree, programs.intern(InstructionTape.from_str('LFLF')))
+
+    def test_intern_fleet(self):
+        """Test sharing the programs of a fleet from an index."""
+        # Given
+        programs = ProgramTable()
+        fleet = Fleet()
+        for x in range(4):
+            fleet.add(x, 0, OrdinalDirection.NORTH.code, InstructionTape.from_str('FRB'))
+
+        # When
+        programs.intern_fleet(fleet, 1)
+
+        # Then
+        self.assertIsNot(fleet.programs[0], fleet.programs[1])
+        self.assertEqual(1, len({id(program) for program in fleet.programs[1:]}))
@@ -0,0 +1,174 @@
+import pytest
+import random
+import re
+
+from unittest import TestCase
+
+from mower.resources.models.instruction_tape import InstructionTape
+from mower.resources.models.movement_table import step
+from mower.resources.models.program_tree_model import ProgramTree, apply_move, program_move
+from mower.utils.exceptions import RelativeDirectionError
+
+
+def random_directions(rand, depth=0):
+    """Helper function to build random compressed directions, with nested groups."""
+    parts = []
+    for _ in range(rand.randint(1, 4)):
+        kind = rand.random()
+        if kind < 0.5:
+            parts.append(''.join(rand.choices('FBLR', k=rand.randint(1, 4))))
+        elif kind < 0.75:
+            parts.append(f'{rand.choice("FBLR")}{rand.randint(0, 9)}')
+        elif depth < 2:
+            parts.append(f'({random_directions(rand, depth + 1)}){rand.choice(("", "*"))}{rand.randint(0, 12)}')
+    return ''.join(parts) or 'F'
+
+
+def expand(directions):
+    """Helper function to expand compressed directions into plain ones."""
+    directions = re.sub(r'([FBLR])\*?(\d+)', lambda match: match.group(1) * int(match.group(2)), directions)
+    while '(' in directions:
+        directions = re.sub(r'\(([FBLR]*)\)\*?(\d*)', lambda match: match.group(1) * int(match.group(2) or 1), directions)
+    return directions
+
+
+def run_codes(codes, x, y, orientation, width, height):
+    """Helper function to run instruction codes one by one on a lawn."""
+    for code in codes:
+        x, y, orientation = step(x, y, orientation, code, width, height)
+    return x, y, orientation
+
+
+class TestProgramTree(TestCase):
+    """ProgramTree Test."""
+    def test_parse(self):
+        """Test parsing counts of letters and groups, nested or not, with or without a star."""
+        # Given / When
+        program = ProgramTree.parse(b'L F3 (LFRF)*2 ((FB)2R)3\n')
+
+        # Then
+        self.assertEqual(InstructionTape.codes_from_str('L' + 'FFF' + 'LFRF' * 2 + 'FBFBR' * 3), program.codes())
+        self.assertEqual(1 + 3 + 8 + 15, program.size)
+        self.assertEqual('LF3(LFRF)*2((FB)*2R)*3', str(program))
+
+    def test_parse_counts_only_the_last_letter(self):
+        """Test a count after letters repeats only the last one."""
+        self.assertEqual(InstructionTape.codes_from_str('LRFFFF'), ProgramTree.parse(b'LRF4').codes())
+
+    def test_parse_raises_on_wrong_directions(self):
+        """Test parsing raises on wrong letters, counts without letters and unbalanced groups."""
+        for directions in (b'LFX', b'lf', b'3F', b'F3 4', b'F*', b'(FL', b'FL)', b'()*'):
+            with self.assertRaises(RelativeDirectionError):
+                ProgramTree.parse(directions)
+
+    def test_parse_matches_expanded_directions(self):
+        """Test parsed programs expand to the plain directions, and print back to the same program."""
+        # Given
+        rand = random.Random(0)
+
+        for _ in range(300):
+            directions = random_directions(rand)
+
+            # When
+            program = ProgramTree.parse(directions.encode())
+
+            # Then
+            codes = InstructionTape.codes_from_str(expand(directions))
+            self.assertEqual(codes, program.codes())
+            self.assertEqual(len(codes), program.size)
+            self.assertEqual(codes[3:], program.codes(3))
+            self.assertEqual(list(codes[:20]), [program.code_at(index) for index in range(min(20, len(codes)))])
+            self.assertEqual(codes, ProgramTree.parse(str(program).encode()).codes())
+
+    def test_join(self):
+        """Test joining tapes and trees, tapes from their start."""
+        # Given
+        tape = InstructionTape.from_str('LR')
+        tape.read()
+
+        # When
+        program = ProgramTree.join(tape, ProgramTree.parse(b'F2'), InstructionTape.from_str('B'))
+
+        # Then
+        self.assertEqual(InstructionTape.codes_from_str('LRFFB'), program.codes())
+        self.assertEqual(InstructionTape.from_str('LRFFB').packed(), program.packed())
+
+    def test_append(self):
+        """Test appending programs in place, the tree is the one joining them."""
+        # Given
+        rand = random.Random(1)
+
+        for _ in range(50):
+            lines = [random_directions(rand) for _ in range(rand.randint(1, 6))] + ['F5000']
+            program = ProgramTree.join(InstructionTape(), ProgramTree.parse(lines[0].encode()))
+            program.move(0, 7, 5)
+
+            # When
+            for line in lines[1:]:
+                program.append(ProgramTree.parse(line.encode()))
+
+            # Then
+            joined = ProgramTree.join(*(ProgramTree.parse(line.encode()) for line in lines))
+            self.assertEqual(joined.codes(), program.codes())
+            self.assertEqual(str(joined), str(program))
+            self.assertEqual(joined.move(0, 7, 5), program.move(0, 7, 5))
+            self.assertEqual(list(joined.codes()[::97]), [program.code_at(index) for index in range(0, program.size, 97)])
+
+    def test_is_plain(self):
+        """Test telling directions without counts nor groups."""
+        self.assertTrue(ProgramTree.is_plain(b' LFR B\r\n'))
+        self.assertFalse(ProgramTree.is_plain(b'LF2'))
+        self.assertFalse(ProgramTree.is_plain(b'(LF)'))
+
+    def test_run_alone_matches_step_by_step_run(self):
+        """Test running a tree at once ends where running its codes one by one does, borders included."""
+        # Given
+        rand = random.Random(1)
+
+        for _ in range(300):
+            program = ProgramTree.parse(random_directions(rand).encode())
+            width, height = rand.randint(1, 12), rand.randint(1, 12)
+            x, y, orientation = rand.randrange(width), rand.randrange(height), rand.randrange(4)
+
+            # When
+            position = program.run_alone(x, y, orientation, width, height)
+
+            # Then
+            self.assertEqual(run_codes(program.codes(), x, y, orientation, width, height), position)
+
+    def test_run_alone_large_counts(self):
+        """Test running trees of billions of instructions, along and against borders."""
+        # Given
+        program = ProgramTree.parse(b'(LFRF)*500000000')
+        wall = ProgramTree.parse(b'(F1000000000 R)*1000000003')
+
+        # When / Then
+        self.assertEqual((0, 500000005, 0), program.run_alone(5, 5, 0, 1000000, 10000000000))
+        self.assertEqual((999, 0, 3), wall.run_alone(5, 5, 0, 1000, 1000))
+
+    def test_move_headings(self):
+        """Test counting translations heading each way without expanding the tree."""
+        # Given
+        program = ProgramTree.parse(b'(FR)*4001 B2')
+
+        # When
+        headings = program.move(0, 10, 10)[3]
+
+        # Then
+        self.assertEqual((1001, 1000, 1000, 1000 + 2), headings)
+
+    def test_program_move_of_tape(self):
+        """Test the move of a tape, read by runs, ends where running its codes one by one does."""
+        # Given
+        rand = random.Random(2)
+
+        for _ in range(300):
+            tape = InstructionTape(b''.join(bytes([rand.randrange(4)]) * rand.choice((1, 3, 20)) for _ in range(rand.randint(0, 30))))
+            width, height = rand.randint(1, 12), rand.randint(1, 12)
+            x, y, orientation = rand.randrange(width), rand.randrange(height), rand.randrange(4)
+
+            # When
+            position = apply_move(program_move(tape, orientation, width, height), x, y)
+
+            # Then
+            self.assertEqual(run_codes(tape.codes(0), x, y, orientation, width, height), position)
@@ -0,0 +1,48 @@
+from unittest import TestCase
+
+from mower.resources.models.directions import OrdinalDirection
+from mower.resources.models.fleet_model import Fleet
+from mower.resources.models.instruction_tape import InstructionTape
+from mower.resources.models.lawn_model import LawnModel
+from mower.resources.models.shared_fleet_model import SharedFleet
+
+
+class TestSharedFleet(TestCase):
+    """SharedFleet Test."""
+    def setUp(self):
+        self.fleet = Fleet()
+        self.fleet.add(1, 2, OrdinalDirection.EAST.code, InstructionTape.from_str('FFL'))
+        self.fleet.add(0, 0, OrdinalDirection.NORTH.code, InstructionTape.from_str('R'))
+        self.fleet.cursors[0] = 1
+        self.shared = SharedFleet.create(self.fleet, LawnModel(height=3, width=4), 2)
+
+    def tearDown(self):
+        self.shared.close()
+        self.shared.memory.unlink()
+
+    def test_create(self):
+        """Test copying a fleet to shared memory."""
+        # Then
+        self.assertEqual([1, 0], list(self.shared.xs))
+        self.assertEqual([2, 0], list(self.shared.ys))
+        self.assertEqual([1, 0], list(self.shared.orientations))
+        self.assertEqual([0, 3], list(self.shared.starts))
+        self.assertEqual(b'\x00\x00\x02\x03', bytes(self.shared.codes))
+        self.assertEqual([2, 1], [self.shared.pending(0), self.shared.pending(1)])
+        self.assertEqual([1] + [-1] * 8 + [0] + [-1] * 2, list(self.shared.cells))
+        self.assertEqual([-1, -1], list(self.shared.targets))
+        self.assertEqual(2, len(self.shared.actives))
+
+    def test_attach_and_write_back(self):
+        """Test changes made through an attached shared fleet are copied back to the fleet."""
+        # Given
+        attached = SharedFleet.attach(self.shared.memory.name, self.shared.layout)
+
+        # When
+        attached.xs[0], attached.orientations[0], attached.cursors[0] = 3, OrdinalDirection.SOUTH.code, 3
+        attached.close()
+        fleet = self.shared.write_back(self.fleet)
+
+        # Then
+        self.assertEqual((3, 2, OrdinalDirection.SOUTH), fleet.position(0))
+        self.assertEqual([0, 1], [fleet.pending(0), fleet.pending(1)])
@@ -0,0 +1,133 @@
+import os
+import shutil
+import tempfile
+
+from unittest import TestCase
+
+from mower.resources.models.batch_result_model import BatchResultModel
+from mower.resources.services.mower_batch_service import MowerBatchService, run_batch_file
+
+INPUT_FILENAME = os.path.join(os.path.dirname(__file__), os.pardir, os.pardir, os.pardir, 'data', 'input.txt')
+EXPECTED_OUTPUT = '1 3 N\n5 1 E\n3 4 N\n2 4 E\n'
+
+
+class TestMowerBatchService(TestCase):
+    """MowerBatchService test."""
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.inputs = os.path.join(self.directory.name, 'inputs')
+        os.makedirs(os.path.join(self.inputs, 'nested'))
+        for name in ('b.txt', 'a.txt', 'nested/c.txt'):
+            shutil.copy(INPUT_FILENAME, os.path.join(self.inputs, name))
+        with open(os.path.join(self.inputs, 'bad.txt'), 'w') as bad_file:
+            bad_file.write('5 5\n1 2 X\n')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def path(self, *names):
+        return os.path.join(self.inputs, *names)
+
+    def test_expand_inputs(self):
+        """Test sources are expanded to the files of directories, the files matching patterns and files."""
+        # When
+        inputs = MowerBatchService.expand_inputs([self.inputs, self.path('**', 'c*.txt'), self.path('missing.txt')])
+
+        # Then
+        self.assertEqual([self.path('a.txt'), self.path('b.txt'), self.path('bad.txt'), self.path('nested', 'c.txt'),
+                          self.path('missing.txt')], inputs)
+
+    def test_run_twice(self):
+        """Test outputs written next to their input by a batch are not inputs of the next batch of the same directory."""
+        # Given
+        shutil.copy(INPUT_FILENAME, self.path('d.res'))
+        service = MowerBatchService(workers=1)
+
+        for _ in range(2):
+            # When
+            inputs = MowerBatchService.expand_inputs([self.inputs, self.path('*.res')], '.res')
+            results = service.run(MowerBatchService.jobs(inputs, suffix='.res'))
+
+            # Then
+            self.assertEqual([self.path('a.txt'), self.path('b.txt'), self.path('bad.txt')], [result.input_filename for result in results])
+            self.assertEqual([True, True, False], [result.ok for result in results])
+
+    def test_read_list(self):
+        """Test list files give one input file per line, blank lines and comments skipped."""
+        self.assertEqual(['a.txt', 'b c.txt'], MowerBatchService.read_list(['a.txt\n', '\n', '# comment\n', '  b c.txt  \n']))
+
+    def test_jobs(self):
+        """Test outputs are written next to their input, or in an output directory."""
+        # When
+        jobs = MowerBatchService.jobs(['in/a.txt', 'b.txt'])
+        jobs_to_directory = MowerBatchService.jobs(['in/a.txt'], 'out', '.res')
+
+        # Then
+        self.assertEqual([('in/a.txt', 'in/a.txt.out'), ('b.txt', 'b.txt.out')], jobs)
+        self.assertEqual([('in/a.txt', 'out/a.txt.res')], jobs_to_directory)
+
+    def test_run_batch_file(self):
+        """Test run one file of a batch."""
+        # Given
+        output_filename = self.path('a.out')
+
+        # When
+        result = run_batch_file((self.path('a.txt'), output_filename), {})
+
+        # Then
+        self.assertTrue(result.ok)
+        self.assertEqual((4, 38), (result.mowers, result.instructions))
+        with open(output_filename) as output_file:
+            self.assertEqual(EXPECTED_OUTPUT, output_file.read())
+
+    def test_run_batch_file_reports_errors(self):
+        """Test errors of a file are reported in its result."""
+        # When
+        results = [run_batch_file((self.path(name), self.path('out')), {}) for name in ('bad.txt', 'missing.txt')]
+
+        # Then
+        self.assertEqual(['LoadFileParserError', 'FileNotFoundError'], [result.error.split(':')[0] for result in results])
+
+    def test_run(self):
+        """Test run a batch in worker processes, failures do not stop the batch."""
+        # Given
+        jobs = MowerBatchService.jobs([self.path('a.txt'), self.path('bad.txt'), self.path('b.txt'), self.path('nested', 'c.txt')],
+                                      os.path.join(self.directory.name, 'outputs'))
+        os.makedirs(os.path.join(self.directory.name, 'outputs'))
+
+        # When
+        results = MowerBatchService(workers=2, chunk_size=1).run(jobs)
+
+        # Then
+        self.assertEqual([True, False, True, True], [result.ok for result in results])
+        self.assertEqual([input_filename for input_filename, _ in jobs], [result.input_filename for result in results])
+        for result in results[::2]:
+            with open(result.output_filename) as output_file:
+                self.assertEqual(EXPECTED_OUTPUT, output_file.read())
+
+    def test_run_reports_duplicate_outputs(self):
+        """Test inputs whose output was already written by another input of the batch fail."""
+        # Given
+        jobs = MowerBatchService.jobs([self.path('a.txt'), self.path('nested', 'a.txt')], self.directory.name)
+        shutil.copy(INPUT_FILENAME, self.path('nested', 'a.txt'))
+
+        # When
+        results = MowerBatchService(workers=1).run(jobs)
+
+        # Then
+        self.assertEqual([True, False], [result.ok for result in results])
+
+    def test_summary(self):
+        """Test summary of a batch."""
+        # Given
+        results = [BatchResultModel(input_filename='a', output_filename='a.out', input_bytes=1 << 20, mowers=4, instructions=38, seconds=1),
+                   BatchResultModel(input_filename='b', output_filename='b.out', cached=True, input_bytes=1 << 20, seconds=0.5),
+                   BatchResultModel(input_filename='c', output_filename='c.out', error='Error', input_bytes=10, seconds=0.5)]
+
+        # When
+        summary = MowerBatchService.summary(results, 2.0)
+
+        # Then
+        self.assertEqual({'files': 3, 'succeeded': 2, 'failed': 1, 'cached': 1, 'input_bytes': 2 << 20, 'mowers': 4, 'instructions': 38,
+                          'seconds': 2.0, 'worker_seconds': 2.0, 'files_per_second': 1.5, 'mowers_per_second': 2.0,
+                          'megabytes_per_second': 1.0}, summary)
@@ -1,253 +1,562 @@
+import io
+import os
 import pytest
+import random
+import tempfile
 
 from unittest import TestCase
 from unittest.mock import patch, MagicMock, mock_open, call
 
-from mower.resources.services.mower_parsers_service import FileMowerParserService
+from mower.resources.models.directions import OrdinalDirection
+from mower.resources.models.fleet_model import Fleet
+from mower.resources.models.instruction_tape import InstructionTape
+from mower.resources.models.lawn_model import LawnModel
+from mower.resources.models.occupancy_model import BitmapOccupancyGrid
+from mower.resources.models.program_tree_model import ProgramTree
+from mower.resources.services.mower_parsers_service import FileMowerParserService, ParallelFileMowerParserService, BinaryMowerParserService, \
+    StdinMowerParserService
+from mower.resources.services.mower_printers_service import BinaryMowerPrinterService
 from mower.utils.exceptions import LoadFileParserError
 
 
-@patch('mower.resources.services.mower_parsers_service.MowerModel')
+class TestParseLawn(TestCase):
+    """Lawn Parser test."""
+    def test_parse_lawn(self):
+        """Test parse lawn line."""
+        self.assertEqual(LawnModel(height=4, width=5), FileMowerParserService.parse_lawn(b' 4   5 \n'))
+
+    def test_parse_lawn_raises_on_wrong_lawn_params(self):
+        """Test parse lawn raises error on wrong lawn line."""
+        for line in (b'4', b'4 e', b'4 4 4', b'4 -4', b'4|4'):
+            with self.assertRaises(LoadFileParserError):
+                FileMowerParserService.parse_lawn(line)
+
+
 class TestParseMower(TestCase):
     """Mower Parser test."""
-    def test_parse_mower_position_raises_on_mower_outside_lawn(self, mwr_mock):
+    def test_parse_mower_position_raises_on_mower_outside_lawn(self):
         """Test parse mower raises error on wrong mower file data."""
         # Given
-        mowers = dict()
-        lawn = MagicMock(height=2, width=2)
+        fleet = Fleet()
+        lawn = LawnModel(height=2, width=2)
 
         # When / Then
-        with self.assertRaises(LoadFileParserError):
-            mwr_mock.position_from_str.return_value = (4, 2, 'N')
-            FileMowerParserService.parse_mower_position(mowers, lawn, 'line')
+        for line in (b'4 1 N', b'0 4 N', b'2 0 N', b'1 2 N'):
+            with self.assertRaises(LoadFileParserError):
+                FileMowerParserService.parse_mower_position(fleet, BitmapOccupancyGrid(2, 2), lawn, line)
 
-        with self.assertRaises(LoadFileParserError):
-            mwr_mock.position_from_str.return_value = (0, 4, 'N')
-            FileMowerParserService.parse_mower_position(mowers, lawn, 'line')
+        self.assertEqual(0, len(fleet))
 
-        with self.assertRaises(LoadFileParserError):
-            mwr_mock.position_from_str.return_value = (4, 0, 'N')
-            FileMowerParserService.parse_mower_position(mowers, lawn, 'line')
+    def test_parse_mower_position_raises_on_wrong_position_params(self):
+        """Test parse mower raises error on wrong mower position line."""
+        # Given
+        fleet = Fleet()
+        lawn = LawnModel(height=4, width=4)
 
-        with self.assertRaises(LoadFileParserError):
-            mwr_mock.position_from_str.return_value = (2, 4, 'N')
-            FileMowerParserService.parse_mower_position(mowers, lawn, 'line')
+        # When / Then
+        for line in (b'2 2 NN', b'2 N', b'2 e N', b'2 2 N 3', b'2 2 N LR', b'2 2 R', b'2 2 n'):
+            with self.assertRaises(LoadFileParserError):
+                FileMowerParserService.parse_mower_position(fleet, BitmapOccupancyGrid(4, 4), lawn, line)
 
-    def test_parse_mower_raises_on_two_mowers_in_the_position(self, mwr_mock):
+    def test_parse_mower_raises_on_two_mowers_in_the_position(self):
         """Test parse mower raises error on wrong mower file data."""
         # Given
-        mowers = {(2, 4): (2, 4, 'S')}
-        lawn = MagicMock(height=4, width=4)
-        mwr_mock.position_from_str.return_value = (2, 4, 'N')
+        fleet = Fleet()
+        fleet.add(2, 3, OrdinalDirection.SOUTH.code)
+        occupancy = BitmapOccupancyGrid(4, 4)
+        occupancy.occupy(2, 3)
+        lawn = LawnModel(height=4, width=4)
 
         # When / Then
         with self.assertRaises(LoadFileParserError):
-            FileMowerParserService.parse_mower_position(mowers, lawn, 'line')
+            FileMowerParserService.parse_mower_position(fleet, occupancy, lawn, b'2 3 N')
 
-    def test_parse_mower(self, mwr_mock):
-        """Test parse mower raises error on wrong mower file data."""
+    def test_parse_mower(self):
+        """Test parse mower position line."""
         # Given
-        mowers = {(2, 4): (2, 4, 'S')}
-        lawn = MagicMock(height=4, width=4)
-        mwr_mock.position_from_str.return_value = (2, 2, 'N')
+        fleet = Fleet()
+        fleet.add(2, 3, OrdinalDirection.SOUTH.code)
+        occupancy = BitmapOccupancyGrid(4, 4)
+        occupancy.occupy(2, 3)
+        lawn = LawnModel(height=4, width=4)
 
         # When
-        mwr_pos, mwrs = FileMowerParserService.parse_mower_position(mowers, lawn, 'line')
+        actual_fleet = FileMowerParserService.parse_mower_position(fleet, occupancy, lawn, b' 2  2 W \n')
 
         # Then
-        expected_mowers = {(2, 4): (2, 4, 'S'), (2, 2): mwr_mock.return_value}
+        self.assertIs(fleet, actual_fleet)
+        self.assertEqual(2, len(fleet))
+        self.assertEqual((2, 2, OrdinalDirection.WEST), fleet.position(1))
+        self.assertTrue(occupancy.occupied(2, 2))
 
-        self.assertEquals(expected_mowers, mwrs)
-        self.assertEquals((2, 2), mwr_pos)
 
-
-@patch('mower.resources.services.mower_parsers_service.MowerModel.extend_directions_from_str')
 class TestParseDirections(TestCase):
     """Mower Directions Parser test."""
-    def test_parse_mower_directions(self, extend_dirs_mock):
+    def test_parse_mower_directions(self):
+        """Test parse mower directions of the last declared mower."""
+        # Given
+        fleet = Fleet()
+        fleet.add(1, 1, OrdinalDirection.NORTH.code)
+        fleet.add(2, 2, OrdinalDirection.NORTH.code)
+
+        # When
+        actual_fleet = FileMowerParserService.parse_mower_directions(fleet, b'LF\n')
+        actual_fleet = FileMowerParserService.parse_mower_directions(fleet, b' R B\r\n')
+
+        # Then
+        self.assertIs(fleet, actual_fleet)
+        self.assertEqual('', str(fleet.programs[0]))
+        self.assertEqual('LFRB', str(fleet.programs[1]))
+
+    def test_parse_mower_directions_raises_on_wrong_directions(self):
         """Test parse mower raises error on wrong directions."""
         # Given
-        mowers = {(1, 1): 'mower data'}
+        fleet = Fleet()
+        fleet.add(1, 1, OrdinalDirection.NORTH.code)
+
+        # When / Then
+        for line in (b'LFX', b'lf', b'L2', b'N'):
+            with self.assertRaises(LoadFileParserError):
+                FileMowerParserService.parse_mower_directions(fleet, line)
+
+    def test_parse_compressed_mower_directions(self):
+        """Test parse compressed directions, plain lines stay on the tape until a line repeats directions, next lines are appended to the tree."""
+        # Given
+        fleet = Fleet()
+        fleet.add(1, 1, OrdinalDirection.NORTH.code)
+        fleet.add(2, 2, OrdinalDirection.NORTH.code)
 
         # When
-        actual_mowers = FileMowerParserService.parse_mower_directions(mowers, (1, 1), 'line')
+        FileMowerParserService.parse_mower_directions(fleet, b'LF\n', compressed=True)
+        plain = fleet.programs[1]
+        FileMowerParserService.parse_mower_directions(fleet, b'F3 (RB)*2\n', compressed=True)
+        tree = fleet.programs[1]
+        FileMowerParserService.parse_mower_directions(fleet, b'L\n', compressed=True)
 
         # Then
-        expected_mowers = {(1, 1): extend_dirs_mock.return_value}
+        self.assertIsInstance(plain, InstructionTape)
+        self.assertIsInstance(fleet.programs[1], ProgramTree)
+        self.assertIs(tree, fleet.programs[1])
+        self.assertEqual('LFF3(RB)*2L', str(fleet.programs[1]))
+
+    def test_parse_compressed_mower_directions_raises_on_wrong_directions(self):
+        """Test parse compressed directions raises error on wrong directions."""
+        # Given
+        fleet = Fleet()
+        fleet.add(1, 1, OrdinalDirection.NORTH.code)
 
-        self.assertEquals(expected_mowers, actual_mowers)
+        # When / Then
+        for line in (b'LFX', b'(LF', b'2L', b'F2 3'):
+            with self.assertRaises(LoadFileParserError):
+                FileMowerParserService.parse_mower_directions(fleet, line, compressed=True)
 
-    def test_parse_mower_directions_raises_on_nonunexistent_posxy(self, _):
+    def test_parse_mower_directions_raises_on_nonunexistent_posxy(self):
         """Test parse mower raises error on wrong directions."""
         # Given
-        mowers = dict()
+        fleet = Fleet()
 
         # When / Then
         with self.assertRaises(LoadFileParserError):
-            FileMowerParserService.parse_mower_directions(mowers, (1, 1), 'line')
+            FileMowerParserService.parse_mower_directions(fleet, b'LF')
 
 
 def patch_and_run_parse_method(method_input):
     """Helper function patch parser method."""
     parser = FileMowerParserService('filename')
     with patch('mower.resources.services.mower_parsers_service.open',
-               mock_open(read_data=method_input), create=True) as file_mock:
-        file_mock.return_value.__iter__.return_value = method_input.splitlines()
+               mock_open(read_data=method_input.encode()), create=True) as file_mock:
+        file_mock.return_value.__iter__.return_value = method_input.encode().splitlines(keepends=True)
         return parser.parse()
 
 
-def assert_parse_method_raises_custom_exception(method_input, expected_exception, assert_method):
+def assert_parse_method_raises_custom_exception(method_input, expected_exception, assert_method, line_number=None):
     """Helper function to assert specific exception for parser method."""
     text_file_data = '\n'.join(method_input)
-    with assert_method(expected_exception):
+    with assert_method(expected_exception) as context:
         patch_and_run_parse_method(text_file_data)
+    if line_number is not None:
+        assert context.exception.message.endswith(f'Line {line_number}.'), context.exception.message
+
+
+def positions(fleet):
+    """Helper function to list the positions of a fleet."""
+    return [fleet.position(index) for index in range(len(fleet))]
 
 
-@patch('mower.resources.services.mower_parsers_service.FileMowerParserService.parse_mower_directions')
-@patch('mower.resources.services.mower_parsers_service.FileMowerParserService.parse_mower_position')
-@patch('mower.resources.services.mower_parsers_service.FileMowerParserService.parse_lawn')
 class TestFileMowerParserService(TestCase):
     """FileMower Parser Service test."""
-    def test_parse_empty_file(self, _, __, ___):
+    def test_parse_empty_file(self):
         """Test parse a mower file."""
         assert_parse_method_raises_custom_exception(method_input=['  '],
                                                     expected_exception=LoadFileParserError,
                                                     assert_method=self.assertRaises)
 
-    def test_parse_raises_with_no_lawn_params_nor_init_mower_pos(self, _, __, ___):
+    def test_parse_raises_with_no_lawn_params_nor_init_mower_pos(self):
         """Test parse mower raises error on wrong mower file data."""
         assert_parse_method_raises_custom_exception(method_input=['LBFR', 'L', 'F', 'RRRLLBB'],
                                                     expected_exception=LoadFileParserError,
-                                                    assert_method=self.assertRaises)
+                                                    assert_method=self.assertRaises,
+                                                    line_number=1)
 
-    def test_parse_raises_on_with_no_lawn_params(self, _, __, ___):
+    def test_parse_raises_on_with_no_lawn_params(self):
         """Test parse mower raises error on wrong mower file data."""
-        assert_parse_method_raises_custom_exception(method_input=['2 2 N', 'LBFR', 'L', 'F', 'RRRLLBB'],
+        assert_parse_method_raises_custom_exception(method_input=['', '2 2 N', 'LBFR', 'L', 'F', 'RRRLLBB'],
                                                     expected_exception=LoadFileParserError,
-                                                    assert_method=self.assertRaises)
+                                                    assert_method=self.assertRaises,
+                                                    line_number=2)
 
-    def test_parse_raises_on_single_mower_with_two_lawn_params(self, lawn_mock, mwr_pos_mock, mwr_dirs_mock):
+    def test_parse_raises_on_single_mower_with_two_lawn_params(self):
         """Test parse mower raises error on wrong mower file data."""
         assert_parse_method_raises_custom_exception(method_input=['4 4', '4 4'],
                                                     expected_exception=LoadFileParserError,
-                                                    assert_method=self.assertRaises)
+                                                    assert_method=self.assertRaises,
+                                                    line_number=2)
 
-    def test_parse_raises_on_single_mower_with_wrong_mower_coord(self, lawn_mock, mwr_pos_mock, mwr_dirs_mock):
+    def test_parse_raises_on_single_mower_with_wrong_mower_coord(self):
         """Test parse mower raises error on wrong mower file data."""
-        assert_parse_method_raises_custom_exception(method_input=['4 4', '2 2 NN'],
-                                                    expected_exception=LoadFileParserError,
-                                                    assert_method=self.assertRaises)
+        for wrong_line in ('2 2 NN', '2 N', 'e 2 N', '2 e N', '2 2 N 3', '2 2 N LR', '2 2 R'):
+            assert_parse_method_raises_custom_exception(method_input=['4 4', '1 1 N', 'LFR', wrong_line],
+                                                        expected_exception=LoadFileParserError,
+                                                        assert_method=self.assertRaises,
+                                                        line_number=4)
 
-        assert_parse_method_raises_custom_exception(method_input=['4 4', '2 N'],
-                                                    expected_exception=LoadFileParserError,
-                                                    assert_method=self.assertRaises)
-
-        assert_parse_method_raises_custom_exception(method_input=['4 4', 'e 2 N'],
+    def test_parse_raises_on_single_mower_with_random_input(self):
+        """Test parse mower raises error on wrong mower file data."""
+        assert_parse_method_raises_custom_exception(method_input=['dsfdsfsdfsdf'],
                                                     expected_exception=LoadFileParserError,
-                                                    assert_method=self.assertRaises)
+                                                    assert_method=self.assertRaises,
+                                                    line_number=1)
 
-        assert_parse_method_raises_custom_exception(method_input=['4 4', '2 e N'],
+    def test_parse_raises_on_two_mowers_in_the_same_position(self):
+        """Test parse mower raises error on wrong mower file data."""
+        assert_parse_method_raises_custom_exception(method_input=['4 4', '1 1 N', 'LFR', '', '1 1 S'],
                                                     expected_exception=LoadFileParserError,
-                                                    assert_method=self.assertRaises)
+                                                    assert_method=self.assertRaises,
+                                                    line_number=5)
 
-        assert_parse_method_raises_custom_exception(method_input=['4 4', '2 2 N 3'],
-                                                    expected_exception=LoadFileParserError,
-                                                    assert_method=self.assertRaises)
+    def test_parse_file_with_no_mower(self):
+        """Test parse a mower file."""
+        # Given / When
+        fleet, lawn = patch_and_run_parse_method('\n'.join(['4 5']))
 
-        assert_parse_method_raises_custom_exception(method_input=['4 4', '2 2 N LR'],
-                                                    expected_exception=LoadFileParserError,
-                                                    assert_method=self.assertRaises)
+        # Then
+        self.assertEqual(LawnModel(height=4, width=5), lawn)
+        self.assertEqual(0, len(fleet))
 
-        assert_parse_method_raises_custom_exception(method_input=['4 4', '2 2 R'],
-                                                    expected_exception=LoadFileParserError,
-                                                    assert_method=self.assertRaises)
+    def test_parse_file_with_single_mower(self):
+        """Test parse a mower file."""
+        # Given / When
+        fleet, lawn = patch_and_run_parse_method('\n'.join(['4 4', '2 2 N', 'LBFR']))
 
-    def test_parse_raises_on_single_mower_with_random_input(self, lawn_mock, mwr_pos_mock, mwr_dirs_mock):
-        """Test parse mower raises error on wrong mower file data."""
-        assert_parse_method_raises_custom_exception(method_input=['dsfdsfsdfsdf'],
-                                                    expected_exception=LoadFileParserError,
-                                                    assert_method=self.assertRaises)
+        # Then
+        self.assertEqual(LawnModel(height=4, width=4), lawn)
+        self.assertEqual([(2, 2, OrdinalDirection.NORTH)], positions(fleet))
+        self.assertEqual(['LBFR'], [str(program) for program in fleet.programs])
 
-    def test_parse_file_with_no_mower(self, lawn_mock, mwr_pos_mock, mwr_dirs_mock):
+    def test_parse_file_with_multiplemowers_mower_with_no_directions(self):
         """Test parse a mower file."""
         # Given / When
-        patch_and_run_parse_method('\n'.join(['4 4']))
+        fleet, _ = patch_and_run_parse_method('\n'.join(['4 4', '1 2 E', '2 3 S', '3 3 N', '1 1 W']))
 
         # Then
-        lawn_mock.assert_called_once_with('4 4')
-        mwr_pos_mock.assert_not_called()
-        mwr_dirs_mock.assert_not_called()
+        expected_positions = [(1, 2, OrdinalDirection.EAST), (2, 3, OrdinalDirection.SOUTH),
+                              (3, 3, OrdinalDirection.NORTH), (1, 1, OrdinalDirection.WEST)]
 
-    def test_parse_file_with_single_mower(self, lawn_mock, mwr_pos_mock, mwr_dirs_mock):
-        """Test parse a mower file."""
+        self.assertEqual(expected_positions, positions(fleet))
+        self.assertEqual(['', '', '', ''], [str(program) for program in fleet.programs])
+
+    def test_parse_file_with_single_mower_with_multiline_directions(self):
+        """Test parse a mower file with multiple line directions."""
+        # Given / When
+        fleet, _ = patch_and_run_parse_method('\r\n'.join(['4 4', '2 2 N', 'LBFR', 'L', '', 'F', ' RRR LLBB ']))
+
+        # Then
+        self.assertEqual([(2, 2, OrdinalDirection.NORTH)], positions(fleet))
+        self.assertEqual(['LBFRLFRRRLLBB'], [str(program) for program in fleet.programs])
+
+    def test_parse_file_shares_programs(self):
+        """Test mowers with the same directions, written on one line or more, share one program."""
+        # Given / When
+        fleet, _ = patch_and_run_parse_method('\n'.join(['4 4', '2 2 N', 'LBFR', '3 3 E', 'LB', 'FR', '0 0 S', 'LBF', '1 1 N', '0 1 N']))
+
+        # Then
+        self.assertIs(fleet.programs[0], fleet.programs[1])
+        self.assertIsNot(fleet.programs[0], fleet.programs[2])
+        self.assertIs(fleet.programs[3], fleet.programs[4])
+        self.assertEqual(['LBFR', 'LBFR', 'LBF', '', ''], [str(program) for program in fleet.programs])
+
+    def test_parse_file_with_multiple_mowers_with_multiline_directions(self):
+        """Test parse a mower file with multiple line directions."""
+        # Given / When
+        fleet, _ = patch_and_run_parse_method('\n'.join(['4 4', '2 2 N', 'LBFR', 'L', 'F', 'RRRLLBB', '3 3 E', 'RRR', '0 0 S']))
+
+        # Then
+        expected_positions = [(2, 2, OrdinalDirection.NORTH), (3, 3, OrdinalDirection.EAST), (0, 0, OrdinalDirection.SOUTH)]
+
+        self.assertEqual(expected_positions, positions(fleet))
+        self.assertEqual(['LBFRLFRRRLLBB', 'RRR', ''], [str(program) for program in fleet.programs])
+
+
+class TestStdinMowerParserService(TestCase):
+    """Stdin Mower Parser Service test."""
+    def test_parse_stdin(self):
+        """Test parse mowers from stdin, read as bytes."""
         # Given
-        mwr_pos_mock.return_value = ((2, 2), MagicMock())
+        stdin = io.TextIOWrapper(io.BytesIO(b'4 4\n2 2 N\nLBFR\nL\n3 3 E\n'))
 
         # When
-        patch_and_run_parse_method('\n'.join(['4 4', '2 2 N', 'LBFR']))
+        with patch('sys.stdin', stdin):
+            fleet, lawn = StdinMowerParserService().parse()
 
         # Then
-        lawn_mock.assert_called_once_with('4 4\n')
-        mwr_pos_mock.assert_called_once_with(dict(), lawn_mock.return_value, '2 2 N\n')
-        mwr_dirs_mock.assert_called_once_with(mwr_pos_mock.return_value[1], (2, 2), 'LBFR')
+        self.assertEqual(LawnModel(height=4, width=4), lawn)
+        self.assertEqual([(2, 2, OrdinalDirection.NORTH), (3, 3, OrdinalDirection.EAST)], positions(fleet))
+        self.assertEqual(['LBFRL', ''], [str(program) for program in fleet.programs])
 
-    def test_parse_file_with_multiplemowers_mower_with_no_directions(self, lawn_mock, mwr_pos_mock, mwr_dirs_mock):
-        """Test parse a mower file."""
+    def test_parse_raises_on_empty_stdin(self):
+        """Test parse mowers from empty stdin raises error."""
+        with self.assertRaises(LoadFileParserError):
+            StdinMowerParserService(io.BytesIO(b'\n')).parse()
+
+    def test_stream_yields_mowers_once_read(self):
+        """Test stream mowers from stdin, each mower is yielded once the next position line is read."""
         # Given
-        mwr_pos_mock.return_value = ((2, 2), MagicMock())
+        read = []
+
+        def lines():
+            for line in (b'4 4\n', b'2 2 N\n', b'LBFR\n', b'L\n', b'3 3 E\n', b'F\n'):
+                read.append(line)
+                yield line
 
         # When
-        patch_and_run_parse_method('\n'.join(['4 4', '1 2 E', '2 3 S', '4 4 N', '1 1 W']))
+        lawn, mowers = StdinMowerParserService(lines()).stream()
+        first = next(mowers)
 
         # Then
-        lawn_mock.assert_called_once_with('4 4\n')
+        self.assertEqual(LawnModel(height=4, width=4), lawn)
+        self.assertEqual((2, 2, OrdinalDirection.NORTH), first.position)
+        self.assertEqual('LBFRL', str(first.directions))
+        self.assertEqual(5, len(read))
+        self.assertEqual([((3, 3, OrdinalDirection.EAST), 'F')], [(mower.position, str(mower.directions)) for mower in mowers])
+
+    def test_stream_matches_parse(self):
+        """Test stream the mowers of a file, mowers are the parsed ones."""
+        # Given
+        content = b'5 5\n\n1 2 N\nLFLF\nLFLFF\n3 3 E\n0 0 S\nFFRFFRFRRF\n'
+        fleet, lawn = StdinMowerParserService(io.BytesIO(content)).parse()
 
-        mwr_pos_calls = [call(dict(), lawn_mock.return_value, '1 2 E\n'),
-                         call(mwr_pos_mock.return_value[1], lawn_mock.return_value, '2 3 S\n'),
-                         call(mwr_pos_mock.return_value[1], lawn_mock.return_value, '4 4 N\n'),
-                         call(mwr_pos_mock.return_value[1], lawn_mock.return_value, '1 1 W')]
-        mwr_pos_mock.assert_has_calls(mwr_pos_calls)
+        # When
+        streamed_lawn, mowers = StdinMowerParserService(io.BytesIO(content)).stream()
 
-        mwr_dirs_mock.assert_not_called()
+        # Then
+        self.assertEqual(lawn, streamed_lawn)
+        self.assertEqual([(mower.position, str(mower.directions)) for mower in fleet.to_models()],
+                         [(mower.position, str(mower.directions)) for mower in mowers])
 
-    def test_parse_file_with_single_mower_with_multiline_directions(self, lawn_mock, mwr_pos_mock, mwr_dirs_mock):
-        """Test parse a mower file with multiple line directions."""
+    def test_parse_compressed_stdin(self):
+        """Test parse mowers with compressed directions from stdin, and stream them without expanding them."""
         # Given
-        mwr_pos_mock.return_value = ((2, 2), MagicMock())
+        content = b'5 5\n1 2 N\n(LF)*2\n3 3 E\nF2\n'
 
         # When
-        patch_and_run_parse_method('\n'.join(['4 4', '2 2 N', 'LBFR', 'L', 'F', 'RRRLLBB']))
+        fleet, _ = StdinMowerParserService(io.BytesIO(content), compressed=True).parse()
+        _, mowers = StdinMowerParserService(io.BytesIO(content), compressed=True).stream()
 
         # Then
-        lawn_mock.assert_called_once_with('4 4\n')
-        mwr_pos_mock.assert_called_once_with(dict(), lawn_mock.return_value, '2 2 N\n')
+        self.assertEqual(['(LF)*2', 'F2'], [str(program) for program in fleet.programs])
+        self.assertEqual(['(LF)*2', 'F2'], [str(mower.directions) for mower in mowers])
+
+    def test_stream_raises_on_two_mowers_in_the_same_position(self):
+        """Test stream mowers raises error on a mower starting on another one, with its line number."""
+        # Given
+        lawn, mowers = StdinMowerParserService(io.BytesIO(b'4 4\n1 1 N\nLFR\n\n1 1 S\n')).stream()
 
-        mwr_dir_calls = [call(mwr_pos_mock.return_value[1], (2, 2), 'LBFR\n'),
-                         call(mwr_dirs_mock.return_value, (2, 2), 'L\n'),
-                         call(mwr_dirs_mock.return_value, (2, 2), 'F\n'),
-                         call(mwr_dirs_mock.return_value, (2, 2), 'RRRLLBB')]
-        mwr_dirs_mock.assert_has_calls(mwr_dir_calls)
+        # When
+        with self.assertRaises(LoadFileParserError) as context:
+            list(mowers)
 
-    def test_parse_file_with_multiple_mowers_with_multiline_directions(self, lawn_mock, mwr_pos_mock, mwr_dirs_mock):
-        """Test parse a mower file with multiple line directions."""
+        # Then
+        self.assertTrue(context.exception.message.endswith('Line 5.'), context.exception.message)
+
+    def test_stream_raises_on_empty_stdin(self):
+        """Test stream mowers from empty stdin raises error."""
+        with self.assertRaises(LoadFileParserError):
+            StdinMowerParserService(io.BytesIO(b'')).stream()
+
+
+class TestLinesParsed(TestCase):
+    """Parser services lines_parsed test."""
+    def test_lines_parsed(self):
+        """Test count the lines of a mower file while parsing it, with or without a trailing newline."""
+        for content, expected_lines in (('4 4', 1), ('4 4\n', 1), ('4 4\n2 2 N\nLBFR', 3), ('4 4\n\n2 2 N\n', 3)):
+            descriptor, filename = tempfile.mkstemp(suffix='.txt')
+            with os.fdopen(descriptor, 'w') as mower_file:
+                mower_file.write(content)
+
+            parsers = (FileMowerParserService(filename), ParallelFileMowerParserService(filename, workers=2, chunk_size=1),
+                       StdinMowerParserService(io.BytesIO(content.encode())))
+            for parser in parsers:
+                parser.parse()
+                self.assertEqual(expected_lines, parser.lines_parsed, (type(parser).__name__, content))
+            os.remove(filename)
+
+    def test_lines_parsed_in_chunks(self):
+        """Test count the lines of a mower file parsed in parallel chunks."""
+        # Given
+        lines = build_random_mower_lines(3, 200)
+        filename = write_mower_file(lines)
+        parser = ParallelFileMowerParserService(filename, workers=2, chunk_size=64)
+
+        # When
+        parser.parse()
+        os.remove(filename)
+
+        # Then
+        self.assertEqual(len(lines), parser.lines_parsed)
+
+
+def write_mower_file(lines):
+    """Helper function to write a mower file, returns its name."""
+    descriptor, filename = tempfile.mkstemp(suffix='.txt')
+    with os.fdopen(descriptor, 'w') as mower_file:
+        mower_file.write('\n'.join(lines))
+    return filename
+
+
+def build_random_mower_lines(seed, mowers):
+    """Helper function to build random mower file lines."""
+    generator = random.Random(seed)
+    cells = generator.sample(range(50 * 40), mowers)
+    lines = ['40 50']
+    for cell in cells:
+        lines.append(f'{cell % 50} {cell // 50} {generator.choice("NESW")}')
+        for _ in range(generator.randrange(3)):
+            lines.append(''.join(generator.choice('FBLR') for _ in range(generator.randrange(60))))
+    return lines
+
+
+class TestParallelFileMowerParserService(TestCase):
+    """Parallel FileMower Parser Service test."""
+    def parse(self, lines, chunk_size=64):
+        """Parse lines written to a file with small chunks and two workers."""
+        filename = write_mower_file(lines)
+        self.addCleanup(os.remove, filename)
+        return ParallelFileMowerParserService(filename, workers=2, chunk_size=chunk_size).parse()
+
+    def test_split_on_position_lines(self):
+        """Test chunks start on position lines."""
         # Given
-        mowers = MagicMock()
-        mwr_pos_mock.side_effect = [((2, 2), mowers), ((3, 3), mowers), ((5, 5), mowers)]
+        lines = ['4 4', '1 1 N', 'LFR', 'FF', '2 2 N', 'RR', '3 3 N']
+        filename = write_mower_file(lines)
+        self.addCleanup(os.remove, filename)
+        parser = ParallelFileMowerParserService(filename, workers=2, chunk_size=1)
 
         # When
-        patch_and_run_parse_method('\n'.join(['4 4', '2 2 N', 'LBFR', 'L', 'F', 'RRRLLBB', '3 3 E', 'RRR', '5 5 S']))
+        with open(filename, 'rb') as mower_file:
+            data = mower_file.read()
+            chunks = parser.split(data, 4)
 
         # Then
-        lawn_mock.assert_called_once_with('4 4\n')
+        self.assertEqual([b'1 1 N\nLFR\nFF\n', b'2 2 N\nRR\n', b'3 3 N'], [data[start:end] for start, end in chunks])
 
-        mwr_pos_calls = [call(dict(), lawn_mock.return_value, '2 2 N\n'),
-                         call(mwr_dirs_mock.return_value, lawn_mock.return_value, '3 3 E\n'),
-                         call(mwr_dirs_mock.return_value, lawn_mock.return_value, '5 5 S')]
-        mwr_pos_mock.assert_has_calls(mwr_pos_calls)
+    def test_parse_lawn_without_mowers(self):
+        """Test parse a file larger than a chunk with only the lawn line."""
+        # When
+        fleet, lawn = self.parse(['4 4', ''], chunk_size=1)
+
+        # Then
+        self.assertEqual((0, LawnModel(height=4, width=4)), (len(fleet), lawn))
+
+    def test_parse_matches_sequential_parse(self):
+        """Test parallel parse gives the same fleet as the sequential one."""
+        for seed in range(5):
+            # Given
+            lines = build_random_mower_lines(seed, 200)
+
+            filename = write_mower_file(lines)
+            self.addCleanup(os.remove, filename)
+
+            # When
+            fleet, lawn = ParallelFileMowerParserService(filename, workers=2, chunk_size=256).parse()
+            expected_fleet, expected_lawn = FileMowerParserService(filename).parse()
+
+            # Then
+            self.assertEqual(expected_lawn, lawn)
+            self.assertEqual(positions(expected_fleet), positions(fleet))
+            self.assertEqual([str(program) for program in expected_fleet.programs], [str(program) for program in fleet.programs])
+
+    def test_parse_shares_programs_across_chunks(self):
+        """Test mowers with the same directions share one program, in a chunk and across chunks."""
+        # Given
+        lines = ['4 4', '1 1 N', 'LFRLFRLFRLFR', '2 2 N', 'LFRLFR', 'LFRLFR', '3 3 E', 'LFRLFRLFRLFR', '0 0 N', 'F']
+
+        # When
+        fleet, _ = self.parse(lines, chunk_size=8)
+
+        # Then
+        self.assertIs(fleet.programs[0], fleet.programs[1])
+        self.assertIs(fleet.programs[0], fleet.programs[2])
+        self.assertEqual('F', str(fleet.programs[3]))
+
+    def test_parse_raises_on_two_mowers_in_the_same_position_in_different_chunks(self):
+        """Test parse raises with the line number of the duplicate mower."""
+        # Given
+        lines = ['', '4 4', '1 1 N', 'LFRLFRLFRLFR', '2 2 N', 'LFRLFRLFRLFR', '3 3 E', '1 1 S', 'F']
 
-        mwr_dirs_calls = [call(mowers, (2, 2), 'LBFR\n'),
-                          call(mwr_dirs_mock.return_value, (2, 2), 'L\n'),
-                          call(mwr_dirs_mock.return_value, (2, 2), 'F\n'),
-                          call(mwr_dirs_mock.return_value, (2, 2), 'RRRLLBB\n'),
-                          call(mowers, (3, 3), 'RRR\n')]
-        mwr_dirs_mock.assert_has_calls(mwr_dirs_calls)
+        # When / Then
+        with self.assertRaises(LoadFileParserError) as context:
+            self.parse(lines, chunk_size=8)
+        self.assertTrue(context.exception.message.endswith('Line 8.'), context.exception.message)
+
+    def test_parse_raises_on_wrong_line_in_a_chunk(self):
+        """Test parse raises with the file line number of a wrong line."""
+        # Given
+        lines = ['4 4', '1 1 N', 'LFRLFRLFRLFR', '2 2 N', 'LFRLFRLFRLFR', '3 3 E', 'LFX', '0 0 N', '0 0 N']
+
+        # When / Then
+        with self.assertRaises(LoadFileParserError) as context:
+            self.parse(lines, chunk_size=8)
+        self.assertTrue(context.exception.message.endswith('Line 7.'), context.exception.message)
+
+    def test_parse_raises_on_no_lawn_params(self):
+        """Test parse raises when the file does not start with the lawn line."""
+        # Given
+        lines = ['LFR', '4 4', '1 1 N', 'LFRLFRLFRLFR', '2 2 N', 'LFRLFRLFRLFR']
+
+        # When / Then
+        with self.assertRaises(LoadFileParserError) as context:
+            self.parse(lines, chunk_size=8)
+        self.assertTrue(context.exception.message.endswith('Line 1.'), context.exception.message)
+
+
+class TestBinaryMowerParserService(TestCase):
+    """BinaryMowerParserService test."""
+    def test_parse_matches_text_parse(self):
+        """Test parse a binary file written from a text file."""
+        # Given
+        filename = write_mower_file(build_random_mower_lines(0, 50))
+        binary_filename = filename + '.bin'
+        try:
+            expected_fleet, expected_lawn = FileMowerParserService(filename).parse()
+            BinaryMowerPrinterService(binary_filename).print(expected_fleet, expected_lawn)
+
+            # When
+            fleet, lawn = BinaryMowerParserService(binary_filename).parse()
+        finally:
+            os.remove(filename)
+            os.remove(binary_filename)
+
+        # Then
+        self.assertEqual(expected_lawn, lawn)
+        self.assertEqual(expected_fleet.to_models(), fleet.to_models())
+
+    def test_parse_raises_on_text_file(self):
+        """Test parse raises error on a text file."""
+        # Given
+        filename = write_mower_file(['5 5', '1 2 N', 'LFLFLFLFF'])
+        try:
+            # When / Then
+            with self.assertRaises(LoadFileParserError):
+                BinaryMowerParserService(filename).parse()
+        finally:
+            os.remove(filename)
@@ -1,10 +1,233 @@
+import io
+import os
 import pytest
+import tempfile
 
 from unittest import TestCase
 from unittest.mock import patch, MagicMock, mock_open, call
 
-from mower.resources.services.mower_printers_service import MowerPrinterService
+from mower.resources.models.directions import OrdinalDirection
+from mower.resources.models.fleet_model import Fleet
+from mower.resources.models.instruction_tape import InstructionTape
+from mower.resources.models.lawn_model import LawnModel
+from mower.resources.services.mower_parsers_service import FileMowerParserService, BinaryMowerParserService
+from mower.resources.services.mower_printers_service import MowerPrinterService, FileMowerPrinterService, StdoutMowerPrinterService, \
+    TextFleetPrinterService, BinaryMowerPrinterService
+from mower.utils.exceptions import MowerPrinterError
+
+
+def build_fleet(raw_positions):
+    """Helper function to build a fleet from (x, y, o) positions."""
+    fleet = Fleet()
+    for x, y, o in raw_positions:
+        fleet.add(x, y, OrdinalDirection.from_str(o).code)
+    return fleet
 
 
 class TestMowerPrinterService(TestCase):
-    pass
+    """MowerPrinterService test."""
+    def test_format_lines(self):
+        """Test formatting result lines of a fleet."""
+        # Given
+        fleet = build_fleet([(1, 3, 'N'), (5, 1, 'E'), (10, 0, 'S'), (0, 12, 'W')])
+
+        # When
+        lines = MowerPrinterService.format_lines(fleet)
+        sliced_lines = MowerPrinterService.format_lines(fleet, 1, 3)
+
+        # Then
+        self.assertEqual(b'1 3 N\n5 1 E\n10 0 S\n0 12 W\n', lines)
+        self.assertEqual(b'5 1 E\n10 0 S\n', sliced_lines)
+
+    def test_write_in_chunks(self):
+        """Test result lines are written a chunk of mowers at a time."""
+        # Given
+        fleet = build_fleet([(index, index, 'N') for index in range(5)])
+        stream = MagicMock(write=MagicMock(side_effect=len))
+
+        # When
+        written = StdoutMowerPrinterService(buffer_size=32).write(stream, fleet)
+
+        # Then
+        self.assertEqual(30, written)
+        self.assertEqual([call(b'0 0 N\n1 1 N\n'), call(b'2 2 N\n3 3 N\n'), call(b'4 4 N\n')], stream.write.call_args_list)
+
+    def test_write_empty_fleet(self):
+        """Test nothing is written for an empty fleet."""
+        # Given
+        stream = MagicMock()
+
+        # When
+        written = StdoutMowerPrinterService().write(stream, Fleet())
+
+        # Then
+        self.assertEqual(0, written)
+        stream.write.assert_not_called()
+
+
+class TestFileMowerPrinterService(TestCase):
+    """FileMowerPrinterService test."""
+    def test_print(self):
+        """Test writing final positions to a file."""
+        # Given
+        fleet = build_fleet([(1, 3, 'N'), (5, 1, 'E')])
+        with tempfile.TemporaryDirectory() as directory:
+            output_filename = os.path.join(directory, 'output.txt')
+
+            # When
+            FileMowerPrinterService(output_filename=output_filename, buffer_size=8).print(fleet)
+
+            # Then
+            with open(output_filename) as output_file:
+                self.assertEqual('1 3 N\n5 1 E\n', output_file.read())
+
+    def test_print_stored(self):
+        """Test copying stored result lines to a file."""
+        # Given
+        stored = io.BytesIO(b'1 3 N\n5 1 E\n')
+        with tempfile.TemporaryDirectory() as directory:
+            output_filename = os.path.join(directory, 'output.txt')
+
+            # When
+            FileMowerPrinterService(output_filename=output_filename, buffer_size=4).print_stored(stored)
+
+            # Then
+            with open(output_filename) as output_file:
+                self.assertEqual('1 3 N\n5 1 E\n', output_file.read())
+
+    def test_open(self):
+        """Test writing result lines to a file as they come."""
+        # Given
+        with tempfile.TemporaryDirectory() as directory:
+            output_filename = os.path.join(directory, 'output.txt')
+
+            # When
+            with FileMowerPrinterService(output_filename=output_filename).open() as stream:
+                stream.write(b'1 3 N\n')
+                stream.write(b'5 1 E\n')
+
+            # Then
+            with open(output_filename) as output_file:
+                self.assertEqual('1 3 N\n5 1 E\n', output_file.read())
+
+
+class TestStdoutMowerPrinterService(TestCase):
+    """StdoutMowerPrinterService test."""
+    def test_print(self):
+        """Test writing final positions to stdout."""
+        # Given
+        fleet = build_fleet([(1, 3, 'N'), (5, 1, 'E')])
+        stdout = io.TextIOWrapper(io.BytesIO(), encoding='ascii')
+
+        # When
+        with patch('sys.stdout', stdout):
+            StdoutMowerPrinterService().print(fleet)
+
+        # Then
+        self.assertEqual(b'1 3 N\n5 1 E\n', stdout.buffer.getvalue())
+
+    def test_print_to_text_stdout(self):
+        """Test writing final positions to a stdout without binary buffer."""
+        # Given
+        fleet = build_fleet([(1, 3, 'N'), (5, 1, 'E')])
+        stdout = io.StringIO()
+
+        # When
+        with patch('sys.stdout', stdout):
+            StdoutMowerPrinterService().print(fleet)
+
+        # Then
+        self.assertEqual('1 3 N\n5 1 E\n', stdout.getvalue())
+
+    def test_print_stored(self):
+        """Test copying stored result lines to stdout, with or without binary buffer."""
+        for stdout in (io.TextIOWrapper(io.BytesIO(), encoding='ascii'), io.StringIO()):
+            # Given
+            stored = io.BytesIO(b'1 3 N\n5 1 E\n')
+
+            # When
+            with patch('sys.stdout', stdout):
+                StdoutMowerPrinterService(buffer_size=4).print_stored(stored)
+
+            # Then
+            stdout.flush()
+            value = stdout.buffer.getvalue().decode('ascii') if hasattr(stdout, 'buffer') else stdout.getvalue()
+            self.assertEqual('1 3 N\n5 1 E\n', value)
+
+    def test_open(self):
+        """Test writing result lines to stdout as they come, with or without binary buffer."""
+        for stdout in (io.TextIOWrapper(io.BytesIO(), encoding='ascii'), io.StringIO()):
+            # When
+            with patch('sys.stdout', stdout):
+                with StdoutMowerPrinterService().open() as stream:
+                    stream.write(b'1 3 N\n')
+                    stream.write(b'5 1 E\n')
+
+            # Then
+            value = stdout.buffer.getvalue().decode('ascii') if hasattr(stdout, 'buffer') else stdout.getvalue()
+            self.assertEqual('1 3 N\n5 1 E\n', value)
+
+
+class TestTextFleetPrinterService(TestCase):
+    """TextFleetPrinterService test."""
+    def test_print(self):
+        """Test writing mowers in the text input format, with their pending directions."""
+        # Given
+        lawn = LawnModel(height=5, width=6)
+        fleet = build_fleet([(1, 2, 'N'), (3, 3, 'E'), (0, 0, 'S')])
+        fleet.programs[0].extend_from_str('LFLFLFLFF')
+        fleet.programs[1].extend_from_str('FFRFFRFRRF')
+        fleet.cursors[1] = 6
+        with tempfile.TemporaryDirectory() as directory:
+            output_filename = os.path.join(directory, 'output.txt')
+
+            # When
+            TextFleetPrinterService(output_filename=output_filename, buffer_size=16).print(fleet, lawn)
+
+            # Then
+            with open(output_filename) as output_file:
+                self.assertEqual('5 6\n1 2 N\nLFLFLFLFF\n3 3 E\nFRRF\n0 0 S\n\n', output_file.read())
+            parsed_fleet, parsed_lawn = FileMowerParserService(output_filename).parse()
+            self.assertEqual(lawn, parsed_lawn)
+            self.assertEqual(fleet.to_models(), parsed_fleet.to_models())
+
+    def test_print_raises_without_lawn(self):
+        """Test writing mowers in the text input format needs a lawn."""
+        with self.assertRaises(MowerPrinterError):
+            TextFleetPrinterService(output_filename='output.txt').print(Fleet())
+
+
+class TestBinaryMowerPrinterService(TestCase):
+    """BinaryMowerPrinterService test."""
+    def test_print(self):
+        """Test writing mowers in binary format."""
+        # Given
+        lawn = LawnModel(height=5, width=6)
+        fleet = build_fleet([(1, 2, 'N'), (3, 3, 'E')])
+        fleet.programs[0].extend_from_str('LFLFLFLFF')
+        with tempfile.TemporaryDirectory() as directory:
+            output_filename = os.path.join(directory, 'output.bin')
+
+            # When
+            BinaryMowerPrinterService(output_filename=output_filename).print(fleet, lawn)
+
+            # Then
+            binary_fleet, binary_lawn = BinaryMowerParserService(output_filename).parse()
+            self.assertEqual(lawn, binary_lawn)
+            self.assertEqual(fleet.to_models(), binary_fleet.to_models())
+
+    def test_print_raises_without_lawn(self):
+        """Test writing mowers in binary format needs a lawn."""
+        with self.assertRaises(MowerPrinterError):
+            BinaryMowerPrinterService(output_filename='output.bin').print(Fleet())
+
+    def test_print_stored_raises(self):
+        """Test stored result lines can not be written in binary format."""
+        with self.assertRaises(MowerPrinterError):
+            BinaryMowerPrinterService(output_filename='output.bin').print_stored(io.BytesIO())
+
+    def test_open_raises(self):
+        """Test result lines can not be streamed in binary format."""
+        with self.assertRaises(MowerPrinterError):
+            with BinaryMowerPrinterService(output_filename='output.bin').open():
+                pass
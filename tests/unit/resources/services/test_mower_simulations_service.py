@@ -1,10 +1,807 @@
+import asyncio
 import pytest
+import random
 
-from unittest import TestCase
+from unittest import TestCase, skipIf
 from unittest.mock import patch, MagicMock, mock_open, call
 
-from mower.resources.services.mower_simulations_service import SyncMowerSimulationService, AsyncMowerSimulationService
+from mower.resources.models.directions import OrdinalDirection
+from mower.resources.models.fleet_snapshot_model import FleetCheckpoints
+from mower.resources.models.fleet_model import Fleet
+from mower.resources.models.instruction_tape import InstructionTape
+from mower.resources.models.lawn_model import LawnModel
+from mower.resources.models.mower_model import MowerModel
+from mower.resources.models.occupancy_model import OccupancyGrid
+from mower.resources.models.program_tree_model import ProgramTree
+from mower.resources.services import mower_simulations_service
+from mower.resources.services.mower_simulations_service import SyncMowerSimulationService, AsyncMowerSimulationService, VectorizedMowerSimulationService, \
+    MacroStepMowerSimulationService, ParallelMowerSimulationService, TiledMowerSimulationService
+from mower.utils.exceptions import MowerSimulationError
+from mower.utils.contention_stats import ContentionStats
+from mower.utils.mower_stats import MowerStats
+
+
+def build_fleet(raw_mowers):
+    """Helper function to build a fleet from (x, y, o, directions) strings."""
+    fleet = Fleet()
+    for x, y, o, directions in raw_mowers:
+        fleet.add(x, y, OrdinalDirection.from_str(o).code, InstructionTape.from_str(directions))
+    return fleet
+
+
+def build_random_fleet(seed, lawn):
+    """Helper function to build a random crowded fleet."""
+    rand = random.Random(seed)
+    cells = [(x, y) for x in range(lawn.width) for y in range(lawn.height)]
+    rand.shuffle(cells)
+    fleet = Fleet()
+    for x, y in cells[:rand.randint(1, len(cells))]:
+        fleet.add(x, y, rand.randrange(4), InstructionTape(bytes(rand.choices(range(4), k=rand.randint(0, 30)))))
+    return fleet
+
+
+def build_random_straight_fleet(seed):
+    """Helper function to build a random fleet with programs made of long runs."""
+    rand = random.Random(seed)
+    lawn = LawnModel(height=rand.randint(1, 30), width=rand.randint(1, 30))
+    cells = [(x, y) for x in range(lawn.width) for y in range(lawn.height)]
+    rand.shuffle(cells)
+    fleet = Fleet()
+    for x, y in cells[:rand.randint(1, min(len(cells), rand.choice((3, 10, 40))))]:
+        directions = ''.join(rand.choice('FBLR') * rand.choice((1, 2, 5, 20)) for _ in range(rand.randint(0, 15)))
+        fleet.add(x, y, rand.randrange(4), InstructionTape.from_str(directions))
+    return fleet, lawn
+
+
+def build_random_tree_fleet(seed):
+    """Helper function to build a random fleet with repeated programs, some mowers far from the others, and the same fleet expanded."""
+    rand = random.Random(seed)
+    lawn = LawnModel(height=rand.randint(1, 60), width=rand.randint(1, 60))
+    cells = [(x, y) for x in range(lawn.width) for y in range(lawn.height)]
+    rand.shuffle(cells)
+    fleet, expanded_fleet = Fleet(), Fleet()
+    for x, y in cells[:rand.randint(1, min(len(cells), 12))]:
+        directions = ''.join(f'({rand.choice(("F", "FL", "LFRF", "FFR", "B"))}){rand.randint(0, 20)}' for _ in range(rand.randint(0, 3)))
+        program = ProgramTree.parse(directions.encode())
+        orientation = rand.randrange(4)
+        fleet.add(x, y, orientation, program)
+        expanded_fleet.add(x, y, orientation, InstructionTape(program.codes()))
+    return fleet, expanded_fleet, lawn
+
+
+def positions(fleet):
+    """Helper function to list the positions of a fleet."""
+    return [fleet.position(index) for index in range(len(fleet))]
 
 
 class TestSyncMowerSimulation(TestCase):
-    pass
+    """SyncMowerSimulationService test."""
+    def test_run(self):
+        """Test run a fleet of mowers."""
+        # Given
+        lawn = LawnModel(height=5, width=6)
+        fleet = build_fleet([(1, 2, 'N', 'LFLFLFLFF'), (3, 3, 'E', 'FFRFFRFRRF')])
+
+        # When
+        fleet = SyncMowerSimulationService().run(fleet, lawn)
+
+        # Then
+        expected_positions = [(1, 3, OrdinalDirection.NORTH), (5, 1, OrdinalDirection.EAST)]
+
+        self.assertEqual(expected_positions, positions(fleet))
+        self.assertEqual([0, 0], [fleet.pending(index) for index in range(len(fleet))])
+
+    def test_run_stream_is_refused(self):
+        """Test mowers coming from a stream are only run by the async simulation."""
+        with self.assertRaises(MowerSimulationError):
+            asyncio.run(SyncMowerSimulationService().run_stream(stream_mowers([]), LawnModel(height=5, width=5)))
+
+    def test_run_drops_moves_into_occupied_cells(self):
+        """Test a mower does not move into a cell held by another mower."""
+        # Given
+        lawn = LawnModel(height=1, width=3)
+        fleet = build_fleet([(0, 0, 'E', 'FF'), (2, 0, 'W', 'LR')])
+
+        # When
+        fleet = SyncMowerSimulationService().run(fleet, lawn)
+
+        # Then
+        expected_positions = [(1, 0, OrdinalDirection.EAST), (2, 0, OrdinalDirection.WEST)]
+
+        self.assertEqual(expected_positions, positions(fleet))
+
+    def test_run_follows_a_mower_moving_away_in_the_same_round(self):
+        """Test a mower enters a cell freed earlier in the same round."""
+        # Given
+        lawn = LawnModel(height=1, width=3)
+        fleet = build_fleet([(1, 0, 'E', 'F'), (0, 0, 'E', 'F')])
+
+        # When
+        fleet = SyncMowerSimulationService().run(fleet, lawn)
+
+        # Then
+        expected_positions = [(2, 0, OrdinalDirection.EAST), (1, 0, OrdinalDirection.EAST)]
+
+        self.assertEqual(expected_positions, positions(fleet))
+
+    def test_run_counts_blocked_moves(self):
+        """Test moves into occupied cells are counted, moves stopped by the lawn borders are not."""
+        # Given
+        lawn = LawnModel(height=1, width=3)
+        fleet = build_fleet([(0, 0, 'E', 'FFF'), (2, 0, 'W', 'LRF')])
+        simulation = SyncMowerSimulationService()
+        simulation.stats = MowerStats()
+
+        # When
+        simulation.run(fleet, lawn)
+
+        # Then
+        self.assertEqual({'blocked_moves': 3}, simulation.stats.counters)
+
+    def test_run_records_contention(self):
+        """Test blocked moves are recorded per mower and per cell they were blocked into."""
+        # Given
+        lawn = LawnModel(height=1, width=3)
+        fleet = build_fleet([(0, 0, 'E', 'FFF'), (2, 0, 'W', 'LRF')])
+        simulation = SyncMowerSimulationService()
+        simulation.stats = MowerStats()
+        simulation.stats.contention = ContentionStats.for_fleet(fleet, lawn)
+
+        # When
+        simulation.run(fleet, lawn)
+
+        # Then
+        self.assertEqual([2, 1], list(simulation.stats.contention.mower_blocks))
+        self.assertEqual([(1, 0, 1), (2, 0, 2)], simulation.stats.contention.cells())
+
+    def test_run_tells_checkpoints_rounds_done(self):
+        """Test checkpoints are given the round and the number of steps run at the end of each round."""
+        # Given
+        lawn = LawnModel(height=1, width=3)
+        fleet = build_fleet([(0, 0, 'E', 'FFF'), (2, 0, 'W', 'LR'), (1, 0, 'N', '')])
+
+        # When
+        rounds = record_checkpoint_rounds(SyncMowerSimulationService(), fleet, lawn)
+
+        # Then
+        self.assertEqual([(1, 2), (2, 2), (3, 1)], rounds)
+
+    def test_run_program_trees_matches_expanded_programs(self):
+        """Test mowers with program trees, run at once when alone, end where their expanded programs do."""
+        for seed in range(40):
+            # Given
+            fleet, expanded_fleet, lawn = build_random_tree_fleet(seed)
+
+            # When
+            fleet = SyncMowerSimulationService().run(fleet, lawn)
+            expanded_fleet = SyncMowerSimulationService().run(expanded_fleet, lawn)
+
+            # Then
+            self.assertEqual(positions(expanded_fleet), positions(fleet))
+            self.assertEqual([0] * len(fleet), [fleet.pending(index) for index in range(len(fleet))])
+
+    def test_run_shared_programs_matches_distinct_programs(self):
+        """Test mowers sharing programs, run at once when alone, end where mowers with copies of the programs do."""
+        for seed in range(20):
+            # Given
+            rand = random.Random(seed)
+            fleet, lawn = build_random_sparse_fleet(seed)
+            copied_fleet, _ = build_random_sparse_fleet(seed)
+            programs = [InstructionTape(bytes(rand.choices(range(4), k=rand.randint(0, 20)))) for _ in range(3)]
+            fleet.programs = [rand.choice(programs) for _ in range(len(fleet))]
+            copied_fleet.programs = [InstructionTape(program.codes(0)) for program in fleet.programs]
+
+            # When
+            fleet = SyncMowerSimulationService().run(fleet, lawn)
+            copied_fleet = SyncMowerSimulationService().run(copied_fleet, lawn)
+
+            # Then
+            self.assertEqual(positions(copied_fleet), positions(fleet))
+            self.assertEqual([0] * len(fleet), [fleet.pending(index) for index in range(len(fleet))])
+
+    def test_run_alone(self):
+        """Test only mowers with a program tree no other mower can reach are moved at once."""
+        # Given
+        lawn = LawnModel(height=100, width=100)
+        fleet = build_fleet([(0, 0, 'N', 'F'), (0, 2, 'S', 'F'), (50, 50, 'N', '')])
+        fleet.programs[2] = ProgramTree.parse(b'F(LR)*400000000')
+        fleet.add(90, 90, OrdinalDirection.EAST.code, ProgramTree.parse(b'F3'))
+        fleet.add(90, 92, OrdinalDirection.SOUTH.code, ProgramTree.parse(b'F3'))
+
+        # When
+        SyncMowerSimulationService.run_alone(fleet, lawn)
+
+        # Then
+        self.assertEqual([1, 1, 0, 3, 3], [fleet.pending(index) for index in range(len(fleet))])
+        self.assertEqual((50, 51, OrdinalDirection.NORTH), fleet.position(2))
+
+    def test_run_alone_leaves_crowded_fleets(self):
+        """Test no mower is moved at once when the reachable boxes cover more than the lawn, alone or not."""
+        # Given
+        lawn = LawnModel(height=1, width=10)
+        fleet = build_fleet([(0, 0, 'E', 'FFFFFFFF'), (1, 0, 'W', 'F'), (9, 0, 'W', 'L')])
+
+        # When
+        SyncMowerSimulationService.run_alone(fleet, lawn)
+
+        # Then
+        self.assertEqual([8, 1, 1], [fleet.pending(index) for index in range(len(fleet))])
+
+
+def record_checkpoint_rounds(simulation, fleet, lawn):
+    """Helper function to list the rounds and steps given to checkpoints along a simulation run."""
+    simulation.checkpoints = MagicMock(spec=FleetCheckpoints)
+    simulation.run(fleet, lawn)
+    return [call_args[0][1:] for call_args in simulation.checkpoints.round_done.call_args_list]
+
+
+def record_contention(simulation, fleet, lawn):
+    """Helper function to record the contention of a simulation run, as blocked moves per mower and per cell."""
+    simulation.stats = MowerStats()
+    simulation.stats.contention = ContentionStats.for_fleet(fleet, lawn)
+    simulation.run(fleet, lawn)
+    return list(simulation.stats.contention.mower_blocks), simulation.stats.contention.cells()
+
+
+def count_blocked_moves(simulation, fleet, lawn):
+    """Helper function to count the blocked moves of a simulation run."""
+    simulation.stats = MowerStats()
+    simulation.run(fleet, lawn)
+    return simulation.stats.counters.get('blocked_moves', 0)
+
+
+class TestMacroStepMowerSimulation(TestCase):
+    """MacroStepMowerSimulationService test."""
+    def test_run(self):
+        """Test run a fleet of mowers."""
+        # Given
+        lawn = LawnModel(height=5, width=6)
+        fleet = build_fleet([(1, 2, 'N', 'LFLFLFLFF'), (3, 3, 'E', 'FFRFFRFRRF')])
+
+        # When
+        fleet = MacroStepMowerSimulationService().run(fleet, lawn)
+
+        # Then
+        expected_positions = [(1, 3, OrdinalDirection.NORTH), (5, 1, OrdinalDirection.EAST)]
+
+        self.assertEqual(expected_positions, positions(fleet))
+        self.assertEqual([0, 0], [fleet.pending(index) for index in range(len(fleet))])
+
+    def test_run_refuses_program_trees(self):
+        """Test mowers with program trees are refused, their programs would be expanded."""
+        # Given
+        lawn = LawnModel(height=5, width=6)
+        fleet = build_fleet([(1, 2, 'N', 'LFLFLFLFF')])
+        fleet.add(3, 3, OrdinalDirection.EAST.code, ProgramTree.parse(b'F1000000000'))
+
+        # When / Then
+        with self.assertRaises(MowerSimulationError):
+            MacroStepMowerSimulationService().run(fleet, lawn)
+
+    def test_run_stops_runs_on_borders_and_finished_mowers(self):
+        """Test a long run stops on the lawn border and in front of a mower that has finished."""
+        # Given
+        lawn = LawnModel(height=10, width=10)
+        fleet = build_fleet([(0, 0, 'E', 'F' * 50), (0, 5, 'E', 'F' * 50), (7, 5, 'N', ''), (0, 9, 'S', 'FFFLFFFFFFFFF')])
+
+        # When
+        fleet = MacroStepMowerSimulationService().run(fleet, lawn)
+
+        # Then
+        expected_positions = [(9, 0, OrdinalDirection.EAST), (6, 5, OrdinalDirection.EAST),
+                              (7, 5, OrdinalDirection.NORTH), (9, 6, OrdinalDirection.EAST)]
+
+        self.assertEqual(expected_positions, positions(fleet))
+
+    def test_run_queues_behind_a_mower_staying_on_its_cell(self):
+        """Test mowers wait behind a mower staying on its cell then move on when it leaves."""
+        # Given
+        lawn = LawnModel(height=3, width=100)
+        fleet = build_fleet([(99, 1, 'N', 'L' * 500 + 'FF'), (50, 1, 'E', 'F' * 1000), (49, 1, 'E', 'F' * 600 + 'RF')])
+
+        # When
+        fleet = MacroStepMowerSimulationService().run(fleet, lawn)
+
+        # Then
+        expected_positions = [(99, 2, OrdinalDirection.NORTH), (99, 1, OrdinalDirection.EAST), (98, 0, OrdinalDirection.SOUTH)]
+
+        self.assertEqual(expected_positions, positions(fleet))
+
+    def test_run_head_on_mowers(self):
+        """Test mowers running head-on stay blocked until one of them stops."""
+        # Given
+        lawn = LawnModel(height=1, width=10)
+        fleet = build_fleet([(2, 0, 'E', 'F' * 5000 + 'BB'), (6, 0, 'W', 'F' * 3000 + 'RRF'), (9, 0, 'W', 'F' * 8000)])
+
+        # When
+        fleet = MacroStepMowerSimulationService().run(fleet, lawn)
+
+        # Then
+        expected_positions = [(2, 0, OrdinalDirection.EAST), (5, 0, OrdinalDirection.EAST), (6, 0, OrdinalDirection.WEST)]
+
+        self.assertEqual(expected_positions, positions(fleet))
+
+    def test_run_long_straight_programs(self):
+        """Test long straight programs on a large lawn."""
+        # Given
+        lawn = LawnModel(height=10 ** 6, width=10 ** 6)
+        fleet = build_fleet([(0, 0, 'E', 'F' * 10 ** 6 + 'L' + 'F' * 5000), (500, 500, 'N', ('F' * 1000 + 'RRRR') * 100)])
+
+        # When
+        fleet = MacroStepMowerSimulationService().run(fleet, lawn)
+
+        # Then
+        self.assertEqual([(999999, 5000, OrdinalDirection.NORTH), (500, 100500, OrdinalDirection.NORTH)], positions(fleet))
+
+    def test_run_matches_sync_simulation(self):
+        """Test final positions are the ones of the synchronous simulation."""
+        for seed in range(150):
+            expected_fleet, lawn = build_random_straight_fleet(seed)
+            fleet, _ = build_random_straight_fleet(seed)
+
+            SyncMowerSimulationService().run(expected_fleet, lawn)
+            MacroStepMowerSimulationService().run(fleet, lawn)
+
+            self.assertEqual(positions(expected_fleet), positions(fleet))
+            self.assertEqual(expected_fleet.cursors, fleet.cursors)
+
+    def test_run_counts_blocked_moves_as_sync_simulation(self):
+        """Test blocked moves are counted as the sync simulation counts them."""
+        for seed in range(100):
+            fleet, lawn = build_random_straight_fleet(seed)
+            expected_blocked_moves = count_blocked_moves(SyncMowerSimulationService(), fleet, lawn)
+
+            fleet, lawn = build_random_straight_fleet(seed)
+            self.assertEqual(expected_blocked_moves, count_blocked_moves(MacroStepMowerSimulationService(), fleet, lawn), seed)
+
+    def test_run_records_contention_as_sync_simulation(self):
+        """Test blocked moves are recorded per mower and per cell as the sync simulation records them."""
+        for seed in range(100):
+            fleet, lawn = build_random_straight_fleet(seed)
+            expected_contention = record_contention(SyncMowerSimulationService(), fleet, lawn)
+
+            fleet, lawn = build_random_straight_fleet(seed)
+            self.assertEqual(expected_contention, record_contention(MacroStepMowerSimulationService(), fleet, lawn), seed)
+
+    def test_run_matches_sync_simulation_on_crowded_lawns(self):
+        """Test final positions are the ones of the synchronous simulation on crowded lawns."""
+        for seed in range(100):
+            lawn = LawnModel(height=seed % 7 + 1, width=seed % 5 + 1)
+
+            expected_fleet = SyncMowerSimulationService().run(build_random_fleet(seed, lawn), lawn)
+            fleet = MacroStepMowerSimulationService().run(build_random_fleet(seed, lawn), lawn)
+
+            self.assertEqual(positions(expected_fleet), positions(fleet))
+
+
+@skipIf(not mower_simulations_service.import_numpy(), 'numpy is not installed')
+class TestVectorizedMowerSimulation(TestCase):
+    """VectorizedMowerSimulationService test."""
+    def assert_same_as_sync_simulation(self):
+        for seed in range(100):
+            lawn = LawnModel(height=seed % 7 + 1, width=seed % 5 + 1)
+
+            expected_fleet = SyncMowerSimulationService().run(build_random_fleet(seed, lawn), lawn)
+            fleet = VectorizedMowerSimulationService().run(build_random_fleet(seed, lawn), lawn)
+
+            self.assertEqual(positions(expected_fleet), positions(fleet))
+
+    def test_run_refuses_program_trees(self):
+        """Test mowers with program trees are refused, their programs would be expanded."""
+        # Given
+        lawn = LawnModel(height=5, width=6)
+        fleet = build_fleet([(1, 2, 'N', 'LFLFLFLFF')])
+        fleet.add(3, 3, OrdinalDirection.EAST.code, ProgramTree.parse(b'F1000000000'))
+
+        # When / Then
+        with self.assertRaises(MowerSimulationError):
+            VectorizedMowerSimulationService().run(fleet, lawn)
+
+    def test_run(self):
+        """Test run a fleet of mowers."""
+        # Given
+        lawn = LawnModel(height=5, width=6)
+        fleet = build_fleet([(1, 2, 'N', 'LFLFLFLFF'), (3, 3, 'E', 'FFRFFRFRRF')])
+
+        # When
+        fleet = VectorizedMowerSimulationService().run(fleet, lawn)
+
+        # Then
+        expected_positions = [(1, 3, OrdinalDirection.NORTH), (5, 1, OrdinalDirection.EAST)]
+
+        self.assertEqual(expected_positions, positions(fleet))
+        self.assertEqual([0, 0], [fleet.pending(index) for index in range(len(fleet))])
+
+    def test_run_matches_sync_simulation(self):
+        """Test final positions are the ones of the synchronous simulation."""
+        self.assert_same_as_sync_simulation()
+
+    @patch.object(OccupancyGrid, 'BITMAP_MIN_CELLS', 0)
+    @patch.object(OccupancyGrid, 'BITMAP_MAX_CELLS', 0)
+    def test_run_matches_sync_simulation_with_sparse_occupancy(self):
+        """Test final positions are the ones of the synchronous simulation on huge sparse lawns."""
+        self.assert_same_as_sync_simulation()
+
+    def test_run_counts_blocked_moves_as_sync_simulation(self):
+        """Test blocked moves are counted as the sync simulation counts them."""
+        for seed in range(100):
+            lawn = LawnModel(height=seed % 7 + 1, width=seed % 5 + 1)
+
+            expected_blocked_moves = count_blocked_moves(SyncMowerSimulationService(), build_random_fleet(seed, lawn), lawn)
+            blocked_moves = count_blocked_moves(VectorizedMowerSimulationService(), build_random_fleet(seed, lawn), lawn)
+
+            self.assertEqual(expected_blocked_moves, blocked_moves, seed)
+
+    def test_run_records_contention_as_sync_simulation(self):
+        """Test blocked moves are recorded per mower and per cell as the sync simulation records them."""
+        for seed in range(100):
+            lawn = LawnModel(height=seed % 7 + 1, width=seed % 5 + 1)
+
+            expected_contention = record_contention(SyncMowerSimulationService(), build_random_fleet(seed, lawn), lawn)
+            contention = record_contention(VectorizedMowerSimulationService(), build_random_fleet(seed, lawn), lawn)
+
+            self.assertEqual(expected_contention, contention, seed)
+
+    def test_run_tells_checkpoints_rounds_done(self):
+        """Test checkpoints are given the round and the number of steps run at the end of each round."""
+        # Given
+        lawn = LawnModel(height=1, width=3)
+        fleet = build_fleet([(0, 0, 'E', 'FFF'), (2, 0, 'W', 'LR'), (1, 0, 'N', '')])
+
+        # When
+        rounds = record_checkpoint_rounds(VectorizedMowerSimulationService(), fleet, lawn)
+
+        # Then
+        self.assertEqual([(1, 2), (2, 2), (3, 1)], rounds)
+
+    @patch('mower.resources.services.mower_simulations_service.import_numpy', return_value=False)
+    def test_init_raises_without_numpy(self, _):
+        """Test the vectorized simulation cannot be built without numpy."""
+        with self.assertRaises(MowerSimulationError):
+            VectorizedMowerSimulationService()
+
+
+async def stream_mowers(raw_mowers, delay_rounds=0):
+    """Helper function streaming mower models from (x, y, o, directions) strings, letting the loop run between them."""
+    for x, y, o, directions in raw_mowers:
+        for _ in range(delay_rounds):
+            await asyncio.sleep(0)
+        yield MowerModel(position=(x, y, OrdinalDirection.from_str(o)), directions=directions)
+
+
+class TestAsyncMowerSimulation(TestCase):
+    """AsyncMowerSimulationService test."""
+    def test_run(self):
+        """Test run a fleet of mowers."""
+        # Given
+        lawn = LawnModel(height=5, width=6)
+        fleet = build_fleet([(1, 2, 'N', 'LFLFLFLFF'), (3, 3, 'E', 'FFRFFRFRRF')])
+
+        # When
+        fleet = AsyncMowerSimulationService().run(fleet, lawn)
+
+        # Then
+        expected_positions = [(1, 3, OrdinalDirection.NORTH), (5, 1, OrdinalDirection.EAST)]
+
+        self.assertEqual(expected_positions, positions(fleet))
+        self.assertEqual([0, 0], [fleet.pending(index) for index in range(len(fleet))])
+
+    def test_run_matches_sync_simulation(self):
+        """Test final positions are the ones of the synchronous simulation."""
+        for seed in range(100):
+            lawn = LawnModel(height=seed % 7 + 1, width=seed % 5 + 1)
+
+            expected_fleet = SyncMowerSimulationService().run(build_random_fleet(seed, lawn), lawn)
+            fleet = AsyncMowerSimulationService().run(build_random_fleet(seed, lawn), lawn)
+
+            self.assertEqual(positions(expected_fleet), positions(fleet))
+
+    def test_run_counts_blocked_moves_as_sync_simulation(self):
+        """Test blocked moves are counted as the sync simulation counts them."""
+        for seed in range(100):
+            lawn = LawnModel(height=seed % 7 + 1, width=seed % 5 + 1)
+
+            expected_blocked_moves = count_blocked_moves(SyncMowerSimulationService(), build_random_fleet(seed, lawn), lawn)
+            blocked_moves = count_blocked_moves(AsyncMowerSimulationService(), build_random_fleet(seed, lawn), lawn)
+
+            self.assertEqual(expected_blocked_moves, blocked_moves, seed)
+
+    def test_run_records_contention_as_sync_simulation(self):
+        """Test blocked moves are recorded per mower and per cell as the sync simulation records them."""
+        for seed in range(100):
+            lawn = LawnModel(height=seed % 7 + 1, width=seed % 5 + 1)
+
+            expected_contention = record_contention(SyncMowerSimulationService(), build_random_fleet(seed, lawn), lawn)
+            contention = record_contention(AsyncMowerSimulationService(), build_random_fleet(seed, lawn), lawn)
+
+            self.assertEqual(expected_contention, contention, seed)
+
+    def test_run_stream(self):
+        """Test run mowers coming from a stream, results are given as mowers finish."""
+        # Given
+        lawn = LawnModel(height=5, width=6)
+        results = asyncio.Queue()
+        raw_mowers = [(1, 2, 'N', 'LFLFLFLFF'), (0, 0, 'N', ''), (3, 3, 'E', 'FFRFFRFRRF')]
+
+        # When
+        count = asyncio.run(AsyncMowerSimulationService().run_stream(stream_mowers(raw_mowers, delay_rounds=3), lawn, results))
+
+        # Then
+        expected_positions = [(1, 3, OrdinalDirection.NORTH), (0, 0, OrdinalDirection.NORTH), (5, 1, OrdinalDirection.EAST)]
+        finished = [results.get_nowait() for _ in range(results.qsize())]
+
+        self.assertEqual(3, count)
+        self.assertEqual([1, 0, 2], [index for index, _ in finished])
+        self.assertEqual(expected_positions, [position for _, position in sorted(finished)])
+
+    def test_run_stream_not_deterministic_waits_for_start_cell(self):
+        """Test a mower arriving on a cell held by a moving mower joins the lawn once the cell is released."""
+        # Given
+        lawn = LawnModel(height=1, width=3)
+        raw_mowers = [(0, 0, 'E', 'FF'), (1, 0, 'N', 'L')]
+
+        results = asyncio.Queue()
+
+        # When
+        asyncio.run(AsyncMowerSimulationService(deterministic=False).run_stream(stream_mowers(raw_mowers, delay_rounds=1), lawn, results))
+
+        # Then
+        finished = sorted(results.get_nowait() for _ in range(results.qsize()))
+        self.assertEqual([(2, 0, OrdinalDirection.EAST), (1, 0, OrdinalDirection.WEST)], [position for _, position in finished])
+
+    def test_run_stream_not_deterministic_window(self):
+        """Test mowers start at most window mowers after the first one not finished, whatever the time it takes."""
+        # Given
+        lawn = LawnModel(height=100, width=100)
+        raw_mowers = [(0, 0, 'N', 'F' * 50)] + [(index, 0, 'N', 'F') for index in range(1, 20)]
+        results = asyncio.Queue()
+
+        # When
+        asyncio.run(AsyncMowerSimulationService(deterministic=False).run_stream(stream_mowers(raw_mowers), lawn, results, window=3))
+
+        # Then
+        finished = [index for index, _ in (results.get_nowait() for _ in range(results.qsize()))]
+        # Results a printer in input order holds until the ones before are known
+        ahead, next_index, most_ahead = set(), 0, 0
+        for index in finished:
+            ahead.add(index)
+            while next_index in ahead:
+                ahead.remove(next_index)
+                next_index += 1
+            most_ahead = max(most_ahead, len(ahead))
+        self.assertEqual(20, len(finished))
+        self.assertEqual(2, most_ahead)
+
+    def test_run_stream_not_deterministic_raises_on_held_start_cell(self):
+        """Test a mower arriving on a cell held by a finished mower makes the simulation fail."""
+        # Given
+        lawn = LawnModel(height=1, width=3)
+        raw_mowers = [(0, 0, 'E', 'F'), (1, 0, 'N', 'L')]
+
+        # When / Then
+        with self.assertRaises(MowerSimulationError):
+            asyncio.run(AsyncMowerSimulationService(deterministic=False).run_stream(stream_mowers(raw_mowers, delay_rounds=2), lawn))
+
+
+def build_random_sparse_fleet(seed):
+    """Helper function to build a random fleet of small clusters of mowers spread over a large lawn."""
+    rand = random.Random(seed)
+    lawn = LawnModel(height=200, width=200)
+    cells = set()
+    fleet = Fleet()
+    for _ in range(rand.randint(1, 12)):
+        cx, cy = rand.randrange(200), rand.randrange(200)
+        for _ in range(rand.randint(1, 4)):
+            x, y = min(cx + rand.randrange(4), 199), min(cy + rand.randrange(4), 199)
+            if (x, y) not in cells:
+                cells.add((x, y))
+                fleet.add(x, y, rand.randrange(4), InstructionTape(bytes(rand.choices(range(4), k=rand.randint(0, 20)))))
+    return fleet, lawn
+
+
+class TestParallelMowerSimulation(TestCase):
+    """ParallelMowerSimulationService test."""
+    def test_run(self):
+        """Test run a fleet of mowers."""
+        # Given
+        lawn = LawnModel(height=5, width=6)
+        fleet = build_fleet([(1, 2, 'N', 'LFLFLFLFF'), (3, 3, 'E', 'FFRFFRFRRF')])
+
+        # When
+        fleet = ParallelMowerSimulationService(workers=2, min_instructions=0).run(fleet, lawn)
+
+        # Then
+        expected_positions = [(1, 3, OrdinalDirection.NORTH), (5, 1, OrdinalDirection.EAST)]
+
+        self.assertEqual(expected_positions, positions(fleet))
+        self.assertEqual([0, 0], [fleet.pending(index) for index in range(len(fleet))])
+
+    def test_run_program_trees(self):
+        """Test mowers with program trees are run by the workers without being expanded."""
+        # Given
+        lawn = LawnModel(height=5, width=6)
+        fleet = build_fleet([(1, 2, 'N', 'LFLFLFLFF')])
+        fleet.add(3, 3, OrdinalDirection.EAST.code, ProgramTree.parse(b'F1000000000'))
+
+        # When
+        fleet = ParallelMowerSimulationService(workers=2, min_instructions=0).run(fleet, lawn)
+
+        # Then
+        self.assertEqual([(1, 3, OrdinalDirection.NORTH), (5, 3, OrdinalDirection.EAST)], positions(fleet))
+        self.assertEqual([0, 0], [fleet.pending(index) for index in range(len(fleet))])
+
+    def test_reachable_box(self):
+        """Test a mower box spans its number of translations heading each way, inside the lawn."""
+        # Given
+        lawn = LawnModel(height=10, width=10)
+        fleet = build_fleet([(1, 5, 'N', 'FFLRBRFFLLLFFF')])
+
+        # When
+        box = ParallelMowerSimulationService.reachable_box(fleet, 0, lawn.as_tuple())
+
+        # Then
+        self.assertEqual((1, 1, 3, 7), box)
+
+    def test_reachable_box_of_program_tree(self):
+        """Test a mower box with a program tree is the one of its expanded program."""
+        # Given
+        lawn = LawnModel(height=10, width=10)
+        fleet = build_fleet([(1, 5, 'N', '')])
+        fleet.programs[0] = ProgramTree.parse(b'F2 L(RB)3 (LF)*2')
+
+        # When
+        box = ParallelMowerSimulationService.reachable_box(fleet, 0, lawn.as_tuple())
+
+        # Then
+        self.assertEqual(ParallelMowerSimulationService.reachable_box(build_fleet([(1, 5, 'N', 'FFLRBRBRBLFLF')]), 0, lawn.as_tuple()), box)
+
+    def test_reachable_box_of_started_program_tree(self):
+        """Test a mower box with a started program tree holds the one of its expanded program, without expanding it."""
+        # Given
+        lawn = LawnModel(height=10, width=10)
+        fleet = build_fleet([(1, 5, 'N', ''), (4, 4, 'E', '')])
+        fleet.programs[0] = ProgramTree.parse(b'F2 L(RB)3 (LF)*2')
+        fleet.programs[1] = ProgramTree.parse(b'(LFRF)*500000000000')
+        fleet.cursors[0], fleet.cursors[1] = 3, fleet.programs[1].size
+        expanded_fleet = build_fleet([(1, 5, 'N', 'FFLRBRBRBLFLF')])
+        expanded_fleet.cursors[0] = 3
+
+        # When
+        x0, y0, x1, y1 = ParallelMowerSimulationService.reachable_box(fleet, 0, lawn.as_tuple())
+        finished_box = ParallelMowerSimulationService.reachable_box(fleet, 1, lawn.as_tuple())
+
+        # Then
+        expanded_x0, expanded_y0, expanded_x1, expanded_y1 = ParallelMowerSimulationService.reachable_box(expanded_fleet, 0, lawn.as_tuple())
+        self.assertTrue(x0 <= expanded_x0 and y0 <= expanded_y0 and x1 >= expanded_x1 and y1 >= expanded_y1)
+        self.assertEqual((4, 4, 4, 4), finished_box)
+
+    def test_interaction_groups(self):
+        """Test mowers are grouped by overlapping boxes, finished mowers only matter inside a box."""
+        # Given
+        lawn = LawnModel(height=20, width=20)
+        fleet = build_fleet([(0, 0, 'N', 'FF'), (10, 10, 'E', 'F'), (0, 3, 'S', 'F'), (10, 12, 'S', 'FF'),
+                             (11, 10, 'N', ''), (18, 18, 'N', ''), (0, 1, 'N', 'LR'), (2, 0, 'W', 'LF')])
+
+        # When
+        groups = ParallelMowerSimulationService.interaction_groups(fleet, lawn)
+
+        # Then
+        self.assertEqual([[0, 2, 6], [1, 3, 4], [7]], sorted(groups))
+
+    def test_balance(self):
+        """Test groups are spread by number of pending instructions."""
+        # Given
+        fleet = build_fleet([(0, 0, 'N', 'FFFF'), (1, 0, 'N', 'F'), (2, 0, 'N', 'FF'), (3, 0, 'N', 'FF')])
+
+        # When
+        chunks = ParallelMowerSimulationService.balance(fleet, [[0], [1, 2], [3]], 2)
+
+        # Then
+        self.assertEqual([[0], [1, 2, 3]], chunks)
+
+    def test_run_small_fleet_in_process(self):
+        """Test fleets with few instructions are run by the engine, without workers."""
+        # Given
+        lawn = LawnModel(height=5, width=6)
+        fleet = build_fleet([(1, 2, 'N', 'LFLFLFLFF'), (3, 3, 'E', 'FFRFFRFRRF')])
+        engine = MagicMock(run=MagicMock(return_value=fleet))
+
+        # When
+        with patch.object(mower_simulations_service, 'ProcessPoolExecutor') as executor:
+            ParallelMowerSimulationService(workers=2, engine=engine).run(fleet, lawn)
+
+        # Then
+        engine.run.assert_called_once_with(fleet, lawn)
+        executor.assert_not_called()
+
+    def test_run_matches_sync_simulation(self):
+        """Test final positions are the ones of the synchronous simulation."""
+        service = ParallelMowerSimulationService(workers=3, engine=MacroStepMowerSimulationService(), min_instructions=0)
+        for seed in range(10):
+            fleet, lawn = build_random_sparse_fleet(seed)
+            expected_fleet = SyncMowerSimulationService().run(build_random_sparse_fleet(seed)[0], lawn)
+
+            fleet = service.run(fleet, lawn)
+
+            self.assertEqual(positions(expected_fleet), positions(fleet))
+            self.assertEqual([0] * len(fleet), [fleet.pending(index) for index in range(len(fleet))])
+
+
+class TestTiledMowerSimulation(TestCase):
+    """TiledMowerSimulationService test."""
+    def test_run(self):
+        """Test run a fleet of mowers."""
+        # Given
+        lawn = LawnModel(height=5, width=6)
+        fleet = build_fleet([(1, 2, 'N', 'LFLFLFLFF'), (3, 3, 'E', 'FFRFFRFRRF')])
+
+        # When
+        fleet = TiledMowerSimulationService(workers=4, min_instructions=0).run(fleet, lawn)
+
+        # Then
+        expected_positions = [(1, 3, OrdinalDirection.NORTH), (5, 1, OrdinalDirection.EAST)]
+
+        self.assertEqual(expected_positions, positions(fleet))
+        self.assertEqual([0, 0], [fleet.pending(index) for index in range(len(fleet))])
+
+    def test_run_refuses_program_trees(self):
+        """Test mowers with program trees are refused, their programs would be expanded."""
+        # Given
+        lawn = LawnModel(height=5, width=6)
+        fleet = build_fleet([(1, 2, 'N', 'LFLFLFLFF')])
+        fleet.add(3, 3, OrdinalDirection.EAST.code, ProgramTree.parse(b'F1000000000'))
+
+        # When / Then
+        with self.assertRaises(MowerSimulationError):
+            TiledMowerSimulationService(workers=4, min_instructions=0).run(fleet, lawn)
+
+    def test_tile_grid(self):
+        """Test the lawn is split into as many tiles as workers, as square as possible."""
+        # Then
+        self.assertEqual((2, 2), TiledMowerSimulationService.tile_grid(LawnModel(height=10, width=10).as_tuple(), 4))
+        self.assertEqual((4, 1), TiledMowerSimulationService.tile_grid(LawnModel(height=1, width=10).as_tuple(), 4))
+        self.assertEqual((1, 1), TiledMowerSimulationService.tile_grid(LawnModel(height=1, width=1).as_tuple(), 4))
+
+    def test_tiles(self):
+        """Test tiles cover the lawn."""
+        # When
+        tiles = TiledMowerSimulationService.tiles(LawnModel(height=3, width=5).as_tuple(), 2, 2)
+
+        # Then
+        self.assertEqual([(0, 0, 2, 1), (2, 0, 5, 1), (0, 1, 2, 3), (2, 1, 5, 3)], tiles)
+
+    def test_run_hands_off_mowers_crossing_tiles(self):
+        """Test mowers moving in a train across tile borders, as in the synchronous simulation."""
+        # Given
+        lawn = LawnModel(height=2, width=8)
+        raw_mowers = [(0, 0, 'E', 'F' * 9), (1, 0, 'E', 'F' * 9), (2, 0, 'E', 'FFFLFF'), (7, 1, 'W', 'F' * 9), (6, 1, 'W', 'F' * 9)]
+
+        # When
+        expected_fleet = SyncMowerSimulationService().run(build_fleet(raw_mowers), lawn)
+        fleet = TiledMowerSimulationService(workers=4, min_instructions=0).run(build_fleet(raw_mowers), lawn)
+
+        # Then
+        self.assertEqual(positions(expected_fleet), positions(fleet))
+
+    def test_run_matches_sync_simulation(self):
+        """Test final positions are the ones of the synchronous simulation."""
+        for seed in range(30):
+            lawn = LawnModel(height=seed % 9 + 1, width=seed % 7 + 1)
+
+            expected_fleet = SyncMowerSimulationService().run(build_random_fleet(seed, lawn), lawn)
+            fleet = TiledMowerSimulationService(workers=seed % 3 + 2, min_instructions=0).run(build_random_fleet(seed, lawn), lawn)
+
+            self.assertEqual(positions(expected_fleet), positions(fleet))
+            self.assertEqual([0] * len(fleet), [fleet.pending(index) for index in range(len(fleet))])
+
+    def test_run_raises_on_worker_failure(self):
+        """Test a failing worker stops the other ones and makes the simulation fail."""
+        # Given
+        lawn = LawnModel(height=5, width=6)
+        fleet = build_fleet([(1, 2, 'N', 'LFLFLFLFF'), (3, 3, 'E', 'FFRFFRFRRF')])
+
+        # When
+        with patch.object(TiledMowerSimulationService, 'simulate_tile', side_effect=ValueError('failure')), \
+                patch('sys.stderr'):
+            with self.assertRaises(MowerSimulationError):
+                TiledMowerSimulationService(workers=2, min_instructions=0).run(fleet, lawn)
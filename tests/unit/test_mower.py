@@ -1,12 +1,311 @@
+import io
+import os
 import pytest
+import tempfile
 
 from unittest import TestCase
-from unittest.mock import patch
+from unittest.mock import patch, MagicMock
 
 from mower import Mower
+from mower.resources.models.fleet_snapshot_model import FleetSnapshot
+from mower.resources.services.mower_parsers_service import FileMowerParserService, BinaryMowerParserService
+from mower.resources.services.mower_printers_service import StdoutMowerPrinterService, BinaryMowerPrinterService
+from mower.resources.services.mower_simulations_service import AsyncMowerSimulationService, MacroStepMowerSimulationService, \
+    TiledMowerSimulationService
+from mower.utils.exceptions import LoadFileParserError, MowerSimulationError
+
+INPUT_FILENAME = os.path.join(os.path.dirname(__file__), os.pardir, 'data', 'input.txt')
 
 
 class TestMower(TestCase):
     """Mower test"""
     def test_run(self):
-        self.fail()
+        """Test run the mowers of a file, final positions are written to a file."""
+        # Given
+        with tempfile.TemporaryDirectory() as directory:
+            output_filename = os.path.join(directory, 'output.txt')
+
+            # When
+            Mower(input_filename=INPUT_FILENAME, output_filename=output_filename).run()
+
+            # Then
+            with open(output_filename) as output_file:
+                self.assertEqual('1 3 N\n5 1 E\n3 4 N\n2 4 E\n', output_file.read())
+
+    def test_run_async_to_stdout(self):
+        """Test run the mowers of a file with the asynchronous simulation, final positions are printed."""
+        # Given
+        mower = Mower(input_filename=INPUT_FILENAME, async_sim=True)
+
+        # When
+        with patch.object(StdoutMowerPrinterService, 'print') as print_mock:
+            fleet = mower.run()
+
+        # Then
+        self.assertIsInstance(mower.mower_simulation, AsyncMowerSimulationService)
+        print_mock.assert_called_once_with(fleet, mower.mower_parser.parse()[1])
+        self.assertEqual(4, len(fleet))
+
+    def test_run_with_engine(self):
+        """Test run the mowers of a file with a named simulation engine, final positions are the sync ones."""
+        for engine, service in (('macro', MacroStepMowerSimulationService), ('tiled', TiledMowerSimulationService)):
+            with self.subTest(engine=engine), tempfile.TemporaryDirectory() as directory:
+                # Given
+                output_filename = os.path.join(directory, 'output.txt')
+                mower = Mower(input_filename=INPUT_FILENAME, output_filename=output_filename, engine=engine)
+
+                # When
+                mower.run()
+
+                # Then
+                self.assertIsInstance(mower.mower_simulation, service)
+                with open(output_filename) as output_file:
+                    self.assertEqual('1 3 N\n5 1 E\n3 4 N\n2 4 E\n', output_file.read())
+
+    def test_init_rejects_engine(self):
+        """Test unknown engines, and engines other than async for pipelined runs, are rejected."""
+        with self.assertRaises(MowerSimulationError):
+            Mower(input_filename=INPUT_FILENAME, engine='quantum')
+        with self.assertRaises(MowerSimulationError):
+            Mower(input_filename=INPUT_FILENAME, engine='macro', pipelined=True)
+
+    def test_run_binary_input(self):
+        """Test run the mowers of a binary file."""
+        # Given
+        with tempfile.TemporaryDirectory() as directory:
+            binary_filename = os.path.join(directory, 'input.bin')
+            output_filename = os.path.join(directory, 'output.txt')
+            BinaryMowerPrinterService(binary_filename).print(*FileMowerParserService(INPUT_FILENAME).parse())
+            mower = Mower(input_filename=binary_filename, output_filename=output_filename)
+
+            # When
+            mower.run()
+
+            # Then
+            self.assertIsInstance(mower.mower_parser, BinaryMowerParserService)
+            with open(output_filename) as output_file:
+                self.assertEqual('1 3 N\n5 1 E\n3 4 N\n2 4 E\n', output_file.read())
+
+    def test_run_with_stats(self):
+        """Test run the mowers of a file recording timings and counters."""
+        # Given
+        with tempfile.TemporaryDirectory() as directory:
+            mower = Mower(input_filename=INPUT_FILENAME, output_filename=os.path.join(directory, 'output.txt'), stats=True)
+
+            # When
+            mower.run()
+
+        # Then
+        self.assertEqual(['parse', 'simulate', 'print'], list(mower.stats.phases))
+        self.assertEqual({'lines_parsed': 9, 'mowers': 4, 'instructions_executed': 38, 'blocked_moves': 2}, mower.stats.counters)
+
+    def test_run_without_stats(self):
+        """Test runs record nothing by default."""
+        # Given
+        mower = Mower(input_filename=INPUT_FILENAME)
+
+        # When
+        with patch.object(StdoutMowerPrinterService, 'print'):
+            mower.run()
+
+        # Then
+        self.assertIsNone(mower.stats)
+        self.assertIsNone(mower.mower_simulation.stats)
+
+    def test_run_with_contention(self):
+        """Test run the mowers of a file recording where moves are blocked."""
+        # Given
+        mower = Mower(input_filename=INPUT_FILENAME, contention=True)
+
+        # When
+        with patch.object(StdoutMowerPrinterService, 'print'):
+            mower.run()
+
+        # Then
+        self.assertEqual([(3, 4, 2)], mower.stats.contention.cells())
+        self.assertEqual([4] * 9 + [2], list(mower.stats.contention.active_rounds))
+
+    def test_run_with_cache(self):
+        """Test results of a file already run are copied from the cache, without parsing nor simulation."""
+        # Given
+        with tempfile.TemporaryDirectory() as directory:
+            output_filename = os.path.join(directory, 'output.txt')
+            cache_dir = os.path.join(directory, 'cache')
+            first_fleet = Mower(input_filename=INPUT_FILENAME, output_filename=output_filename, cache_dir=cache_dir).run()
+            os.remove(output_filename)
+            mower = Mower(input_filename=INPUT_FILENAME, output_filename=output_filename, cache_dir=cache_dir, stats=True)
+
+            # When
+            with patch.object(FileMowerParserService, 'parse') as parse_mock:
+                fleet = mower.run()
+
+            # Then
+            self.assertEqual(4, len(first_fleet))
+            self.assertIsNone(fleet)
+            parse_mock.assert_not_called()
+            self.assertEqual({'cache_hits': 1}, mower.stats.counters)
+            with open(output_filename) as output_file:
+                self.assertEqual('1 3 N\n5 1 E\n3 4 N\n2 4 E\n', output_file.read())
+
+    def test_run_with_cache_per_engine(self):
+        """Test results are cached per simulation engine."""
+        # Given
+        with tempfile.TemporaryDirectory() as directory:
+            output_filename = os.path.join(directory, 'output.txt')
+            cache_dir = os.path.join(directory, 'cache')
+            Mower(input_filename=INPUT_FILENAME, output_filename=output_filename, cache_dir=cache_dir).run()
+
+            # When
+            fleets = [Mower(input_filename=INPUT_FILENAME, output_filename=output_filename, cache_dir=cache_dir, async_sim=True).run(),
+                      Mower(input_filename=INPUT_FILENAME, output_filename=output_filename, cache_dir=cache_dir, engine='macro').run()]
+
+            # Then
+            self.assertEqual(2, len([fleet for fleet in fleets if fleet is not None]))
+            self.assertEqual(3, len(os.listdir(cache_dir)))
+
+    def test_run_with_cache_per_directions_syntax(self):
+        """Test results of compressed directions are not used for the same input run as plain directions."""
+        # Given
+        with tempfile.TemporaryDirectory() as directory:
+            input_filename = os.path.join(directory, 'input.txt')
+            output_filename = os.path.join(directory, 'output.txt')
+            cache_dir = os.path.join(directory, 'cache')
+            with open(input_filename, 'w') as input_file:
+                input_file.write('5 6\n1 2 N\n(LF)3F2\n')
+            Mower(input_filename=input_filename, output_filename=output_filename, cache_dir=cache_dir, compressed=True).run()
+
+            # When / Then
+            with self.assertRaises(LoadFileParserError):
+                Mower(input_filename=input_filename, output_filename=output_filename, cache_dir=cache_dir).run()
+            fleet = Mower(input_filename=input_filename, output_filename=output_filename, cache_dir=cache_dir, compressed=True).run()
+            self.assertIsNone(fleet)
+
+    def test_run_resumes_from_snapshot(self):
+        """Test runs of an input grown by appended directions go on from the snapshot of the previous run."""
+        # Given
+        with tempfile.TemporaryDirectory() as directory:
+            input_filename = os.path.join(directory, 'input.txt')
+            output_filename = os.path.join(directory, 'output.txt')
+            snapshot_filename = os.path.join(directory, 'snapshot.bin')
+            with open(input_filename, 'w') as input_file:
+                input_file.write('5 5\n1 2 N\nLFLFLFLFF\n3 3 E\nFFRFFRFRR\n')
+            Mower(input_filename=input_filename, output_filename=output_filename, snapshot_filename=snapshot_filename).run()
+            with open(input_filename, 'a') as input_file:
+                input_file.write('FLF\n')
+            mower = Mower(input_filename=input_filename, output_filename=output_filename, snapshot_filename=snapshot_filename, stats=True)
+
+            # When
+            mower.run()
+
+            # Then
+            self.assertEqual(9, mower.stats.counters['resumed_rounds'])
+            self.assertEqual(3, mower.stats.counters['instructions_executed'])
+            with open(output_filename) as output_file:
+                self.assertEqual('1 3 N\n4 2 N\n', output_file.read())
+
+    def test_run_resumes_from_checkpoint(self):
+        """Test runs resume from the checkpoint of an interrupted run, results are the ones of a full run."""
+        # Given
+        with tempfile.TemporaryDirectory() as directory:
+            output_filename = os.path.join(directory, 'output.txt')
+            checkpoint_filename = os.path.join(directory, 'checkpoint.bin')
+            write = FleetSnapshot.write
+            with patch.object(FleetSnapshot, 'write', side_effect=[None, KeyboardInterrupt()], autospec=True) as write_mock:
+                with self.assertRaises(KeyboardInterrupt):
+                    Mower(input_filename=INPUT_FILENAME, output_filename=output_filename, checkpoint_filename=checkpoint_filename,
+                          checkpoint_steps=8).run()
+            write(write_mock.call_args_list[0][0][0], checkpoint_filename)
+            mower = Mower(input_filename=INPUT_FILENAME, output_filename=output_filename, checkpoint_filename=checkpoint_filename,
+                          checkpoint_steps=8, resume=True, stats=True)
+
+            # When
+            mower.run()
+
+            # Then
+            self.assertEqual(2, mower.stats.counters['resumed_rounds'])
+            self.assertEqual(30, mower.stats.counters['instructions_executed'])
+            self.assertEqual(3, mower.stats.counters['checkpoints'])
+            with open(output_filename) as output_file:
+                self.assertEqual('1 3 N\n5 1 E\n3 4 N\n2 4 E\n', output_file.read())
+
+    def test_run_compressed_input(self):
+        """Test run mowers with compressed directions, final positions are the ones of the expanded directions."""
+        # Given
+        with tempfile.TemporaryDirectory() as directory:
+            input_filename = os.path.join(directory, 'input.txt')
+            output_filename = os.path.join(directory, 'output.txt')
+            with open(input_filename, 'w') as input_file:
+                input_file.write('5 6\n1 2 N\n(LF)3 LFF\n3 3 E\nF2 R F2 R F R2 F\n')
+
+            # When
+            Mower(input_filename=input_filename, output_filename=output_filename, compressed=True).run()
+
+            # Then
+            with open(output_filename) as output_file:
+                self.assertEqual('1 3 N\n5 1 E\n', output_file.read())
+
+    def test_run_pipelined(self):
+        """Test run the mowers of a file through the pipeline, final positions are the sync ones, in input order."""
+        # Given
+        with tempfile.TemporaryDirectory() as directory:
+            output_filename = os.path.join(directory, 'output.txt')
+            mower = Mower(input_filename=INPUT_FILENAME, output_filename=output_filename, pipelined=True, queue_size=1, stats=True)
+
+            # When
+            fleet = mower.run()
+
+            # Then
+            self.assertIsNone(fleet)
+            self.assertEqual(4, mower.stats.counters['mowers'])
+            self.assertIn('pipeline', mower.stats.phases)
+            with open(output_filename) as output_file:
+                self.assertEqual('1 3 N\n5 1 E\n3 4 N\n2 4 E\n', output_file.read())
+
+    def test_run_pipelined_from_stdin_in_arrival_order(self):
+        """Test run mowers read from stdin as they arrive, results are printed in input order."""
+        # Given
+        stdin = io.TextIOWrapper(io.BytesIO(b'5 5\n0 0 N\nFFFF\n4 4 S\nFF\n2 0 E\nLFF\n'))
+        stdout = io.TextIOWrapper(io.BytesIO(), encoding='ascii')
+
+        # When
+        with patch('sys.stdin', stdin), patch('sys.stdout', stdout):
+            Mower(arrival_order=True, queue_size=1).run()
+
+        # Then
+        self.assertEqual(b'0 4 N\n4 2 S\n2 2 N\n', stdout.buffer.getvalue())
+
+    def test_run_pipelined_compressed_input(self):
+        """Test run mowers with compressed directions through the pipeline."""
+        # Given
+        stdin = io.TextIOWrapper(io.BytesIO(b'5 5\n0 0 N\nF(LR)*500\n4 4 S\nF2\n'))
+        stdout = io.TextIOWrapper(io.BytesIO(), encoding='ascii')
+
+        # When
+        with patch('sys.stdin', stdin), patch('sys.stdout', stdout):
+            Mower(pipelined=True, compressed=True, queue_size=1).run()
+
+        # Then
+        self.assertEqual(b'0 1 N\n4 2 S\n', stdout.buffer.getvalue())
+
+    def test_run_pipelined_raises_parse_error(self):
+        """Test run mowers through the pipeline stops on a parsing error, with its line number."""
+        # Given
+        stdin = io.TextIOWrapper(io.BytesIO(b'5 5\n' + b'0 0 N\nF\n' * 3))
+        stdout = io.TextIOWrapper(io.BytesIO(), encoding='ascii')
+
+        # When
+        with patch('sys.stdin', stdin), patch('sys.stdout', stdout), self.assertRaises(LoadFileParserError) as context:
+            Mower(pipelined=True, queue_size=1).run()
+
+        # Then
+        self.assertTrue(context.exception.message.endswith('Line 4.'), context.exception.message)
+
+    def test_run_pipelined_raises_print_error(self):
+        """Test run mowers through the pipeline stops when results can not be written."""
+        # Given
+        stdout = MagicMock()
+        stdout.buffer.write.side_effect = OSError
+
+        # When / Then
+        with patch('sys.stdout', stdout), self.assertRaises(OSError):
+            Mower(input_filename=INPUT_FILENAME, pipelined=True, queue_size=1).run()
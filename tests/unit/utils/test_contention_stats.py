@@ -0,0 +1,115 @@
+import io
+
+from unittest import TestCase
+from unittest.mock import patch
+
+from mower.resources.models.fleet_model import Fleet
+from mower.resources.models.instruction_tape import InstructionTape
+from mower.resources.models.lawn_model import LawnModel
+from mower.utils.contention_stats import ContentionStats
+
+
+def build_contention(cell_blocks):
+    """Helper function to build the contention stats of a 3x2 lawn from {(x, y): blocked moves}."""
+    contention = ContentionStats(mowers=2, width=3, height=2)
+    for (x, y), moves in cell_blocks.items():
+        contention.blocked(0, x, y, moves)
+    return contention
+
+
+class TestContentionStats(TestCase):
+    """ContentionStats test."""
+    def test_for_fleet(self):
+        """Test active mowers per round are counted from the pending instructions of a fleet."""
+        # Given
+        fleet = Fleet()
+        for x, directions in enumerate(('FFF', '', 'L', 'RRR')):
+            fleet.add(x, 0, 0, InstructionTape.from_str(directions))
+        fleet.cursors[3] = 1
+
+        # When
+        contention = ContentionStats.for_fleet(fleet, LawnModel(height=1, width=4))
+
+        # Then
+        self.assertEqual([3, 2, 1], list(contention.active_rounds))
+        self.assertEqual([0, 0, 0, 0], list(contention.mower_blocks))
+
+    def test_blocked(self):
+        """Test blocked moves are counted per mower and per cell."""
+        # Given
+        contention = ContentionStats(mowers=2, width=3, height=2)
+
+        # When
+        contention.blocked(1, 2, 1)
+        contention.blocked(0, 2, 1, 3)
+        contention.blocked(1, 0, 0)
+
+        # Then
+        self.assertEqual([3, 2], list(contention.mower_blocks))
+        self.assertEqual([(0, 0, 1), (2, 1, 4)], contention.cells())
+
+    @patch.object(ContentionStats, 'ARRAY_MAX_CELLS', 0)
+    def test_blocked_on_huge_lawns(self):
+        """Test blocked moves are counted per cell in a dict on lawns too large for an array."""
+        # Given
+        contention = ContentionStats(mowers=2, width=3, height=2)
+
+        # When
+        contention.blocked(1, 2, 1)
+        contention.blocked(0, 0, 0, 2)
+
+        # Then
+        self.assertEqual({0: 2, 5: 1}, contention.cell_blocks)
+        self.assertEqual([(0, 0, 2), (2, 1, 1)], contention.cells())
+
+    def test_summary(self):
+        """Test summary statistics."""
+        # Given
+        contention = ContentionStats(mowers=3, width=3, height=2)
+        contention.active_rounds.extend((3, 3, 2))
+        contention.blocked(2, 1, 1, 2)
+        contention.blocked(0, 1, 0)
+
+        # When
+        summary = contention.summary()
+
+        # Then
+        self.assertEqual({'rounds': 3, 'peak_active_mowers': 3, 'mean_active_mowers': 8 / 3, 'blocked_moves': 3, 'blocked_share': 3 / 8,
+                          'blocked_mowers': 2, 'blocked_cells': 2, 'top_mowers': [[2, 2], [0, 1]], 'top_cells': [[1, 1, 2], [1, 0, 1]]},
+                         summary)
+
+    def test_write_csv(self):
+        """Test write the cells some moves were blocked into as CSV."""
+        # Given
+        contention = build_contention({(2, 1): 4, (0, 0): 1})
+        stream = io.StringIO()
+
+        # When
+        contention.write_csv(stream)
+
+        # Then
+        self.assertEqual('x,y,blocked_moves\n0,0,1\n2,1,4\n', stream.getvalue())
+
+    def test_write_pgm(self):
+        """Test write blocked moves per cell as a PGM image, north up."""
+        # Given
+        contention = build_contention({(2, 1): 4, (0, 0): 1})
+        stream = io.BytesIO()
+
+        # When
+        contention.write_pgm(stream)
+
+        # Then
+        self.assertEqual(b'P5\n3 2\n4\n\x00\x00\x04\x01\x00\x00', stream.getvalue())
+
+    def test_write_pgm_scales_large_counts(self):
+        """Test counts over the PGM maximum value are scaled, in two bytes big endian samples."""
+        # Given
+        contention = build_contention({(2, 1): 0x20000, (0, 0): 0x10000})
+        stream = io.BytesIO()
+
+        # When
+        contention.write_pgm(stream)
+
+        # Then
+        self.assertEqual(b'P5\n3 2\n65535\n\x00\x00\x00\x00\xff\xff\x7f\xff\x00\x00\x00\x00', stream.getvalue())
@@ -0,0 +1,101 @@
+import json
+import tracemalloc
+from types import SimpleNamespace
+
+from unittest import TestCase
+from unittest.mock import patch
+
+from mower.utils.mower_stats import MowerStats
+
+
+class TestMowerStats(TestCase):
+    """MowerStats test."""
+    def test_phase(self):
+        """Test phases record their wall and CPU times, and add up when run several times."""
+        # Given
+        stats = MowerStats()
+
+        # When
+        with stats.phase('simulate'):
+            sum(range(1000))
+        first_wall_seconds = stats.phases['simulate']['wall_seconds']
+        with stats.phase('simulate'):
+            sum(range(1000))
+
+        # Then
+        self.assertEqual({'wall_seconds', 'cpu_seconds'}, set(stats.phases['simulate']))
+        self.assertGreater(stats.phases['simulate']['wall_seconds'], first_wall_seconds)
+        self.assertGreaterEqual(stats.phases['simulate']['cpu_seconds'], 0)
+
+    def test_phase_records_peak_memory(self):
+        """Test phases record their peak of traced memory, tracing stops with the phase."""
+        # Given
+        stats = MowerStats(trace_memory=True)
+
+        # When
+        with stats.phase('parse'):
+            data = bytearray(1 << 20)
+        del data
+
+        # Then
+        self.assertGreaterEqual(stats.phases['parse']['peak_memory_bytes'], 1 << 20)
+        self.assertFalse(tracemalloc.is_tracing())
+
+    def test_nested_phase_without_reset_peak(self):
+        """Test phases run while tracing, without tracemalloc.reset_peak (Python 3.8), record the peak since tracing started."""
+        # Given
+        stats = MowerStats(trace_memory=True)
+        tracemalloc_38 = SimpleNamespace(start=tracemalloc.start, stop=tracemalloc.stop, is_tracing=tracemalloc.is_tracing,
+                                         get_traced_memory=tracemalloc.get_traced_memory)
+
+        # When
+        with stats.phase('run'):
+            data = bytearray(1 << 20)
+            del data
+            with patch('mower.utils.mower_stats.tracemalloc', tracemalloc_38):
+                with stats.phase('print'):
+                    pass
+
+        # Then
+        self.assertGreaterEqual(stats.phases['print']['peak_memory_bytes'], 1 << 20)
+
+    def test_phase_records_failed_phases(self):
+        """Test phases raising are recorded too."""
+        # Given
+        stats = MowerStats()
+
+        # When
+        with self.assertRaises(ValueError):
+            with stats.phase('print'):
+                raise ValueError()
+
+        # Then
+        self.assertIn('print', stats.phases)
+
+    def test_count(self):
+        """Test counters add up."""
+        # Given
+        stats = MowerStats()
+
+        # When
+        stats.count('blocked_moves')
+        stats.count('blocked_moves', 2)
+        stats.count('mowers', 0)
+
+        # Then
+        self.assertEqual({'blocked_moves': 3, 'mowers': 0}, stats.counters)
+
+    def test_to_json(self):
+        """Test phases and counters are dumped as JSON."""
+        # Given
+        stats = MowerStats()
+        with stats.phase('parse'):
+            pass
+        stats.count('mowers', 4)
+
+        # When
+        report = json.loads(stats.to_json())
+
+        # Then
+        self.assertEqual(['parse'], list(report['phases']))
+        self.assertEqual({'mowers': 4}, report['counters'])
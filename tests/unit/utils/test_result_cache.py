@@ -0,0 +1,95 @@
+import os
+import tempfile
+
+from unittest import TestCase
+
+from mower.utils.result_cache import ResultCache
+
+
+def write_file(directory, name, data):
+    """Helper function to write a file, returns its name."""
+    filename = os.path.join(directory, name)
+    with open(filename, 'wb') as output_file:
+        output_file.write(data)
+    return filename
+
+
+class TestResultCache(TestCase):
+    """ResultCache test."""
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = ResultCache(os.path.join(self.directory.name, 'cache'), max_bytes=10)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def store(self, key, data):
+        with self.cache.store(key) as stored_file:
+            stored_file.write(data)
+
+    def test_key(self):
+        """Test keys only depend on the input bytes and the given parts."""
+        # Given
+        first = write_file(self.directory.name, 'first.txt', b'5 5\n1 2 N\nLFLF\n')
+        same = write_file(self.directory.name, 'same.txt', b'5 5\n1 2 N\nLFLF\n')
+        other = write_file(self.directory.name, 'other.txt', b'5 5\n1 2 N\nLFLR\n')
+
+        # When
+        key = ResultCache.key(first, '0.1.0', 'SyncMowerSimulationService')
+
+        # Then
+        self.assertEqual(key, ResultCache.key(same, '0.1.0', 'SyncMowerSimulationService'))
+        self.assertNotEqual(key, ResultCache.key(other, '0.1.0', 'SyncMowerSimulationService'))
+        self.assertNotEqual(key, ResultCache.key(first, '0.1.0', 'AsyncMowerSimulationService'))
+        self.assertNotEqual(key, ResultCache.key(first, '0.2.0', 'SyncMowerSimulationService'))
+
+    def test_store_and_open(self):
+        """Test stored results are read back, keys without results give None."""
+        # Given
+        self.store('key', b'1 3 N\n')
+
+        # When
+        stored = self.cache.open('key')
+
+        # Then
+        with stored:
+            self.assertEqual(b'1 3 N\n', stored.read())
+        self.assertIsNone(self.cache.open('missing'))
+
+    def test_store_is_atomic(self):
+        """Test results are not stored when writing them fails, no temporary file is left."""
+        # When
+        with self.assertRaises(ValueError):
+            with self.cache.store('key') as stored_file:
+                stored_file.write(b'1 3')
+                raise ValueError()
+
+        # Then
+        self.assertIsNone(self.cache.open('key'))
+        self.assertEqual([], os.listdir(self.cache.directory))
+
+    def test_store_evicts_least_recently_used(self):
+        """Test the least recently used results are removed once the size limit is reached."""
+        # Given
+        self.store('first', b'1234')
+        self.store('second', b'1234')
+        os.utime(self.cache.path('first'), (1, 1))
+        os.utime(self.cache.path('second'), (2, 2))
+        self.cache.open('first').close()
+
+        # When
+        self.store('third', b'1234')
+
+        # Then
+        self.assertEqual(['first', 'third'], sorted(os.listdir(self.cache.directory)))
+
+    def test_store_skips_results_over_the_size_limit(self):
+        """Test results larger than the size limit are not stored, nothing is evicted for them."""
+        # Given
+        self.store('first', b'1234')
+
+        # When
+        self.store('huge', b'12345678901')
+
+        # Then
+        self.assertEqual(['first'], os.listdir(self.cache.directory))